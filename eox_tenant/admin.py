@@ -11,6 +11,7 @@ from django.urls import reverse
 from django.utils.safestring import mark_safe
 from jsonfield.fields import JSONField
 
+from eox_tenant import fields
 from eox_tenant.models import Microsite, Route, TenantConfig, TenantOrganization
 from eox_tenant.widgets import JsonWidget
 
@@ -100,10 +101,36 @@ class TenantConfigAdmin(admin.ModelAdmin):
         'organizations',
     )
     search_fields = ('external_key', 'route__domain', 'lms_configs', 'studio_configs', 'theming_configs', 'meta')
+    native_search_fields = ('external_key', 'route__domain')
     formfield_overrides = {
         JSONField: {'widget': JsonWidget}
     }
 
+    def get_search_fields(self, request):
+        """
+        With native JSON columns the configurations are not scanned with LIKE, see get_search_results.
+        """
+        if fields.EOX_TENANT_NATIVE_JSON_FIELDS:
+            return self.native_search_fields
+
+        return super().get_search_fields(request)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        With native JSON columns the search term also matches the value of the lms_configs keys
+        in EOX_TENANT_NATIVE_JSON_INDEXED_KEYS, answered by the indexes of migrate_tenant_json_fields.
+        """
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+
+        if not fields.EOX_TENANT_NATIVE_JSON_FIELDS or not search_term:
+            return results, may_have_duplicates
+
+        for key in getattr(settings, "EOX_TENANT_NATIVE_JSON_INDEXED_KEYS", []):
+            matches = TenantConfig.objects.filter_by_config_key(key, search_term).values("pk")
+            results |= queryset.filter(pk__in=matches)
+
+        return results, may_have_duplicates
+
     def sitename(self, tenant_config):
         """
         Read only method to calculate sitename attribute from config model.
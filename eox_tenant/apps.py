@@ -2,6 +2,7 @@
 File configuration for eox-tenant.
 """
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class EdunextOpenedxExtensionsTenantConfig(AppConfig):
@@ -68,6 +69,144 @@ class EdunextOpenedxExtensionsTenantConfig(AppConfig):
                         'dispatch_uid': 'update_tenant_organizations_receiver',
                         'sender_path': 'eox_tenant.models.Microsite',
                     },
+                    {
+                        'receiver_func_name': 'clear_tenant_config_cache',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'clear_tenant_config_cache_receiver',
+                        'sender_path': 'eox_tenant.models.TenantConfig',
+                    },
+                    {
+                        'receiver_func_name': 'clear_tenant_config_cache',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'clear_tenant_config_cache_receiver',
+                        'sender_path': 'eox_tenant.models.TenantConfig',
+                    },
+                    {
+                        'receiver_func_name': 'clear_tenant_config_cache',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'clear_tenant_config_cache_receiver',
+                        'sender_path': 'eox_tenant.models.Route',
+                    },
+                    {
+                        'receiver_func_name': 'clear_tenant_config_cache',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'clear_tenant_config_cache_receiver',
+                        'sender_path': 'eox_tenant.models.Route',
+                    },
+                    {
+                        'receiver_func_name': 'bump_tenant_config_version',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'bump_tenant_config_version_receiver',
+                        'sender_path': 'eox_tenant.models.TenantConfig',
+                    },
+                    {
+                        'receiver_func_name': 'bump_tenant_config_version',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'bump_tenant_config_version_receiver',
+                        'sender_path': 'eox_tenant.models.TenantConfig',
+                    },
+                    {
+                        'receiver_func_name': 'bump_tenant_config_version',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'bump_tenant_config_version_receiver',
+                        'sender_path': 'eox_tenant.models.Route',
+                    },
+                    {
+                        'receiver_func_name': 'bump_tenant_config_version',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'bump_tenant_config_version_receiver',
+                        'sender_path': 'eox_tenant.models.Route',
+                    },
+                    {
+                        'receiver_func_name': 'bump_tenant_config_version',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'bump_tenant_config_version_receiver',
+                        'sender_path': 'eox_tenant.models.Microsite',
+                    },
+                    {
+                        'receiver_func_name': 'bump_tenant_config_version',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'bump_tenant_config_version_receiver',
+                        'sender_path': 'eox_tenant.models.Microsite',
+                    },
+                    {
+                        'receiver_func_name': 'update_domain_index',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'update_domain_index_receiver',
+                        'sender_path': 'eox_tenant.models.Route',
+                    },
+                    {
+                        'receiver_func_name': 'update_domain_index',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'update_domain_index_receiver',
+                        'sender_path': 'eox_tenant.models.Route',
+                    },
+                    {
+                        'receiver_func_name': 'update_domain_index',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'update_domain_index_receiver',
+                        'sender_path': 'eox_tenant.models.Microsite',
+                    },
+                    {
+                        'receiver_func_name': 'update_domain_index',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'update_domain_index_receiver',
+                        'sender_path': 'eox_tenant.models.Microsite',
+                    },
+                    {
+                        'receiver_func_name': 'clear_org_index',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'clear_org_index_receiver',
+                        'sender_path': 'eox_tenant.models.TenantConfig',
+                    },
+                    {
+                        'receiver_func_name': 'clear_org_index',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'clear_org_index_receiver',
+                        'sender_path': 'eox_tenant.models.TenantConfig',
+                    },
+                    {
+                        'receiver_func_name': 'clear_org_index',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'clear_org_index_receiver',
+                        'sender_path': 'eox_tenant.models.Microsite',
+                    },
+                    {
+                        'receiver_func_name': 'clear_org_index',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'clear_org_index_receiver',
+                        'sender_path': 'eox_tenant.models.Microsite',
+                    },
+                    {
+                        'receiver_func_name': 'update_tenant_memberships',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'update_tenant_memberships_receiver',
+                        'sender_path': 'eox_tenant.models.Route',
+                    },
+                    {
+                        'receiver_func_name': 'update_tenant_memberships',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'update_tenant_memberships_receiver',
+                        'sender_path': 'eox_tenant.models.Route',
+                    },
+                    {
+                        'receiver_func_name': 'update_tenant_memberships',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'update_tenant_memberships_receiver',
+                        'sender_path': 'eox_tenant.models.Microsite',
+                    },
+                    {
+                        'receiver_func_name': 'update_user_memberships',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'update_user_memberships_receiver',
+                        'sender_path': 'common.djangoapps.student.models.user.UserSignupSource',
+                    },
+                    {
+                        'receiver_func_name': 'update_user_memberships',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'update_user_memberships_receiver',
+                        'sender_path': 'common.djangoapps.student.models.user.UserSignupSource',
+                    },
                 ],
             },
             'cms.djangoapp': {
@@ -85,6 +224,144 @@ class EdunextOpenedxExtensionsTenantConfig(AppConfig):
                         'receiver_func_name': 'start_async_studio_tenant',
                         'signal_path': 'celery.signals.task_prerun',
                     },
+                    {
+                        'receiver_func_name': 'clear_tenant_config_cache',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'clear_tenant_config_cache_receiver',
+                        'sender_path': 'eox_tenant.models.TenantConfig',
+                    },
+                    {
+                        'receiver_func_name': 'clear_tenant_config_cache',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'clear_tenant_config_cache_receiver',
+                        'sender_path': 'eox_tenant.models.TenantConfig',
+                    },
+                    {
+                        'receiver_func_name': 'clear_tenant_config_cache',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'clear_tenant_config_cache_receiver',
+                        'sender_path': 'eox_tenant.models.Route',
+                    },
+                    {
+                        'receiver_func_name': 'clear_tenant_config_cache',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'clear_tenant_config_cache_receiver',
+                        'sender_path': 'eox_tenant.models.Route',
+                    },
+                    {
+                        'receiver_func_name': 'bump_tenant_config_version',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'bump_tenant_config_version_receiver',
+                        'sender_path': 'eox_tenant.models.TenantConfig',
+                    },
+                    {
+                        'receiver_func_name': 'bump_tenant_config_version',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'bump_tenant_config_version_receiver',
+                        'sender_path': 'eox_tenant.models.TenantConfig',
+                    },
+                    {
+                        'receiver_func_name': 'bump_tenant_config_version',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'bump_tenant_config_version_receiver',
+                        'sender_path': 'eox_tenant.models.Route',
+                    },
+                    {
+                        'receiver_func_name': 'bump_tenant_config_version',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'bump_tenant_config_version_receiver',
+                        'sender_path': 'eox_tenant.models.Route',
+                    },
+                    {
+                        'receiver_func_name': 'bump_tenant_config_version',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'bump_tenant_config_version_receiver',
+                        'sender_path': 'eox_tenant.models.Microsite',
+                    },
+                    {
+                        'receiver_func_name': 'bump_tenant_config_version',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'bump_tenant_config_version_receiver',
+                        'sender_path': 'eox_tenant.models.Microsite',
+                    },
+                    {
+                        'receiver_func_name': 'update_domain_index',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'update_domain_index_receiver',
+                        'sender_path': 'eox_tenant.models.Route',
+                    },
+                    {
+                        'receiver_func_name': 'update_domain_index',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'update_domain_index_receiver',
+                        'sender_path': 'eox_tenant.models.Route',
+                    },
+                    {
+                        'receiver_func_name': 'update_domain_index',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'update_domain_index_receiver',
+                        'sender_path': 'eox_tenant.models.Microsite',
+                    },
+                    {
+                        'receiver_func_name': 'update_domain_index',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'update_domain_index_receiver',
+                        'sender_path': 'eox_tenant.models.Microsite',
+                    },
+                    {
+                        'receiver_func_name': 'clear_org_index',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'clear_org_index_receiver',
+                        'sender_path': 'eox_tenant.models.TenantConfig',
+                    },
+                    {
+                        'receiver_func_name': 'clear_org_index',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'clear_org_index_receiver',
+                        'sender_path': 'eox_tenant.models.TenantConfig',
+                    },
+                    {
+                        'receiver_func_name': 'clear_org_index',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'clear_org_index_receiver',
+                        'sender_path': 'eox_tenant.models.Microsite',
+                    },
+                    {
+                        'receiver_func_name': 'clear_org_index',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'clear_org_index_receiver',
+                        'sender_path': 'eox_tenant.models.Microsite',
+                    },
+                    {
+                        'receiver_func_name': 'update_tenant_memberships',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'update_tenant_memberships_receiver',
+                        'sender_path': 'eox_tenant.models.Route',
+                    },
+                    {
+                        'receiver_func_name': 'update_tenant_memberships',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'update_tenant_memberships_receiver',
+                        'sender_path': 'eox_tenant.models.Route',
+                    },
+                    {
+                        'receiver_func_name': 'update_tenant_memberships',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'update_tenant_memberships_receiver',
+                        'sender_path': 'eox_tenant.models.Microsite',
+                    },
+                    {
+                        'receiver_func_name': 'update_user_memberships',
+                        'signal_path': 'django.db.models.signals.post_save',
+                        'dispatch_uid': 'update_user_memberships_receiver',
+                        'sender_path': 'common.djangoapps.student.models.user.UserSignupSource',
+                    },
+                    {
+                        'receiver_func_name': 'update_user_memberships',
+                        'signal_path': 'django.db.models.signals.post_delete',
+                        'dispatch_uid': 'update_user_memberships_receiver',
+                        'sender_path': 'common.djangoapps.student.models.user.UserSignupSource',
+                    },
                 ],
             },
         },
@@ -103,3 +380,8 @@ class EdunextOpenedxExtensionsTenantConfig(AppConfig):
 
         from eox_tenant.tenant_wise import load_tenant_wise_overrides  # pylint: disable=import-outside-toplevel
         load_tenant_wise_overrides()
+
+        from eox_tenant.constants import SETTINGS_MODE_CONTEXT  # pylint: disable=import-outside-toplevel
+        if getattr(settings, "EOX_TENANT_SETTINGS_MODE", None) == SETTINGS_MODE_CONTEXT:
+            from eox_tenant.tenant_settings import install_context_settings  # pylint: disable=import-outside-toplevel
+            install_context_settings()
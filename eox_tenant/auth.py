@@ -3,7 +3,7 @@
 This file implements the authentication backend for the openedx platform.
 """
 import logging
-import re
+from time import perf_counter
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -11,13 +11,32 @@ from django.utils.translation import gettext as _
 
 from eox_tenant.edxapp_wrapper.auth import get_edx_auth_backend, get_edx_auth_failed
 from eox_tenant.edxapp_wrapper.theming_helpers import get_theming_helpers
-from eox_tenant.permissions import LOGIN_ALL_TENANTS_PERMISSION_NAME
+from eox_tenant.instrumentation import TIMING_METRIC_PREFIX, emit_timing, get_current_switch, get_timing_sinks
+from eox_tenant.signup_sources import get_login_grants, get_signup_source_authorizer, is_login_authorized
+from eox_tenant.utils import EOX_TENANT_USE_TENANT_MEMBERSHIPS
 
 AuthFailedError = get_edx_auth_failed()
 AUDIT_LOG = logging.getLogger("audit")
 EdxAuthBackend = get_edx_auth_backend()
 UserModel = get_user_model()
 theming_helpers = get_theming_helpers()
+# Read at the beginning so this can not be modified by the tenant configs
+EOX_TENANT_LOGIN_WITH_TENANT_MEMBERSHIPS = getattr(settings, "EOX_TENANT_LOGIN_WITH_TENANT_MEMBERSHIPS", False)
+
+
+def emit_login_timing(name, duration, allowed):
+    """
+    Send the duration of a login check to the timing sinks, tagged with the tenant and the result.
+    """
+    if not get_timing_sinks():
+        return
+
+    switch = get_current_switch()
+    emit_timing(
+        f"{TIMING_METRIC_PREFIX}.login.{name}",
+        duration,
+        {"tenant": switch.tenant_key if switch else None, "outcome": "allowed" if allowed else "denied"},
+    )
 
 
 class TenantAwareAuthBackend(EdxAuthBackend):
@@ -32,11 +51,19 @@ class TenantAwareAuthBackend(EdxAuthBackend):
         # List storing validations applied
         validations = []
         # Run the default validation from the parent class and add it to the validations list
+        start_time = perf_counter()
         user_can_authenticate = super().user_can_authenticate(user)
         validations.append(user_can_authenticate)
+        emit_login_timing("edx_auth_backend", perf_counter() - start_time, user_can_authenticate)
 
         # Perform the custom auth-on-tenant validation
-        can_auth_on_tenant = self.user_can_authenticate_on_tenant(user)
+        start_time = perf_counter()
+        can_auth_on_tenant = False
+        try:
+            can_auth_on_tenant = self.user_can_authenticate_on_tenant(user)
+        finally:
+            # Strict logins raise AuthFailedError when the user is denied
+            emit_login_timing("tenant_auth_backend", perf_counter() - start_time, can_auth_on_tenant)
         validations.append(can_auth_on_tenant)
 
         # All validations must return True
@@ -46,8 +73,21 @@ class TenantAwareAuthBackend(EdxAuthBackend):
         """
         Prevent users that signed up on a different tenant site to login in this site.
         """
-        # Check if the user has a permission to login to all tenants
-        if user.has_perm(LOGIN_ALL_TENANTS_PERMISSION_NAME):
+        tenant_key = getattr(settings, 'EDNX_TENANT_KEY', None)
+        registration_sources = getattr(settings, 'EDNX_ACCOUNT_REGISTRATION_SOURCES', None)
+        # Opt-in policy: without registration sources the members of the tenant may login on any of its
+        # domains, which needs the memberships kept up to date
+        use_memberships = bool(
+            EOX_TENANT_LOGIN_WITH_TENANT_MEMBERSHIPS
+            and EOX_TENANT_USE_TENANT_MEMBERSHIPS
+            and tenant_key
+            and registration_sources is None
+        )
+        # The permission to login to all tenants is read with the same query as the signup sources
+        grants = get_login_grants(user, tenant_key, use_memberships)
+        login_all_tenants = grants[0]
+
+        if login_all_tenants:
             return True
 
         request = theming_helpers.get_current_request()
@@ -57,21 +97,12 @@ class TenantAwareAuthBackend(EdxAuthBackend):
 
         current_domain = request.META.get("HTTP_HOST")
 
-        authorized_sources = getattr(settings, 'EDNX_ACCOUNT_REGISTRATION_SOURCES', [current_domain])
-        sources = user.usersignupsource_set.all()
-
-        is_authorized = False
-        for source in sources:
-            if any(re.match(pattern + "$", source.site, re.IGNORECASE) for pattern in authorized_sources):
-                is_authorized = True
-
-        email = getattr(user, 'email', None)
-        if settings.REGISTRATION_EMAIL_PATTERNS_ALLOWED is not None:
+        authorizer = get_signup_source_authorizer(
+            [current_domain] if registration_sources is None else registration_sources,
             # Taken from forms.AccountCreationForm
-            allowed_patterns = settings.REGISTRATION_EMAIL_PATTERNS_ALLOWED
-            if not any(re.match(pattern + "$", email) for pattern in allowed_patterns):
-                # This email is not on the whitelist of allowed emails.
-                is_authorized = False
+            settings.REGISTRATION_EMAIL_PATTERNS_ALLOWED,
+        )
+        is_authorized = is_login_authorized(user, authorizer, grants, use_memberships)
 
         if not is_authorized:
             loggable_id = user.id if user else "<unknown>"
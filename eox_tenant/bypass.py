@@ -0,0 +1,58 @@
+"""
+Requests that eox-tenant leaves alone.
+
+Health checks, static files and other responses that never read the tenant configurations
+can be listed by path prefix or by host, so they neither switch the tenant settings nor run
+the eox-tenant middlewares.
+"""
+from django.conf import settings
+
+
+class RequestBypass:
+    """
+    Match requests by path prefix or by host.
+
+    The prefixes are kept as a tuple without the ones already covered by a shorter prefix,
+    so a path is checked with a single str.startswith call.
+    """
+
+    def __init__(self, path_prefixes=(), hosts=()):
+        prefixes = []
+
+        for prefix in sorted(set(path_prefixes)):
+            if not prefixes or not prefix.startswith(prefixes[-1]):
+                prefixes.append(prefix)
+
+        self.path_prefixes = tuple(prefixes)
+        self.hosts = frozenset(host.split(":")[0].lower() for host in hosts)
+
+    def __bool__(self):
+        return bool(self.path_prefixes or self.hosts)
+
+    def matches(self, path, host=None):
+        """
+        Whether the request to the path and host must be left alone.
+        """
+        if self.path_prefixes and path and path.startswith(self.path_prefixes):
+            return True
+
+        return bool(self.hosts and host and host.split(":")[0].lower() in self.hosts)
+
+    def matches_environ(self, environ):
+        """
+        Whether the request of a WSGI environ must be left alone.
+        """
+        return self.matches(environ.get("PATH_INFO"), environ.get("HTTP_HOST"))
+
+    def matches_request(self, request):
+        """
+        Whether the request must be left alone.
+        """
+        return self.matches(request.path_info, request.META.get("HTTP_HOST"))
+
+
+# Read at the beginning so this can not be modified by the tenant configs
+REQUEST_BYPASS = RequestBypass(
+    path_prefixes=getattr(settings, "EOX_TENANT_BYPASS_PATH_PREFIXES", []),
+    hosts=getattr(settings, "EOX_TENANT_BYPASS_HOSTS", []),
+)
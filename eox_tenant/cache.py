@@ -0,0 +1,396 @@
+"""
+In-process caches used by eox-tenant.
+
+These caches live in the memory of every worker, so they must be bounded and
+must expire their entries. They are meant to hold data that is read on almost
+every request and rarely edited, such as the decoded tenant configurations.
+
+The configuration version is kept in the django cache instead, so every
+process sees the same value and can tell when its local data became stale.
+
+SoftTTLCache wraps the django cache for values that are expensive to compute
+and read by every process, such as the values of the organizations.
+
+TENANT_CACHE keeps a short lived copy of the eox-tenant keys of the django cache
+in the memory of the process, to save a network round trip on most lookups.
+"""
+import random
+import threading
+from collections import OrderedDict
+from time import monotonic, time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+CONFIG_VERSION_CACHE_KEY = "eox-tenant-config-version"
+
+
+class LRUCache:
+    """
+    Thread safe, size bounded cache with a time to live for each entry.
+
+    When the cache is full the least recently used entry is dropped. A timeout
+    of zero or less disables the cache: nothing is stored and every lookup is a miss.
+    """
+
+    MISSING = object()
+
+    def __init__(self, maxsize=1024, timeout=60):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.version = None
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, self.MISSING) is not self.MISSING
+
+    def get(self, key, default=None):
+        """
+        Return the value stored for key, or default if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at < monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, timeout=None):
+        """
+        Store value under key, evicting the least recently used entry if needed.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if timeout <= 0 or self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (monotonic() + timeout, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """
+        Remove key from the cache if present.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """
+        Remove every entry from the cache.
+        """
+        with self._lock:
+            self._data.clear()
+
+    def set_version(self, version):
+        """
+        Drop every entry if the data was stored under a different version.
+        """
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+    def stats(self):
+        """
+        Return the usage counters of the cache.
+        """
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class TwoTierCache:
+    """
+    Django cache with an in-process LRUCache in front of it.
+
+    Reads look first at the local copy and then at the django cache, storing what they find
+    locally for at most the local timeout. Writes go to both tiers. Since other processes do
+    not see the local copies, they are dropped when the configuration version changes and
+    they expire quickly otherwise. Values read from the local tier are shared, so they must
+    be treated as read only.
+    """
+
+    def __init__(self, maxsize=1024, timeout=5):
+        self.local = LRUCache(maxsize=maxsize, timeout=timeout)
+
+    def get(self, key, default=None):
+        """
+        Return the value of key from the local tier or the django cache.
+        """
+        value = self.local.get(key, LRUCache.MISSING)
+
+        if value is LRUCache.MISSING:
+            value = cache.get(key, LRUCache.MISSING)
+            if value is LRUCache.MISSING:
+                return default
+
+            self.local.set(key, value)
+
+        return value
+
+    def get_many(self, keys):
+        """
+        Return a dict with the values found for keys, reading the django cache only for the
+        keys missing from the local tier.
+        """
+        values = {}
+        missing = []
+
+        for key in keys:
+            value = self.local.get(key, LRUCache.MISSING)
+            if value is LRUCache.MISSING:
+                missing.append(key)
+            else:
+                values[key] = value
+
+        if missing:
+            found = cache.get_many(missing)
+            for key, value in found.items():
+                self.local.set(key, value)
+            values.update(found)
+
+        return values
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        """
+        Store value in both tiers.
+        """
+        cache.set(key, value, timeout)
+        self.local.set(key, value, self._local_timeout(timeout))
+
+    def set_many(self, mapping, timeout=DEFAULT_TIMEOUT):
+        """
+        Store several values in both tiers.
+        """
+        cache.set_many(mapping, timeout)
+        local_timeout = self._local_timeout(timeout)
+        for key, value in mapping.items():
+            self.local.set(key, value, local_timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT):
+        """
+        Store value in the django cache only if the key is missing there, as used for locks.
+        """
+        self.local.delete(key)
+        return cache.add(key, value, timeout)
+
+    def delete(self, key):
+        """
+        Remove key from both tiers.
+        """
+        self.local.delete(key)
+        cache.delete(key)
+
+    def delete_many(self, keys):
+        """
+        Remove several keys from both tiers.
+        """
+        for key in keys:
+            self.local.delete(key)
+        cache.delete_many(keys)
+
+    def set_version(self, version):
+        """
+        Drop the local tier if it was filled under a different configuration version.
+        """
+        self.local.set_version(version)
+
+    def clear_local(self):
+        """
+        Drop the local tier of this process.
+        """
+        self.local.clear()
+
+    def clear(self):
+        """
+        Drop both tiers. This clears the whole django cache, so it is only meant for tests.
+        """
+        self.local.clear()
+        cache.clear()
+
+    def stats(self):
+        """
+        Return the usage counters of the local tier.
+        """
+        return self.local.stats()
+
+    def _local_timeout(self, timeout):
+        """
+        Return the local timeout for a value stored with the given django cache timeout.
+        """
+        if timeout is None or timeout is DEFAULT_TIMEOUT:
+            return self.local.timeout
+
+        return min(timeout, self.local.timeout)
+
+
+# Read at the beginning so this can not be modified by the tenant configs
+TENANT_CACHE = TwoTierCache(
+    maxsize=getattr(settings, "EOX_TENANT_LOCAL_CACHE_SIZE", 1024),
+    timeout=getattr(settings, "EOX_TENANT_LOCAL_CACHE_TIMEOUT", 5),
+)
+
+
+class SoftTTLCache:
+    """
+    Django cache wrapper with negative caching, soft expiration and single flight refresh.
+
+    Every value is stored in an envelope (value, soft_expires_at), so a computed None is
+    cached as a negative result instead of looking like a miss. After the soft expiration
+    the first process that gets the lock key recomputes the value while the others keep
+    serving the stale one, and the entry only disappears from the cache after twice the
+    timeout. Timeouts are jittered so keys written together do not expire together.
+    """
+
+    def __init__(self, timeout=300, jitter=0.1, lock_timeout=30, backend=TENANT_CACHE):
+        self.backend = backend
+        self.timeout = timeout
+        self.jitter = jitter
+        self.lock_timeout = lock_timeout
+        self.counters = {"hits": 0, "negative_hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0}
+
+    def get_or_set(self, key, compute):
+        """
+        Return the value cached for key, calling compute() to get and store it when needed.
+        """
+        usable, value = self._read(key, self.backend.get(key))
+
+        if usable:
+            return value
+
+        value = compute()
+        self.set(key, value)
+        return value
+
+    def get_many(self, keys):
+        """
+        Return a dict with the usable values of the given keys, negative results included.
+
+        Keys missing from the result must be computed and stored with set_many.
+        """
+        values = {}
+
+        for key, entry in self.backend.get_many(keys).items():
+            usable, value = self._read(key, entry)
+            if usable:
+                values[key] = value
+
+        return values
+
+    def set(self, key, value):
+        """
+        Store a value, None being a negative result, and release the lock key.
+        """
+        self.backend.set(key, *self._envelope(value))
+        self.backend.delete(self._lock_key(key))
+
+    def set_many(self, mapping):
+        """
+        Store several values, with the same jittered timeout.
+        """
+        if not mapping:
+            return
+
+        soft_timeout = self._jittered_timeout()
+        soft_expires_at = time() + soft_timeout
+        self.backend.set_many({key: (value, soft_expires_at) for key, value in mapping.items()}, soft_timeout * 2)
+        self.backend.delete_many([self._lock_key(key) for key in mapping])
+
+    def stats(self):
+        """
+        Return the usage counters of this process.
+        """
+        return dict(self.counters)
+
+    def _read(self, key, entry):
+        """
+        Return a tuple (usable, value) for an entry read from the cache.
+        """
+        if not isinstance(entry, tuple) or len(entry) != 2:
+            self.counters["misses"] += 1
+            return False, None
+
+        value, soft_expires_at = entry
+
+        if soft_expires_at <= time():
+            if self.backend.add(self._lock_key(key), 1, self.lock_timeout):
+                self.counters["refreshes"] += 1
+                return False, None
+
+            self.counters["stale_hits"] += 1
+        elif value is None:
+            self.counters["negative_hits"] += 1
+        else:
+            self.counters["hits"] += 1
+
+        return True, value
+
+    def _envelope(self, value):
+        """
+        Return the entry and the hard timeout used to store a value.
+        """
+        soft_timeout = self._jittered_timeout()
+        return (value, time() + soft_timeout), soft_timeout * 2
+
+    def _jittered_timeout(self):
+        """
+        Return the timeout changed by a random fraction of up to `jitter`.
+        """
+        return self.timeout * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    @staticmethod
+    def _lock_key(key):
+        """
+        Return the key used to elect the process that refreshes key.
+        """
+        return f"{key}-refresh-lock"
+
+
+def get_config_version():
+    """
+    Return the current version of the tenant configurations.
+
+    If the key is missing, for example after a cache eviction, a new version based on the
+    current time is stored so it is greater than any version handed out before.
+    """
+    version = cache.get(CONFIG_VERSION_CACHE_KEY)
+
+    if version is None:
+        cache.add(CONFIG_VERSION_CACHE_KEY, int(time() * 1000), None)
+        version = cache.get(CONFIG_VERSION_CACHE_KEY)
+
+    return version
+
+
+def bump_config_version():
+    """
+    Increase the version of the tenant configurations and return the new value.
+    """
+    try:
+        return cache.incr(CONFIG_VERSION_CACHE_KEY)
+    except ValueError:
+        # The key does not exist, a time based version is always newer than the lost one.
+        get_config_version()
+        return cache.incr(CONFIG_VERSION_CACHE_KEY)
@@ -9,3 +9,13 @@ DEFAULT_ALLOWED_AUTH_APPLICATIONS = [
     "cms-sso",
     "cms-sso-dev"
 ]
+# Ways to apply the tenant configurations on the settings object, see EOX_TENANT_SETTINGS_MODE
+SETTINGS_MODE_RESET = "reset"
+SETTINGS_MODE_OVERLAY = "overlay"
+SETTINGS_MODE_SNAPSHOT = "snapshot"
+SETTINGS_MODE_CONTEXT = "context"
+# What happened to the settings object when a request or task started, see eox_tenant.instrumentation
+TENANT_SWITCH_KEPT = "kept"
+TENANT_SWITCH_SWITCHED = "switched"
+TENANT_SWITCH_RESET = "reset"
+TENANT_SWITCH_BYPASSED = "bypassed"
@@ -0,0 +1,158 @@
+"""
+In-memory index of the domains served by the tenants.
+
+The index maps every Route.domain to its TenantConfig id and every Microsite.subdomain
+to its Microsite id. Since it covers all the known domains, a domain that is not in the
+index does not belong to any tenant and can be answered without a database query.
+"""
+import logging
+import threading
+from time import monotonic
+
+from django.conf import settings
+
+from eox_tenant.cache import get_config_version
+from eox_tenant.models import Microsite, Route
+
+LOG = logging.getLogger(__name__)
+
+TENANT_CONFIG_SOURCE = "tenant_config"
+MICROSITE_SOURCE = "microsite"
+
+
+class DomainIndex:  # pylint: disable=too-many-instance-attributes
+    """
+    Lazily built map of domain to the tenant that serves it.
+
+    Routes are updated one by one from the model signals, microsites are reloaded as a whole
+    since several of them can share a subdomain. The index is rebuilt after `timeout` seconds
+    or when the configuration version changes, so edits made by other processes are seen.
+    """
+
+    def __init__(self, timeout=300):
+        self.timeout = timeout
+        self.version = None
+        self.counters = {"hits": 0, "negative_hits": 0, "builds": 0}
+        self._routes = {}
+        self._route_domains = {}
+        self._microsites = {}
+        self._built_at = None
+        self._lock = threading.RLock()
+
+    def resolve(self, domain):
+        """
+        Return a tuple (source, id) for the tenant serving the domain, or None if it is unknown.
+
+        The source is TENANT_CONFIG_SOURCE for a TenantConfig id or MICROSITE_SOURCE for a Microsite id.
+        """
+        domain = domain.split(':')[0]
+
+        with self._lock:
+            if self._is_outdated():
+                self._build()
+
+            if domain in self._routes:
+                self.counters["hits"] += 1
+                return TENANT_CONFIG_SOURCE, self._routes[domain]
+
+            if domain in self._microsites:
+                self.counters["hits"] += 1
+                return MICROSITE_SOURCE, self._microsites[domain]
+
+            self.counters["negative_hits"] += 1
+            return None
+
+    def update_route(self, route, deleted=False):
+        """
+        Reflect the save or deletion of a Route in the index.
+        """
+        with self._lock:
+            if self._built_at is None:
+                return
+
+            old_domain = self._route_domains.pop(route.pk, None)
+            self._routes.pop(old_domain, None)
+
+            if not deleted:
+                self._routes[route.domain] = route.config_id
+                self._route_domains[route.pk] = route.domain
+
+    def update_microsites(self):
+        """
+        Reload the microsites part of the index.
+        """
+        with self._lock:
+            if self._built_at is None:
+                return
+
+            self._microsites = self._load_microsites()
+
+    def set_version(self, version):
+        """
+        Drop the index if it was built under a different configuration version.
+        """
+        with self._lock:
+            if version != self.version:
+                self.clear()
+                self.version = version
+
+    def clear(self):
+        """
+        Drop the index, it is built again on the next lookup.
+        """
+        with self._lock:
+            self._routes = {}
+            self._route_domains = {}
+            self._microsites = {}
+            self._built_at = None
+
+    def stats(self):
+        """
+        Return the usage counters of the index.
+        """
+        return dict(self.counters, domains=len(self._routes) + len(self._microsites))
+
+    def _is_outdated(self):
+        """
+        Whether the index must be built before answering a lookup.
+
+        The shared configuration version is checked first, so the edits made by other processes
+        drop the index even when the settings are not reset by EOX_TENANT_USE_CONFIG_VERSION.
+        """
+        self.set_version(get_config_version())
+
+        return self._built_at is None or monotonic() - self._built_at > self.timeout
+
+    def _build(self):
+        """
+        Load every route and microsite domain.
+        """
+        routes = {}
+        route_domains = {}
+
+        for pk, domain, config_id in Route.objects.values_list("pk", "domain", "config_id"):
+            routes[domain] = config_id
+            route_domains[pk] = domain
+
+        self._routes = routes
+        self._route_domains = route_domains
+        self._microsites = self._load_microsites()
+        self._built_at = monotonic()
+        self.counters["builds"] += 1
+        LOG.debug("Domain index built with %s routes and %s microsites", len(routes), len(self._microsites))
+
+    @staticmethod
+    def _load_microsites():
+        """
+        Return a dict of subdomain to microsite id, keeping the first microsite of a subdomain.
+        """
+        microsites = {}
+
+        for pk, subdomain in Microsite.objects.order_by("pk").values_list("pk", "subdomain"):
+            microsites.setdefault(subdomain, pk)
+
+        return microsites
+
+
+# Read at the beginning so this can not be modified by the tenant configs
+DOMAIN_INDEX = DomainIndex(timeout=getattr(settings, "EOX_TENANT_DOMAIN_INDEX_TIMEOUT", 300))
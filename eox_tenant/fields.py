@@ -0,0 +1,218 @@
+"""
+Model fields used by eox-tenant.
+"""
+import json
+import warnings
+from collections.abc import Mapping
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import models
+from django.db.models.fields.json import KeyTextTransform, KeyTransformFactory
+from django.db.models.functions import Cast
+from django.db.models.query import ModelIterable
+from django.db.models.query_utils import DeferredAttribute
+from jsonfield.fields import INVALID_JSON_WARNING, JSONField
+from jsonfield.json import JSONString, checked_loads
+
+# Read at the beginning so this can not be modified by the tenant configs
+EOX_TENANT_NATIVE_JSON_FIELDS = getattr(settings, "EOX_TENANT_NATIVE_JSON_FIELDS", False)
+CONFIG_KEY_MAX_LENGTH = 255
+# Set while LazyJSONModelIterable loads a row, so only model instances keep the JSON text
+LAZY_JSON_ROWS = ContextVar("eox_tenant_lazy_json_rows", default=False)
+
+
+class RawJSON(str):
+    """
+    JSON text read from the database that has not been decoded yet.
+    """
+
+
+def as_raw_json(value):
+    """
+    Return a value read with raw SQL from a JSON column as a RawJSON.
+
+    Text columns return the JSON text, native JSON columns may be decoded by the database driver.
+    """
+    if isinstance(value, str):
+        return RawJSON(value)
+
+    return value
+
+
+def config_key_expression(column, key):
+    """
+    Return the expression of the text of a top level key of a JSON column.
+
+    The indexes created by migrate_tenant_json_fields use the same expression, so it is
+    what filters on a config key must use to be answered by the index.
+    """
+    return Cast(KeyTextTransform(key, column), models.CharField(max_length=CONFIG_KEY_MAX_LENGTH))
+
+
+def decode_json(value, field=None):
+    """
+    Return the decoded value of a RawJSON, any other value is returned as it is.
+
+    Invalid JSON is returned as a JSONString, as jsonfield does.
+    """
+    if not isinstance(value, RawJSON):
+        return value
+
+    try:
+        return checked_loads(str(value))
+    except json.JSONDecodeError:
+        warnings.warn(INVALID_JSON_WARNING.format(field, value), RuntimeWarning)
+        return JSONString(value)
+
+
+class LazyJSONDescriptor(DeferredAttribute):
+    """
+    Decode the JSON text of the field the first time the attribute is read.
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+
+        value = super().__get__(instance, cls)
+
+        if isinstance(value, RawJSON):
+            value = decode_json(value, self.field)
+            instance.__dict__[self.field.attname] = value
+
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class LazyJSONModelIterable(ModelIterable):
+    """
+    Load model instances whose LazyJSONField columns keep the JSON text until they are read.
+    """
+
+    def __iter__(self):
+        rows = super().__iter__()
+
+        while True:
+            # The flag is only set while a row is converted, not while the caller uses it
+            token = LAZY_JSON_ROWS.set(True)
+
+            try:
+                instance = next(rows)
+            except StopIteration:
+                return
+            finally:
+                LAZY_JSON_ROWS.reset(token)
+
+            yield instance
+
+
+class LazyJSONQuerySet(models.QuerySet):
+    """
+    QuerySet of the models with LazyJSONField columns.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._iterable_class = LazyJSONModelIterable
+
+
+class LazyJSONField(JSONField):
+    """
+    JSONField that decodes its value on the first access instead of when the row is loaded.
+
+    Model instances loaded through a LazyJSONQuerySet decode the field when the attribute is
+    read, and save the columns that were never read as they were loaded. values(),
+    values_list() and instances loaded through other models are decoded right away, as
+    JSONField does.
+
+    The column type is always the text type of jsonfield, so migrations never convert it. With
+    EOX_TENANT_NATIVE_JSON_FIELDS the columns are expected to be converted to the native JSON
+    type of the database by the migrate_tenant_json_fields command, the values are sent to the
+    database as models.JSONField does and keys can be used in queries, as in
+    lms_configs__SITE_NAME="name".
+    """
+    descriptor_class = LazyJSONDescriptor
+
+    def get_transform(self, lookup_name):
+        transform = super().get_transform(lookup_name)
+
+        if transform is None and EOX_TENANT_NATIVE_JSON_FIELDS:
+            return KeyTransformFactory(lookup_name)
+
+        return transform
+
+    def from_db_value(self, value, expression, connection):
+        # Native JSON columns may already be decoded by the database driver
+        value = as_raw_json(value)
+
+        if LAZY_JSON_ROWS.get():
+            return value
+
+        return decode_json(value, self)
+
+    def pre_save(self, model_instance, add):
+        """
+        Columns that were never read are saved as they were loaded, without decoding them.
+        """
+        value = model_instance.__dict__.get(self.attname)
+
+        if isinstance(value, RawJSON):
+            return value
+
+        return super().pre_save(model_instance, add)
+
+    def get_prep_value(self, value):
+        """
+        RawJSON values are stored as they are in text columns. Native JSON columns get the
+        decoded value, adapted by get_db_prep_value.
+        """
+        if EOX_TENANT_NATIVE_JSON_FIELDS:
+            return decode_json(value, self)
+
+        if isinstance(value, RawJSON):
+            return str(value)
+
+        return super().get_prep_value(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        """
+        Native JSON columns get the value adapted by the database backend, as models.JSONField
+        does, since drivers binding the parameters on the server do not cast text to JSON.
+        """
+        if not EOX_TENANT_NATIVE_JSON_FIELDS:
+            return super().get_db_prep_value(value, connection, prepared)
+
+        if not prepared:
+            value = self.get_prep_value(value)
+
+        return connection.ops.adapt_json_value(value, self.dump_kwargs.get("cls"))
+
+
+class LazyJSONMapping(Mapping):
+    """
+    Read only mapping whose RawJSON values are decoded on the first access.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._data = dict(*args, **kwargs)
+
+    def __getitem__(self, key):
+        value = self._data[key]
+
+        if isinstance(value, RawJSON):
+            value = decode_json(value)
+            self._data[key] = value
+
+        return value
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._data!r})"
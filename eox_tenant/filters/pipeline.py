@@ -6,11 +6,26 @@ from openedx_filters import PipelineStep
 from openedx_filters.learning.filters import CertificateRenderStarted
 
 from eox_tenant.edxapp_wrapper.site_configuration_module import get_configuration_helpers
+from eox_tenant.org_index import ORG_INDEX
 from eox_tenant.organizations import get_organizations
 from eox_tenant.tenant_aware_functions.enrollments import filter_enrollments
 
 configuration_helpers = get_configuration_helpers()
 
+# Read at the beginning so this can not be modified by the tenant configs
+EOX_TENANT_USE_ORG_INDEX = getattr(settings, "EOX_TENANT_USE_ORG_INDEX", False)
+
+
+def _is_tenant_org(org):
+    """
+    Whether the org belongs to the current tenant, answered with the org index when it is enabled.
+    """
+    if EOX_TENANT_USE_ORG_INDEX and getattr(settings, "EDNX_TENANT_KEY", None) in ORG_INDEX.get_tenants(org):
+        return True
+
+    # The course_org_filter of the current tenant may not be synchronized yet
+    return org in get_organizations()
+
 
 class FilterUserCourseEnrollmentsByTenant(PipelineStep):
     """
@@ -53,11 +68,12 @@ class FilterRenderCertificatesByOrg(PipelineStep):
 
     def run_filter(self, context, custom_template, *args, **kwargs):  # pylint: disable=arguments-differ,unused-argument
         """Pipeline step that stops the certificate render process if course org is different to tenant orgs."""
-        org_filter = get_organizations()
-        # breakpoint()
-        for org in org_filter:
-            if context.get("course_id", "").startswith(f"course-v1:{org}+"):
-                return
+        namespace, _, course = str(context.get("course_id", "")).partition(":")
+        org, separator, _ = course.partition("+")
+
+        if namespace == "course-v1" and separator and _is_tenant_org(org):
+            return
+
         raise CertificateRenderStarted.RenderAlternativeInvalidCertificate(
             "You can't generate a certificate from this site.",
         )
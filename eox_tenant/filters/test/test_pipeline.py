@@ -133,6 +133,7 @@ class FilterRenderCertificatesByOrgTestCase(TestCase):
         [["eduNEXT"], False],
         [[], False],
         [["eduNEXT", "demo"], True],
+        [["dem"], False],
     )
     @ddt.unpack
     def test_filter_render_certificates_by_org(self, organizations, render, mock_get_organizations):
@@ -162,6 +163,38 @@ class FilterRenderCertificatesByOrgTestCase(TestCase):
             FilterRenderCertificatesByOrg.run_filter(self, context, {})
             mock_get_organizations.assert_called_once()
 
+    @ddt.data(
+        [frozenset(["tenant-key"]), [], True],
+        [frozenset(["other-key"]), [], False],
+        [frozenset(["other-key"]), ["demo"], True],
+    )
+    @ddt.unpack
+    @mock.patch("eox_tenant.filters.pipeline.ORG_INDEX")
+    @mock.patch("eox_tenant.filters.pipeline.EOX_TENANT_USE_ORG_INDEX", True)
+    @override_settings(EDNX_TENANT_KEY="tenant-key")
+    def test_filter_render_certificates_with_org_index(self, owners, organizations, render, org_index_mock):
+        """Test the certificates render answered with the org index.
+
+        Expected result:
+        - The certificate is rendered if the current tenant owns the course org, without
+          reading the organizations of the tenant.
+        - Otherwise the organizations of the tenant are checked, as they may not be in the index yet.
+        """
+        org_index_mock.get_tenants.return_value = owners
+        context = {"course_id": "course-v1:demo+01+01"}
+
+        with mock.patch("eox_tenant.filters.pipeline.get_organizations") as mock_get_organizations:
+            mock_get_organizations.return_value = organizations
+
+            if not render:
+                with self.assertRaises(CertificateRenderStarted.RenderAlternativeInvalidCertificate):
+                    FilterRenderCertificatesByOrg.run_filter(self, context, {})
+            else:
+                FilterRenderCertificatesByOrg.run_filter(self, context, {})
+
+        org_index_mock.get_tenants.assert_called_once_with("demo")
+        self.assertEqual(mock_get_organizations.called, "tenant-key" not in owners)
+
 
 class OrgAwareLMSURLStudioTestCase(TestCase):
     """
@@ -0,0 +1,302 @@
+"""
+Instrumentation of the tenant switches made by eox_tenant.signals.
+
+A worker pays a reset and an override of the settings object every time two consecutive
+requests come from different tenants. Every request or task records which tenant it was
+served for, whether the settings object already applied to that tenant could be kept and
+how long the switch took. This is what a load balancer needs to route by Host and to
+measure how much the routing improves the hit rate.
+
+The switch of the current request is exposed as response headers by
+eox_tenant.middleware.TenantAffinityMiddleware, and the counters of the worker by the
+eox-tenant-stats view when EOX_TENANT_ENABLE_WORKER_STATS is set.
+
+Timings
+=======
+
+The steps of a switch decorated with `timed` are measured and, once the outcome of the
+switch is known, sent to the sinks listed in EOX_TENANT_TIMING_SINKS together with the
+duration of the whole switch. A sink is the import path of a callable with the signature
+`sink(metric, duration, tags)`, where duration is in seconds and tags is a dict with the
+`tenant` and `outcome` keys. This module provides `log_sink` and `histogram_sink`, a statsd
+client can be plugged with a function like:
+
+    def statsd_sink(metric, duration, tags):
+        statsd.timing(metric, duration * 1000, tags=[f"{key}:{value}" for key, value in tags.items()])
+
+Nothing is measured when no sink is configured.
+"""
+import logging
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+from contextvars import ContextVar
+from functools import wraps
+from os import getpid
+from time import perf_counter
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from eox_tenant.constants import TENANT_SWITCH_BYPASSED, TENANT_SWITCH_KEPT, TENANT_SWITCH_RESET, TENANT_SWITCH_SWITCHED
+
+LOG = logging.getLogger(__name__)
+
+# Read at the beginning so this can not be modified by the tenant configs
+EOX_TENANT_TIMING_SINKS = getattr(settings, "EOX_TENANT_TIMING_SINKS", [])
+
+TIMING_METRIC_PREFIX = "eox_tenant"
+# Upper bounds, in milliseconds, of the buckets of the in-memory histogram
+HISTOGRAM_BUCKETS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, float("inf"))
+
+TenantSwitch = namedtuple("TenantSwitch", ["tenant_key", "domain", "outcome", "duration"])
+
+# Switch made for the current request or task
+CURRENT_SWITCH = ContextVar("eox_tenant_switch", default=None)
+# Steps measured during the switch in progress, as (metric, duration) tuples
+CURRENT_TIMINGS = ContextVar("eox_tenant_timings", default=None)
+
+
+class TenantSwitchStats:
+    """
+    Counters of the tenant switches made by this worker, grouped by outcome.
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._durations = {}
+        self._lock = threading.Lock()
+
+    def add(self, switch):
+        """
+        Count a switch and the time it took.
+        """
+        with self._lock:
+            self._counts[switch.outcome] = self._counts.get(switch.outcome, 0) + 1
+            self._durations[switch.outcome] = self._durations.get(switch.outcome, 0.0) + switch.duration
+
+    def clear(self):
+        """
+        Reset every counter.
+        """
+        with self._lock:
+            self._counts = {}
+            self._durations = {}
+
+    def stats(self):
+        """
+        Return the counters and the share of requests that kept the applied settings.
+        """
+        with self._lock:
+            total = sum(self._counts.values())
+            # Bypassed requests never look at the settings, so they do not count as hits or misses
+            switches = total - self._counts.get(TENANT_SWITCH_BYPASSED, 0)
+
+            return {
+                "pid": getpid(),
+                "total": total,
+                "hit_rate": self._counts.get(TENANT_SWITCH_KEPT, 0) / switches if switches else None,
+                "outcomes": {
+                    outcome: {
+                        "count": self._counts.get(outcome, 0),
+                        "total_ms": round(self._durations.get(outcome, 0.0) * 1000, 3),
+                    }
+                    for outcome in (
+                        TENANT_SWITCH_KEPT,
+                        TENANT_SWITCH_SWITCHED,
+                        TENANT_SWITCH_RESET,
+                        TENANT_SWITCH_BYPASSED,
+                    )
+                },
+            }
+
+
+class TimingHistogram:
+    """
+    Histogram of the durations sent to histogram_sink, grouped by metric, tenant and outcome.
+    """
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def add(self, metric, duration, tags):
+        """
+        Count a duration, in seconds, in the series of the metric and tags.
+        """
+        duration_ms = duration * 1000
+        key = (metric, tags.get("tenant"), tags.get("outcome"))
+
+        with self._lock:
+            series = self._series.get(key)
+
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "total_ms": 0.0, "max_ms": 0.0}
+
+            series["counts"][bisect_left(self.buckets, duration_ms)] += 1
+            series["total_ms"] += duration_ms
+            series["max_ms"] = max(series["max_ms"], duration_ms)
+
+    def clear(self):
+        """
+        Drop every series.
+        """
+        with self._lock:
+            self._series = {}
+
+    def stats(self):
+        """
+        Return a list with the bucket counts, total and maximum of every series.
+        """
+        with self._lock:
+            return [
+                {
+                    "metric": metric,
+                    "tenant": tenant,
+                    "outcome": outcome,
+                    "count": sum(series["counts"]),
+                    "total_ms": round(series["total_ms"], 3),
+                    "max_ms": round(series["max_ms"], 3),
+                    "buckets": {
+                        str(bucket): count for bucket, count in zip(self.buckets, series["counts"]) if count
+                    },
+                }
+                for (metric, tenant, outcome), series in self._series.items()
+            ]
+
+
+WORKER_STATS = TenantSwitchStats()
+TIMING_HISTOGRAM = TimingHistogram()
+_SINKS = None
+
+
+def log_sink(metric, duration, tags):
+    """
+    Timing sink that logs every duration.
+    """
+    LOG.info(
+        "PID: %s | %s took %.3f ms | tenant: %s | outcome: %s",
+        getpid(),
+        metric,
+        duration * 1000,
+        tags.get("tenant"),
+        tags.get("outcome"),
+    )
+
+
+def histogram_sink(metric, duration, tags):
+    """
+    Timing sink that keeps the durations in TIMING_HISTOGRAM, shown by the eox-tenant-stats view.
+    """
+    TIMING_HISTOGRAM.add(metric, duration, tags)
+
+
+def get_timing_sinks():
+    """
+    Return the sinks configured in EOX_TENANT_TIMING_SINKS, imported on the first call.
+    """
+    global _SINKS  # pylint: disable=global-statement
+
+    if _SINKS is None:
+        _SINKS = [import_string(path) if isinstance(path, str) else path for path in EOX_TENANT_TIMING_SINKS]
+
+    return _SINKS
+
+
+def emit_timing(metric, duration, tags):
+    """
+    Send a duration to every sink. A failing sink is logged and never breaks the request.
+    """
+    for sink in get_timing_sinks():
+        try:
+            sink(metric, duration, tags)
+        except Exception:  # pylint: disable=broad-except
+            LOG.exception("The timing sink %s failed", sink)
+
+
+def timed(name):
+    """
+    Decorator that measures a step of the tenant switch.
+
+    During a switch the duration is sent to the sinks when the switch is recorded, tagged
+    with its tenant and outcome. Outside of a switch it is sent right away without tags.
+    """
+    metric = f"{TIMING_METRIC_PREFIX}.{name}"
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not get_timing_sinks():
+                return func(*args, **kwargs)
+
+            start_time = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = perf_counter() - start_time
+                timings = CURRENT_TIMINGS.get()
+
+                if timings is None:
+                    emit_timing(metric, duration, {"tenant": None, "outcome": None})
+                else:
+                    timings.append((metric, duration))
+
+        return wrapper
+
+    return decorator
+
+
+def start_switch():
+    """
+    Start collecting the timings of the switch of the current request or task.
+    """
+    CURRENT_TIMINGS.set([] if get_timing_sinks() else None)
+
+
+def record_switch(tenant_key, domain, outcome, duration):
+    """
+    Store the switch made for the current request or task and add it to the worker counters.
+
+    Arguments:
+        tenant_key: key of the tenant applied, None if no tenant is applied.
+        domain: domain of the request or task.
+        outcome: TENANT_SWITCH_KEPT, TENANT_SWITCH_SWITCHED or TENANT_SWITCH_RESET.
+        duration: seconds spent preparing the settings.
+    """
+    switch = TenantSwitch(tenant_key, domain, outcome, duration)
+    CURRENT_SWITCH.set(switch)
+    WORKER_STATS.add(switch)
+
+    timings = CURRENT_TIMINGS.get()
+    CURRENT_TIMINGS.set(None)
+
+    if timings is not None:
+        tags = {"tenant": tenant_key, "outcome": outcome}
+        for metric, step_duration in timings:
+            emit_timing(metric, step_duration, tags)
+        emit_timing(f"{TIMING_METRIC_PREFIX}.tenant_switch", duration, tags)
+
+    LOG.debug(
+        "PID: %s | Tenant %s for %s | settings %s in %.3f ms",
+        getpid(),
+        tenant_key,
+        domain,
+        outcome,
+        duration * 1000,
+    )
+    return switch
+
+
+def get_current_switch():
+    """
+    Return the TenantSwitch of the current request or task, or None.
+    """
+    return CURRENT_SWITCH.get()
+
+
+def clear_current_switch():
+    """
+    Forget the switch of the current request or task.
+    """
+    CURRENT_SWITCH.set(None)
@@ -0,0 +1,198 @@
+"""
+Benchmark of the settings switch done by eox-tenant at the start of every request.
+"""
+import json
+import tracemalloc
+from collections import Counter
+from itertools import cycle, islice
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from eox_tenant.cache import TENANT_CACHE
+from eox_tenant.domain_index import DOMAIN_INDEX
+from eox_tenant.instrumentation import get_current_switch
+from eox_tenant.models import Microsite, Route, TenantConfig
+from eox_tenant.org_index import ORG_INDEX
+from eox_tenant.signals import EOX_TENANT_SETTINGS_MODE, SETTINGS_OVERLAY, SETTINGS_SNAPSHOTS, start_lms_tenant
+from eox_tenant.tenant_settings import deactivate_tenant_settings
+
+BENCHMARK_DOMAIN = "bench.test"
+SCENARIOS = ["same_tenant", "alternating", "round_robin", "unknown_host", "microsite"]
+
+
+class Command(BaseCommand):
+    """
+    Measure the time spent by the request_started receiver of eox-tenant.
+    """
+    help = """
+        Create synthetic tenants on a sqlite database and measure the time spent by the
+        request_started receiver of eox-tenant for several sequences of request hosts.
+        Every object created is rolled back at the end and the results are printed as JSON.
+
+        Scenarios:
+        - same_tenant: every request comes from the same tenant.
+        - alternating: requests alternate between two tenants.
+        - round_robin: requests cycle through every tenant.
+        - unknown_host: requests come from hosts without a tenant.
+        - microsite: requests cycle through tenants defined as microsites.
+
+        Usage Example:
+        python manage.py benchmark_tenant_switch --tenants 50 --config-size 200 --output bench.json
+    """
+
+    def add_arguments(self, parser):
+        """
+        Size of the synthetic data and scenarios to run.
+        """
+        parser.add_argument("--tenants", type=int, default=20, help="Number of synthetic tenants")
+        parser.add_argument("--config-size", type=int, default=50, help="Number of settings of every tenant")
+        parser.add_argument("--requests", type=int, default=500, help="Number of requests measured per scenario")
+        parser.add_argument("--warmup", type=int, default=20, help="Number of requests run before measuring")
+        parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+        parser.add_argument("--output", type=str, help="File where the JSON results are written")
+        parser.add_argument(
+            "--trace-memory",
+            action="store_true",
+            help="Report the peak memory allocated by the measured requests. Tracing slows down every request.",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Run every scenario inside a transaction that is rolled back.
+        """
+        if connection.vendor != "sqlite":
+            raise CommandError("The benchmark creates synthetic tenants and must run on a sqlite database.")
+
+        if options["tenants"] < 2:
+            raise CommandError("At least two tenants are required.")
+
+        results = {}
+
+        with transaction.atomic():
+            hosts = create_tenants(options["tenants"], options["config_size"])
+
+            for scenario in options["scenarios"]:
+                sequence = list(islice(cycle(hosts[scenario]), options["warmup"] + options["requests"]))
+                results[scenario] = run_scenario(sequence, options["warmup"], options["trace_memory"])
+
+            transaction.set_rollback(True)
+
+        reset_tenant_state()
+
+        report = json.dumps(
+            {
+                "settings_mode": EOX_TENANT_SETTINGS_MODE,
+                "tenants": options["tenants"],
+                "config_size": options["config_size"],
+                "requests": options["requests"],
+                "scenarios": results,
+            },
+            indent=2,
+        )
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                output.write(report)
+        else:
+            self.stdout.write(report)
+
+
+def create_tenants(tenants, config_size):
+    """
+    Create the synthetic tenant configs, routes and microsites.
+
+    Returns a dict with the hosts requested in every scenario.
+    """
+    tenant_hosts = []
+    microsite_hosts = []
+
+    for number in range(tenants):
+        config = {f"BENCHMARK_SETTING_{key}": f"value-{number}-{key}" for key in range(config_size)}
+        config.update({"EDNX_USE_SIGNAL": True, "PLATFORM_NAME": f"Tenant {number}"})
+
+        domain = f"tenant{number}.{BENCHMARK_DOMAIN}"
+        tenant_config = TenantConfig.objects.create(external_key=f"bench-tenant-{number}", lms_configs=config)
+        Route.objects.create(domain=domain, config=tenant_config)
+        tenant_hosts.append(domain)
+
+        subdomain = f"microsite{number}.{BENCHMARK_DOMAIN}"
+        Microsite.objects.create(key=f"bench-microsite-{number}", subdomain=subdomain, values=config)
+        microsite_hosts.append(subdomain)
+
+    return {
+        "same_tenant": tenant_hosts[:1],
+        "alternating": tenant_hosts[:2],
+        "round_robin": tenant_hosts,
+        "unknown_host": [f"unknown{number}.{BENCHMARK_DOMAIN}" for number in range(tenants)],
+        "microsite": microsite_hosts,
+    }
+
+
+def run_scenario(hosts, warmup, trace_memory=False):
+    """
+    Start a request for every host and return the statistics of the measured ones.
+    """
+    reset_tenant_state()
+
+    for host in hosts[:warmup]:
+        start_lms_tenant(None, {"HTTP_HOST": host})
+
+    durations = []
+    outcomes = Counter()
+
+    if trace_memory:
+        tracemalloc.start()
+
+    with CaptureQueriesContext(connection) as queries:
+        for host in hosts[warmup:]:
+            start_time = perf_counter()
+            start_lms_tenant(None, {"HTTP_HOST": host})
+            durations.append(perf_counter() - start_time)
+            outcomes[get_current_switch().outcome] += 1
+
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    durations.sort()
+
+    results = {
+        "mean_ms": round(sum(durations) / len(durations) * 1000, 4),
+        "p50_ms": round(percentile(durations, 50) * 1000, 4),
+        "p95_ms": round(percentile(durations, 95) * 1000, 4),
+        "p99_ms": round(percentile(durations, 99) * 1000, 4),
+        "max_ms": round(durations[-1] * 1000, 4),
+        "queries_per_request": round(len(queries) / len(durations), 4),
+        "outcomes": dict(outcomes),
+    }
+
+    if trace_memory:
+        results["peak_memory_kb"] = round(peak_memory / 1024, 2)
+
+    return results
+
+
+def percentile(values, percent):
+    """
+    Return the nearest-rank percentile of a sorted list.
+    """
+    index = max(0, -(-len(values) * percent // 100) - 1)
+    return values[int(index)]
+
+
+def reset_tenant_state():
+    """
+    Drop the tenant settings and every in-process cache, so scenarios do not affect each other.
+    """
+    deactivate_tenant_settings()
+    settings._setup()  # pylint: disable=protected-access
+    SETTINGS_OVERLAY.clear()
+    SETTINGS_SNAPSHOTS.clear()
+    TenantConfig.objects.clear_configurations_cache()
+    DOMAIN_INDEX.clear()
+    ORG_INDEX.clear()
+    TENANT_CACHE.clear_local()
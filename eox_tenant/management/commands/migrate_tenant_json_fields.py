@@ -0,0 +1,171 @@
+"""
+This module contains the command class to convert the JSON columns of the
+tenants to the native JSON type of the database.
+"""
+import json
+import logging
+import re
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, migrations, models
+from django.db.backends.utils import names_digest
+from django.db.migrations.state import ProjectState
+from jsonfield.fields import JSONField
+
+from eox_tenant import fields
+from eox_tenant.constants import LMS_CONFIG_COLUMN
+from eox_tenant.fields import config_key_expression
+from eox_tenant.models import Microsite, TenantConfig
+
+LOGGER = logging.getLogger(__name__)
+APP_LABEL = TenantConfig._meta.app_label  # pylint: disable=protected-access,no-member
+TENANT_CONFIG_TABLE = TenantConfig._meta.db_table  # pylint: disable=protected-access,no-member
+
+JSON_COLUMNS = [
+    (TenantConfig, LMS_CONFIG_COLUMN),
+    (TenantConfig, "studio_configs"),
+    (TenantConfig, "theming_configs"),
+    (TenantConfig, "meta"),
+    (Microsite, "values"),
+]
+
+
+class Command(BaseCommand):
+    """
+    Migrate the tenant JSON columns.
+    """
+    help = """
+        This command will convert the JSON columns of TenantConfig and Microsite from text
+        to the native JSON type of the database and index the lms_configs keys listed in
+        EOX_TENANT_NATIVE_JSON_INDEXED_KEYS, so TenantConfig.objects.filter_by_config_key
+        does not scan the whole table.
+
+        EOX_TENANT_NATIVE_JSON_FIELDS must be set before running it. Every row is checked
+        to hold valid JSON before the columns are changed.
+
+        Usage Example:
+        python manage.py lms migrate_tenant_json_fields
+        python manage.py lms migrate_tenant_json_fields --keys SITE_NAME EDNX_USE_SIGNAL
+        python manage.py lms migrate_tenant_json_fields --reverse
+    """
+
+    def add_arguments(self, parser):
+        """
+        The keys are optional, EOX_TENANT_NATIVE_JSON_INDEXED_KEYS is used by default.
+        """
+        parser.add_argument("--keys", nargs="+", type=str, help="lms_configs keys to index")
+        parser.add_argument(
+            "--reverse",
+            action="store_true",
+            help="Drop the indexes and convert the columns back to text",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Convert the columns and create or drop the key indexes.
+        """
+        if not options["reverse"] and not fields.EOX_TENANT_NATIVE_JSON_FIELDS:
+            raise CommandError("Set EOX_TENANT_NATIVE_JSON_FIELDS before converting the columns.")
+
+        keys = options["keys"] or getattr(settings, "EOX_TENANT_NATIVE_JSON_INDEXED_KEYS", [])
+
+        if not options["reverse"]:
+            check_json_values()
+
+        with connection.cursor() as cursor:
+            existing = set(connection.introspection.get_constraints(cursor, TENANT_CONFIG_TABLE))
+
+        with connection.schema_editor() as schema_editor:
+            for key in keys:
+                index = get_config_key_index(key)
+
+                if options["reverse"] and index.name in existing:
+                    schema_editor.remove_index(TenantConfig, index)
+
+            alter_json_columns(schema_editor, reverse=options["reverse"])
+
+            for key in keys:
+                index = get_config_key_index(key)
+
+                if not options["reverse"] and index.name not in existing:
+                    schema_editor.add_index(TenantConfig, index)
+                    LOGGER.info("Created the index %s of the key %s", index.name, key)
+
+
+def check_json_values():
+    """
+    Raise a CommandError if some row does not hold valid JSON, since the database would reject it.
+
+    The text of the columns is read with a raw query, so the fields do not decode or fix it.
+    """
+    invalid = []
+
+    with connection.cursor() as cursor:
+        for model, column in JSON_COLUMNS:
+            opts = model._meta  # pylint: disable=protected-access,no-member
+            cursor.execute(
+                f"SELECT {connection.ops.quote_name(opts.pk.column)}, {connection.ops.quote_name(column)} "
+                f"FROM {connection.ops.quote_name(opts.db_table)}"
+            )
+
+            for pk, value in cursor.fetchall():
+                if value is None:
+                    continue
+
+                try:
+                    json.loads(value)
+                except json.JSONDecodeError:
+                    invalid.append(f"{model.__name__} {pk} {column}")
+
+    if invalid:
+        raise CommandError(f"Fix the invalid JSON before converting the columns: {', '.join(invalid)}")
+
+
+def alter_json_columns(schema_editor, reverse=False):
+    """
+    Convert the JSON columns to the native JSON type, or back to text on reverse.
+
+    The columns are altered with AlterField operations chained over a project state, since sqlite
+    rebuilds the whole table from the model state and would otherwise undo the previous columns.
+    """
+    from_state = ProjectState.from_apps(apps)
+
+    if reverse:
+        for operation in get_column_operations(native=True):
+            operation.state_forwards(APP_LABEL, from_state)
+
+    for operation in get_column_operations(native=not reverse):
+        to_state = from_state.clone()
+        operation.state_forwards(APP_LABEL, to_state)
+        operation.database_forwards(APP_LABEL, schema_editor, from_state, to_state)
+        from_state = to_state
+
+        LOGGER.info("Converted %s.%s", operation.model_name, operation.name)
+
+
+def get_column_operations(native):
+    """
+    Return the AlterField operations that give the JSON columns their native or text type.
+    """
+    return [
+        migrations.AlterField(
+            model_name=model.__name__.lower(),
+            name=column,
+            field=models.JSONField(blank=True, default=dict) if native else JSONField(blank=True, default={}),
+        )
+        for model, column in JSON_COLUMNS
+    ]
+
+
+def get_config_key_index(key):
+    """
+    Return the index of the text of a top level key of lms_configs.
+    """
+    name = re.sub(r"[^a-z0-9]", "", key.lower())[:10]
+
+    return models.Index(
+        config_key_expression(LMS_CONFIG_COLUMN, key),
+        name=f"eoxt_{name}_{names_digest(key, length=8)}",
+    )
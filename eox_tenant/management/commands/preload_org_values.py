@@ -0,0 +1,70 @@
+"""
+This module contains the command class to warm up the cache of the
+organization values read by TenantSiteConfigProxy.get_value_for_org.
+"""
+import logging
+
+from django.core.management.base import BaseCommand
+
+from eox_tenant.models import Microsite, TenantConfig
+from eox_tenant.tenant_wise.proxies import TenantSiteConfigProxy
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Preload organization values.
+    """
+    help = """
+        This command will store in the cache the value of the given keys for every
+        organization with a value, as read by get_value_for_org while the given tenants
+        are active. The tenants must be given with --tenant-key or --all-tenants.
+
+        Usage Example:
+        python manage.py lms preload_org_values LMS_ROOT_URL PLATFORM_NAME --all-tenants
+        python manage.py lms preload_org_values LMS_ROOT_URL --tenant-key tenant-a --tenant-key tenant-b
+    """
+
+    def add_arguments(self, parser):
+        """
+        Either the tenant keys or --all-tenants are required.
+        """
+        parser.add_argument("val_names", nargs="+", type=str)
+        tenants = parser.add_mutually_exclusive_group(required=True)
+        tenants.add_argument(
+            "--tenant-key",
+            action="append",
+            dest="tenant_keys",
+            help="Preload the keys read while this tenant is active",
+        )
+        tenants.add_argument(
+            "--all-tenants",
+            action="store_true",
+            dest="all_tenants",
+            help="Preload the keys read by every tenant and by requests without a tenant",
+        )
+        parser.add_argument("--batch-size", type=int, default=500, dest="batch_size")
+
+    def handle(self, *args, **options):
+        """
+        Preload every value name, even if it was preloaded before.
+        """
+        tenant_keys = options["tenant_keys"]
+
+        if options["all_tenants"]:
+            tenant_keys = [
+                None,
+                *TenantConfig.objects.values_list("external_key", flat=True),
+                *Microsite.objects.values_list("key", flat=True),
+            ]
+
+        for val_name in options["val_names"]:
+            written = TenantSiteConfigProxy.pre_load_values_by_org(
+                val_name,
+                tenant_keys=tenant_keys,
+                batch_size=options["batch_size"],
+                force=True,
+            )
+
+            LOGGER.info("Preloaded %s keys for %s.", written, val_name)
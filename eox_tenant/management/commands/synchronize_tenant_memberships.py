@@ -0,0 +1,77 @@
+"""
+This module contains the command class to fill the
+TenantMembership table from the signup sources.
+"""
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from eox_tenant import models
+from eox_tenant.utils import synchronize_tenant_memberships
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Synchronize tenant memberships.
+    """
+    help = """
+        This command will make the TenantMembership rows of every tenant match
+        the users with a signup source on the domains of the tenant.
+
+        Run it before enabling EOX_TENANT_USE_TENANT_MEMBERSHIPS, afterwards the
+        rows are kept up to date by the signals.
+
+        Usage Example:
+        python manage.py lms synchronize_tenant_memberships
+        python manage.py lms synchronize_tenant_memberships --model TenantConfig --key tenant-key
+    """
+
+    def add_arguments(self, parser):
+        """
+        The model and key parameters are optional.
+        """
+        parser.add_argument(
+            "--model",
+            type=str,
+            required=False,
+            dest="model"
+        )
+        parser.add_argument(
+            "--key",
+            type=str,
+            required=False,
+            dest="key",
+            help="external_key of the TenantConfig or key of the Microsite to synchronize",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Synchronize the memberships of the tenants.
+        """
+        option_model = options.get("model")
+        valid_models = {"TenantConfig": "external_key", "Microsite": "key"}
+
+        if option_model and option_model in valid_models:
+            valid_models = {option_model: valid_models[option_model]}
+        elif option_model:
+            raise CommandError("Invalid model")
+
+        for valid_model, key_field in valid_models.items():
+            queryset = getattr(models, valid_model).objects.all()
+
+            if options.get("key"):
+                queryset = queryset.filter(**{key_field: options["key"]})
+
+            for instance in queryset.iterator():
+                created, deleted = synchronize_tenant_memberships(instance)
+                LOGGER.info(
+                    "Synchronize %s %s: %s memberships created, %s deleted.",
+                    valid_model,
+                    getattr(instance, key_field),
+                    created,
+                    deleted,
+                )
+
+        LOGGER.info("Successful Synchronization.")
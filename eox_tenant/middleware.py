@@ -17,15 +17,84 @@ from django.utils.deprecation import MiddlewareMixin
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import CourseKey
 
+from eox_tenant.bypass import REQUEST_BYPASS
+from eox_tenant.constants import TENANT_SWITCH_KEPT
 from eox_tenant.edxapp_wrapper.edxmako_module import get_edxmako_module
 from eox_tenant.edxapp_wrapper.site_configuration_module import get_configuration_helpers
 from eox_tenant.edxapp_wrapper.theming_helpers import get_theming_helpers
+from eox_tenant.instrumentation import clear_current_switch, get_current_switch
+from eox_tenant.org_index import ORG_INDEX
+from eox_tenant.organizations import get_organizations
 from eox_tenant.tenant_wise.proxies import TenantSiteConfigProxy
 
 configuration_helpers = get_configuration_helpers()
 theming_helper = get_theming_helpers()
 HOST_VALIDATION_RE = re.compile(r"^(?:[0-9]{1,3}\.){3}[0-9]{1,3}(:[0-9]{2,5})?$")
 LOG = logging.getLogger(__name__)
+REGEX_SPECIAL_CHARS = frozenset(".^$*+?{}[]\\|()")
+
+# Read at the beginning so this can not be modified by the tenant configs
+EOX_TENANT_USE_ORG_INDEX = getattr(settings, "EOX_TENANT_USE_ORG_INDEX", False)
+
+
+def _group_end(pattern, start):
+    """
+    Return the index of the parenthesis closing the group opened at start, or None if it is not closed.
+    """
+    depth = 0
+    in_class = False
+    index = start
+
+    while index < len(pattern):
+        char = pattern[index]
+
+        if char == "\\":
+            index += 1
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if not depth:
+                return index
+
+        index += 1
+
+    return None
+
+
+def _literal_prefix(pattern):
+    """
+    Return the literal text every match of the regex pattern starts with, or an empty string
+    if it can not be told without running the regex.
+    """
+    if "|" in pattern:
+        return ""
+
+    start = len(pattern) - len(pattern.lstrip("("))
+
+    for index in range(start):
+        end = _group_end(pattern, index)
+
+        # A quantified group may be skipped or repeated
+        if end is None or pattern[end + 1:end + 2] in ("?", "*", "+", "{"):
+            return ""
+
+    prefix = []
+
+    for char in pattern[start:]:
+        if char in REGEX_SPECIAL_CHARS:
+            # The last character is optional
+            if char in "?*{" and prefix:
+                prefix.pop()
+            break
+
+        prefix.append(char)
+
+    return "".join(prefix)
 
 
 class MicrositeCrossBrandingFilterMiddleware(MiddlewareMixin):
@@ -34,28 +103,46 @@ class MicrositeCrossBrandingFilterMiddleware(MiddlewareMixin):
     on a different microsite with a different branding.
     """
 
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self._matcher = (None, None, ())
+        self._get_matcher()
+
     def process_request(self, request):
         """
         Raise an 404 exception if the course being rendered belongs to an ORG in a
         microsite, but it is not the current microsite
         """
         path = request.path_info
-        restricted_courses_pattern = "|".join(settings.EOX_TENANT_RESTRICTED_COURSE_PATTERNS)
-        regex_path_match = re.compile(
-            f'/({restricted_courses_pattern})/{settings.COURSE_ID_PATTERN}',
-        )
-        matched_regex = regex_path_match.match(path)
+        matcher, prefixes = self._get_matcher()
+
+        # Paths outside of every restricted pattern are discarded without running the regex
+        if (
+            matcher is None
+            or (prefixes and not path.startswith(prefixes))
+            or (REQUEST_BYPASS and REQUEST_BYPASS.matches_request(request))
+        ):
+            return None
+
+        matched_regex = matcher.match(path)
 
         # If there is no match, then we are not in a ORG-restricted area
         if matched_regex is None:
             return None
 
+        # No tenant owns an org, so there is nothing to restrict
+        if EOX_TENANT_USE_ORG_INDEX and not ORG_INDEX.get_all_orgs():
+            return None
+
         course_id = matched_regex.group('course_id')
         try:
             course_key = CourseKey.from_string(course_id)
         except InvalidKeyError as error:
             raise Http404 from error
 
+        if EOX_TENANT_USE_ORG_INDEX:
+            return self._check_org_index(course_key.org)
+
         # If the course org is the same as the current microsite
         org_filter = configuration_helpers.get_current_site_orgs()
 
@@ -70,6 +157,51 @@ class MicrositeCrossBrandingFilterMiddleware(MiddlewareMixin):
         # We could log some of the output here for forensic analysis
         raise Http404
 
+    def _get_matcher(self):
+        """
+        Return the compiled regex of the restricted course paths and the tuple of literal
+        prefixes every matching path starts with, or an empty tuple if some pattern has none.
+
+        Both are built again only when EOX_TENANT_RESTRICTED_COURSE_PATTERNS or
+        COURSE_ID_PATTERN change.
+        """
+        patterns = tuple(getattr(settings, "EOX_TENANT_RESTRICTED_COURSE_PATTERNS", ()))
+        course_id_pattern = getattr(settings, "COURSE_ID_PATTERN", None)
+        matcher_key, matcher, prefixes = self._matcher
+
+        if matcher_key != (patterns, course_id_pattern):
+            matcher = None
+            prefixes = ()
+
+            if patterns and course_id_pattern:
+                matcher = re.compile(f'/({"|".join(patterns)})/{course_id_pattern}')
+                literal_prefixes = tuple(_literal_prefix(pattern) for pattern in patterns)
+
+                if all(literal_prefixes):
+                    prefixes = tuple(f"/{prefix}" for prefix in literal_prefixes)
+
+            # Replaced at once, so concurrent requests never see a regex with the prefixes of another
+            self._matcher = ((patterns, course_id_pattern), matcher, prefixes)
+
+        return matcher, prefixes
+
+    @staticmethod
+    def _check_org_index(org):
+        """
+        Same check as process_request, answered with the org index: the course is shown if
+        no tenant owns its org or if the current tenant is one of the owners.
+        """
+        owners = ORG_INDEX.get_tenants(org)
+
+        if not owners or getattr(settings, "EDNX_TENANT_KEY", None) in owners:
+            return None
+
+        # The course_org_filter of the current tenant may not be synchronized yet
+        if org in get_organizations():
+            return None
+
+        raise Http404
+
 
 class AvailableScreenMiddleware(MiddlewareMixin):
     """
@@ -81,6 +213,9 @@ class AvailableScreenMiddleware(MiddlewareMixin):
         This middleware handles redirections and error pages according to the
         business logic at edunext
         """
+        if REQUEST_BYPASS and REQUEST_BYPASS.matches_request(request):
+            return None
+
         domain = request.META.get('HTTP_HOST', "")
 
         if (
@@ -115,3 +250,32 @@ class CurrentSiteMiddleware(MiddlewareMixin):
         site = get_current_site(request)
         site.configuration = TenantSiteConfigProxy()
         request.site = site
+
+
+class TenantAffinityMiddleware(MiddlewareMixin):
+    """
+    Middleware class that adds to the response the tenant switch made for the request.
+
+    The headers let a load balancer or a log pipeline see which tenant a worker served, whether
+    the settings object already applied to that tenant was kept and how long preparing it took:
+
+    - X-EoxTenant-Key: key of the tenant applied.
+    - X-EoxTenant-Settings: "hit" if the settings were kept, "miss" otherwise.
+    - X-EoxTenant-Switch-Ms: milliseconds spent preparing the settings.
+    """
+
+    def process_response(self, request, response):  # pylint: disable=unused-argument
+        """
+        Add the headers of the tenant switch of this request.
+        """
+        switch = get_current_switch()
+        clear_current_switch()
+
+        if switch is None:
+            return response
+
+        response["X-EoxTenant-Key"] = switch.tenant_key or ""
+        response["X-EoxTenant-Settings"] = "hit" if switch.outcome == TENANT_SWITCH_KEPT else "miss"
+        response["X-EoxTenant-Switch-Ms"] = f"{switch.duration * 1000:.3f}"
+
+        return response
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:03
+
+import django.db.models.deletion
+import jsonfield.fields
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_organization_values(apps, schema_editor):
+    """
+    Copy the org-addressable values of the existing tenants.
+    """
+    tenant_organization_value = apps.get_model("eox_tenant", "TenantOrganizationValue")
+    keys = getattr(settings, "EOX_TENANT_ORG_ADDRESSABLE_KEYS", ["LMS_ROOT_URL", "PLATFORM_NAME"])
+    sources = [
+        ("tenant_config", apps.get_model("eox_tenant", "TenantConfig"), "external_key", "lms_configs"),
+        ("microsite", apps.get_model("eox_tenant", "Microsite"), "key", "values"),
+    ]
+
+    for source, model, key_field, config_field in sources:
+        for instance in model.objects.iterator():
+            config = getattr(instance, config_field) or {}
+            orgs = config.get("course_org_filter", [])
+
+            if isinstance(orgs, str):
+                orgs = [orgs]
+
+            tenant_organization_value.objects.bulk_create([
+                tenant_organization_value(
+                    org=org,
+                    key=key,
+                    value=config[key],
+                    tenant_key=getattr(instance, key_field),
+                    **{source: instance}
+                )
+                for org in orgs
+                for key in keys
+                if config.get(key) is not None
+            ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eox_tenant', '0008_synchronize_tenants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantOrganizationValue',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('org', models.CharField(max_length=100)),
+                ('key', models.CharField(max_length=255)),
+                ('value', jsonfield.fields.JSONField(blank=True, null=True)),
+                ('tenant_key', models.CharField(max_length=63)),
+                ('microsite', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='eox_tenant.microsite')),
+                ('tenant_config', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='eox_tenant.tenantconfig')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['org', 'key'], name='eox_tenant__org_015594_idx')],
+            },
+        ),
+        migrations.RunPython(populate_organization_values, migrations.RunPython.noop),
+    ]
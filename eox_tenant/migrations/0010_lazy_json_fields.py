@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:34
+
+from django.db import migrations
+
+import eox_tenant.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eox_tenant', '0009_tenantorganizationvalue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='microsite',
+            name='values',
+            field=eox_tenant.fields.LazyJSONField(blank=True, default={}),
+        ),
+        migrations.AlterField(
+            model_name='tenantconfig',
+            name='lms_configs',
+            field=eox_tenant.fields.LazyJSONField(blank=True, default={}),
+        ),
+        migrations.AlterField(
+            model_name='tenantconfig',
+            name='meta',
+            field=eox_tenant.fields.LazyJSONField(blank=True, default={}),
+        ),
+        migrations.AlterField(
+            model_name='tenantconfig',
+            name='studio_configs',
+            field=eox_tenant.fields.LazyJSONField(blank=True, default={}),
+        ),
+        migrations.AlterField(
+            model_name='tenantconfig',
+            name='theming_configs',
+            field=eox_tenant.fields.LazyJSONField(blank=True, default={}),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eox_tenant', '0010_lazy_json_fields'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantMembership',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('microsite', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='eox_tenant.microsite')),
+                ('tenant_config', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='eox_tenant.tenantconfig')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tenant_config', 'user'), name='eox_tenant_unique_config_member'), models.UniqueConstraint(fields=('microsite', 'user'), name='eox_tenant_unique_microsite_member')],
+            },
+        ),
+    ]
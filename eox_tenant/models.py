@@ -3,15 +3,57 @@ Model to store a microsite in the database.
 The object is stored as a json representation of the python dict
 that would have been used in the settings.
 """
-import collections
-import json
 
 import six
+from django.conf import settings
 from django.db import connection, models
 from django.utils.translation import gettext_lazy as _
 from jsonfield.fields import JSONField
 
+from eox_tenant.cache import LRUCache
 from eox_tenant.constants import CMS_CONFIG_COLUMN, LMS_CONFIG_COLUMN
+from eox_tenant.fields import (
+    LazyJSONField,
+    LazyJSONMapping,
+    LazyJSONQuerySet,
+    as_raw_json,
+    config_key_expression,
+    decode_json,
+)
+
+# Decoded configurations by domain. Read at the beginning so this can not be modified by the tenant configs
+TENANT_CONFIG_CACHE = LRUCache(
+    maxsize=getattr(settings, "EOX_TENANT_CONFIG_CACHE_SIZE", 2048),
+    timeout=getattr(settings, "EOX_TENANT_CONFIG_CACHE_TIMEOUT", 60),
+)
+# Keys stored in TenantOrganizationValue. Read at the beginning so this can not be modified by the tenant configs
+ORG_ADDRESSABLE_KEYS = frozenset(
+    getattr(settings, "EOX_TENANT_ORG_ADDRESSABLE_KEYS", ["LMS_ROOT_URL", "PLATFORM_NAME"])
+)
+
+
+def pick_values_by_org(rows, val_name, current_key):
+    """
+    Return a dict of org to the value of val_name, from rows of (org, key, config).
+
+    The value of the row whose key is current_key is prioritized, else the first valid
+    value of every org is used, as in get_value_for_org.
+    """
+    first_values = {}
+    current_values = {}
+
+    for org, key, config in rows:
+        value = decode_json(config).get(val_name)
+        if value is None:
+            continue
+
+        if key == current_key:
+            current_values.setdefault(org, value)
+        else:
+            first_values.setdefault(org, value)
+
+    first_values.update(current_values)
+    return first_values
 
 
 class TenantOrganization(models.Model):
@@ -50,9 +92,11 @@ class Microsite(models.Model):
     """
     key = models.CharField(max_length=63, db_index=True)
     subdomain = models.CharField(max_length=127, db_index=True)
-    values = JSONField(blank=True, default={}, load_kwargs={'object_pairs_hook': collections.OrderedDict})
+    values = LazyJSONField(blank=True, default={})
     organizations = models.ManyToManyField(TenantOrganization, blank=True)
 
+    objects = LazyJSONQuerySet.as_manager()
+
     class Meta:
         """
         Model meta class.
@@ -86,9 +130,7 @@ class Microsite(models.Model):
 
         # remove any port number from the hostname
         domain = domain.split(':')[0]
-        microsites = cls.objects.filter(subdomain=domain)
-
-        return microsites[0] if microsites else None
+        return cls.objects.filter(subdomain=domain).first()
 
     @classmethod
     def get_value_for_org(cls, org, val_name, current_microsite):
@@ -105,7 +147,7 @@ class Microsite(models.Model):
         Returns:
             The value for the given key and org.
         """
-        results = cls.objects.filter(organizations__name=org)
+        results = cls.objects.filter(organizations__name=org).only("key", "values")
         first_result = None
 
         for result in results:
@@ -121,13 +163,66 @@ class Microsite(models.Model):
 
         return first_result
 
+    @classmethod
+    def get_values_for_orgs(cls, orgs, val_name, current_microsite):
+        """
+        Bulk version of get_value_for_org, resolved with a single query.
+
+        Args:
+            orgs: List of strings.
+            val_name: String.
+            current_microsite: String
+        Returns:
+            A dict of org to value, orgs without a value are left out.
+        """
+        rows = cls.objects.filter(organizations__name__in=orgs).order_by("pk").values_list(
+            "organizations__name",
+            "key",
+            "values",
+        )
+
+        return pick_values_by_org(rows, val_name, current_microsite)
 
-class TenantConfigManager(models.Manager):
+
+class TenantConfigManager(models.Manager.from_queryset(LazyJSONQuerySet)):
     """
     Custom managaer for Tenant Config model.
     """
 
     def get_configurations(self, domain):
+        """
+        Get the site configurations for a domain.
+
+        The configurations are kept in an in-process cache, so the returned mapping is
+        shared between calls and must be treated as read only. Every JSON column is
+        decoded the first time it is read.
+        """
+        configurations = TENANT_CONFIG_CACHE.get(domain)
+
+        if configurations is None:
+            configurations = self._get_configurations_from_db(domain)
+
+            if configurations:
+                TENANT_CONFIG_CACHE.set(domain, configurations)
+
+        return configurations
+
+    def filter_by_config_key(self, key, value, column=LMS_CONFIG_COLUMN):
+        """
+        Return the tenant configs whose top level key of the JSON column has the given text value.
+
+        The filter uses the expression of the indexes created by migrate_tenant_json_fields.
+        Postgres needs the columns converted to the native JSON type.
+        """
+        return self.alias(config_key=config_key_expression(column, key)).filter(config_key=value)
+
+    def clear_configurations_cache(self):
+        """
+        Drop every configuration stored in the in-process cache.
+        """
+        TENANT_CONFIG_CACHE.clear()
+
+    def _get_configurations_from_db(self, domain):
         """
         Execute optimized query to get site configurations.
         """
@@ -149,14 +244,15 @@ class TenantConfigManager(models.Manager):
             # Using fetchone since the query will return one configuration per domain at the most.
             row = cursor.fetchone()
             if row:
-                configurations = {
+                # Only the columns read by the caller are decoded
+                configurations = LazyJSONMapping({
                     "id": row[0],
                     "external_key": row[1],
-                    LMS_CONFIG_COLUMN: json.loads(row[2]),
-                    CMS_CONFIG_COLUMN: json.loads(row[3]),
-                    "theming_configs": json.loads(row[4]),
-                    "meta": json.loads(row[5]),
-                }
+                    LMS_CONFIG_COLUMN: as_raw_json(row[2]),
+                    CMS_CONFIG_COLUMN: as_raw_json(row[3]),
+                    "theming_configs": as_raw_json(row[4]),
+                    "meta": as_raw_json(row[5]),
+                })
 
         return configurations
 
@@ -167,10 +263,10 @@ class TenantConfig(models.Model):
     """
 
     external_key = models.CharField(max_length=63, db_index=True)
-    lms_configs = JSONField(blank=True, default={}, load_kwargs={'object_pairs_hook': collections.OrderedDict})
-    studio_configs = JSONField(blank=True, default={}, load_kwargs={'object_pairs_hook': collections.OrderedDict})
-    theming_configs = JSONField(blank=True, default={}, load_kwargs={'object_pairs_hook': collections.OrderedDict})
-    meta = JSONField(blank=True, default={}, load_kwargs={'object_pairs_hook': collections.OrderedDict})
+    lms_configs = LazyJSONField(blank=True, default={})
+    studio_configs = LazyJSONField(blank=True, default={})
+    theming_configs = LazyJSONField(blank=True, default={})
+    meta = LazyJSONField(blank=True, default={})
     organizations = models.ManyToManyField(TenantOrganization, blank=True)
 
     class Meta:
@@ -227,7 +323,7 @@ class TenantConfig(models.Model):
         Returns:
             The value for the given key and org.
         """
-        results = cls.objects.filter(organizations__name=org)
+        results = cls.objects.filter(organizations__name=org).only("external_key", "lms_configs")
         first_result = None
 
         for result in results:
@@ -243,6 +339,26 @@ class TenantConfig(models.Model):
 
         return first_result
 
+    @classmethod
+    def get_values_for_orgs(cls, orgs, val_name, current_tenant):
+        """
+        Bulk version of get_value_for_org, resolved with a single query.
+
+        Args:
+            orgs: List of strings.
+            val_name: String.
+            current_tenant: String
+        Returns:
+            A dict of org to value, orgs without a value are left out.
+        """
+        rows = cls.objects.filter(organizations__name__in=orgs).order_by("pk").values_list(
+            "organizations__name",
+            "external_key",
+            "lms_configs",
+        )
+
+        return pick_values_by_org(rows, val_name, current_tenant)
+
 
 class Route(models.Model):
     """
@@ -265,3 +381,137 @@ class Route(models.Model):
         Model meta class.
         """
         app_label = "eox_tenant"
+
+
+class TenantOrganizationValue(models.Model):
+    """
+    Denormalized copy of the org-addressable values of every TenantConfig and Microsite.
+
+    There is a row per organization in the course_org_filter of a tenant and per key of
+    ORG_ADDRESSABLE_KEYS present in its configurations, so get_value_for_org can read a
+    single indexed row instead of decoding the configurations of every tenant of the org.
+    The rows are written by synchronize_tenant_organizations.
+    """
+
+    org = models.CharField(max_length=100)
+    key = models.CharField(max_length=255)
+    value = JSONField(blank=True, null=True)
+    tenant_key = models.CharField(max_length=63)
+    tenant_config = models.ForeignKey(TenantConfig, null=True, blank=True, on_delete=models.CASCADE)
+    microsite = models.ForeignKey(Microsite, null=True, blank=True, on_delete=models.CASCADE)
+
+    class Meta:
+        """
+        Model meta class.
+        """
+        app_label = "eox_tenant"
+        indexes = [
+            models.Index(fields=["org", "key"]),
+        ]
+
+    def __str__(self):
+        return f"<Org value: {self.org} {self.key} {self.tenant_key}>"
+
+    @classmethod
+    def get_values_for_orgs(cls, orgs, val_name, current_tenant):
+        """
+        Return a dict of org to value with the precedence of the get_value_for_org methods:
+        the TenantConfig values first, prioritizing the current tenant, then the Microsite ones.
+
+        Args:
+            orgs: List of strings.
+            val_name: String, one of ORG_ADDRESSABLE_KEYS.
+            current_tenant: String
+        """
+        tenant_config_rows = []
+        microsite_rows = []
+
+        rows = cls.objects.filter(org__in=orgs, key=val_name).order_by("tenant_config_id", "microsite_id").values_list(
+            "org",
+            "tenant_key",
+            "value",
+            "tenant_config_id",
+        )
+
+        for org, tenant_key, value, tenant_config_id in rows:
+            row = (org, tenant_key, {val_name: value})
+            if tenant_config_id is None:
+                microsite_rows.append(row)
+            else:
+                tenant_config_rows.append(row)
+
+        values = pick_values_by_org(microsite_rows, val_name, current_tenant)
+        values.update(pick_values_by_org(tenant_config_rows, val_name, current_tenant))
+
+        return values
+
+
+class TenantMembershipManager(models.Manager):
+    """
+    Readers of the users that signed up on every tenant.
+    """
+
+    def for_tenant(self, tenant_key):
+        """
+        Return the memberships of the TenantConfig or Microsite with the given key.
+        """
+        return self.filter(
+            models.Q(tenant_config__in=TenantConfig.objects.filter(external_key=tenant_key).values("pk"))
+            | models.Q(microsite__in=Microsite.objects.filter(key=tenant_key).values("pk"))
+        )
+
+    def get_user_ids(self, tenant_key):
+        """
+        Return the ids of the users that belong to the tenant.
+        """
+        return self.for_tenant(tenant_key).values_list("user_id", flat=True).distinct()
+
+    def get_tenant_keys(self, user_id):
+        """
+        Return the keys of the tenants the user belongs to.
+        """
+        keys = set()
+
+        for external_key, microsite_key in self.filter(user_id=user_id).values_list(
+            "tenant_config__external_key",
+            "microsite__key",
+        ):
+            keys.add(external_key or microsite_key)
+
+        return keys
+
+    def is_member(self, user_id, tenant_key):
+        """
+        Whether the user belongs to the tenant.
+        """
+        return self.for_tenant(tenant_key).filter(user_id=user_id).exists()
+
+
+class TenantMembership(models.Model):
+    """
+    Users that belong to every TenantConfig and Microsite.
+
+    There is a row per user and tenant served at the site of one of the signup sources of
+    the user, so the users of a tenant, or the tenants of a user, are read with an indexed
+    lookup instead of scanning the signup sources by site. The rows are written by
+    synchronize_tenant_memberships and synchronize_user_memberships.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    tenant_config = models.ForeignKey(TenantConfig, null=True, blank=True, on_delete=models.CASCADE)
+    microsite = models.ForeignKey(Microsite, null=True, blank=True, on_delete=models.CASCADE)
+
+    objects = TenantMembershipManager()
+
+    class Meta:
+        """
+        Model meta class.
+        """
+        app_label = "eox_tenant"
+        constraints = [
+            models.UniqueConstraint(fields=["tenant_config", "user"], name="eox_tenant_unique_config_member"),
+            models.UniqueConstraint(fields=["microsite", "user"], name="eox_tenant_unique_microsite_member"),
+        ]
+
+    def __str__(self):
+        return f"<Membership: {self.pk}>"
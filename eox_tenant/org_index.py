@@ -0,0 +1,131 @@
+"""
+In-memory index of the organizations owned by the tenants.
+
+The index maps every organization linked to a TenantConfig or a Microsite to the frozenset
+of keys of the tenants that own it, so checking whether a course org belongs to any tenant,
+and to which ones, is a single dict lookup instead of unpickling the list of every org.
+"""
+import logging
+import threading
+from time import monotonic
+
+from django.conf import settings
+
+from eox_tenant.cache import get_config_version
+from eox_tenant.models import TenantOrganization
+
+LOG = logging.getLogger(__name__)
+
+NO_TENANTS = frozenset()
+
+
+class OrgIndex:
+    """
+    Lazily built map of organization to the keys of the tenants that own it.
+
+    The organizations come from the `organizations` field of TenantConfig and Microsite, kept
+    in sync with `course_org_filter` by synchronize_tenant_organizations. The index is rebuilt
+    after `timeout` seconds or when the configuration version changes, so edits made by other
+    processes are seen.
+    """
+
+    def __init__(self, timeout=300):
+        self.timeout = timeout
+        self.version = None
+        self.counters = {"hits": 0, "negative_hits": 0, "builds": 0}
+        self._owners = {}
+        self._all_orgs = NO_TENANTS
+        self._built_at = None
+        self._lock = threading.RLock()
+
+    def get_tenants(self, org):
+        """
+        Return the frozenset of keys of the tenants that own the org, empty if no tenant owns it.
+        """
+        with self._lock:
+            if self._is_outdated():
+                self._build()
+
+            owners = self._owners.get(org)
+
+            if owners is None:
+                self.counters["negative_hits"] += 1
+                return NO_TENANTS
+
+            self.counters["hits"] += 1
+            return owners
+
+    def get_all_orgs(self):
+        """
+        Return the frozenset of every org owned by a tenant.
+        """
+        with self._lock:
+            if self._is_outdated():
+                self._build()
+
+            return self._all_orgs
+
+    def set_version(self, version):
+        """
+        Drop the index if it was built under a different configuration version.
+        """
+        with self._lock:
+            if version != self.version:
+                self.clear()
+                self.version = version
+
+    def clear(self):
+        """
+        Drop the index, it is built again on the next lookup.
+        """
+        with self._lock:
+            self._owners = {}
+            self._all_orgs = NO_TENANTS
+            self._built_at = None
+
+    def stats(self):
+        """
+        Return the usage counters of the index.
+        """
+        return dict(self.counters, orgs=len(self._owners))
+
+    def _is_outdated(self):
+        """
+        Whether the index must be built before answering a lookup.
+
+        The shared configuration version is checked first, so the edits made by other processes
+        drop the index even when the settings are not reset by EOX_TENANT_USE_CONFIG_VERSION.
+        """
+        self.set_version(get_config_version())
+
+        return self._built_at is None or monotonic() - self._built_at > self.timeout
+
+    def _build(self):
+        """
+        Load the organizations of every tenant config and microsite.
+        """
+        owners = {}
+        sources = (
+            TenantOrganization.objects.filter(tenantconfig__isnull=False).values_list(
+                "name",
+                "tenantconfig__external_key",
+            ),
+            TenantOrganization.objects.filter(microsite__isnull=False).values_list(
+                "name",
+                "microsite__key",
+            ),
+        )
+
+        for queryset in sources:
+            for org, tenant_key in queryset:
+                owners.setdefault(org, set()).add(tenant_key)
+
+        self._owners = {org: frozenset(tenant_keys) for org, tenant_keys in owners.items()}
+        self._all_orgs = frozenset(self._owners)
+        self._built_at = monotonic()
+        self.counters["builds"] += 1
+        LOG.debug("Org index built with %s organizations", len(self._owners))
+
+
+# Read at the beginning so this can not be modified by the tenant configs
+ORG_INDEX = OrgIndex(timeout=getattr(settings, "EOX_TENANT_ORG_INDEX_TIMEOUT", 300))
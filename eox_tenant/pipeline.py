@@ -1,8 +1,20 @@
 """
 The pipeline module defines functions that are used in the third party authentication flow
 """
+from itertools import islice
+from weakref import WeakKeyDictionary
+
+from django.conf import settings
+from django.db.models import QuerySet
 from social_core.exceptions import AuthFailed
 
+from eox_tenant.models import TenantMembership
+from eox_tenant.signup_sources import SIGNUP_SOURCE_SITE_LOOKUP
+from eox_tenant.utils import EOX_TENANT_USE_TENANT_MEMBERSHIPS
+
+# Users found by email for every backend, a backend lives as long as the pipeline run of its request
+USERS_BY_EMAIL = WeakKeyDictionary()
+
 
 class EoxTenantAuthException(AuthFailed):
     """Auth process exception."""
@@ -30,7 +42,7 @@ def safer_associate_by_email(backend, details, user=None, *args, **kwargs):
         # Try to associate accounts registered with the same email address,
         # only if it's a single object. AuthException is raised if multiple
         # objects are returned.
-        users = list(backend.strategy.storage.user.get_users_by_email(email))
+        users = get_users_by_email(backend, email)
         if not users:
             return None
         if len(users) > 1:
@@ -47,3 +59,44 @@ def safer_associate_by_email(backend, details, user=None, *args, **kwargs):
                 'is_new': False}
 
     return None
+
+
+def get_users_by_email(backend, email):
+    """
+    Return at most two users with the email, enough to tell a single match from several.
+
+    The storages of Django return a queryset, so only two rows are fetched. With the
+    EDNX_ASSOCIATE_BY_EMAIL_TENANT_USERS_ONLY setting of the tenant, only the users that
+    signed up on the current tenant are candidates. The result is remembered for the
+    pipeline run of the backend.
+    """
+    tenant_users_only = bool(getattr(settings, "EDNX_ASSOCIATE_BY_EMAIL_TENANT_USERS_ONLY", False))
+    found = USERS_BY_EMAIL.setdefault(backend, {})
+    key = (email, tenant_users_only)
+
+    if key not in found:
+        users = backend.strategy.storage.user.get_users_by_email(email)
+
+        if isinstance(users, QuerySet):
+            if tenant_users_only:
+                users = filter_tenant_users(users, backend)
+            users = users[:2]
+
+        found[key] = list(islice(users, 2))
+
+    return found[key]
+
+
+def filter_tenant_users(users, backend):
+    """
+    Return the users that belong to the current tenant, from its memberships with
+    EOX_TENANT_USE_TENANT_MEMBERSHIPS or else from the signup sources of the current host.
+    """
+    tenant_key = getattr(settings, "EDNX_TENANT_KEY", None)
+
+    if EOX_TENANT_USE_TENANT_MEMBERSHIPS and tenant_key:
+        return users.filter(pk__in=TenantMembership.objects.for_tenant(tenant_key).values("user_id"))
+
+    domain = backend.strategy.request_host().split(":")[0]
+
+    return users.filter(**{SIGNUP_SOURCE_SITE_LOOKUP: domain}).distinct()
@@ -3,9 +3,15 @@ Common utilities for use along signals file.
 """
 from django.conf import settings
 
+from eox_tenant.domain_index import DOMAIN_INDEX, MICROSITE_SOURCE
+from eox_tenant.instrumentation import timed
 from eox_tenant.models import Microsite, TenantConfig
 
+# Read at the beginning so this can not be modified by the tenant configs
+EOX_TENANT_USE_DOMAIN_INDEX = getattr(settings, "EOX_TENANT_USE_DOMAIN_INDEX", False)
 
+
+@timed("get_tenant_config_by_domain")
 def get_tenant_config_by_domain(domain, config_key):
     """
     Reach for the configuration for a given domain.
@@ -21,6 +27,17 @@ def get_tenant_config_by_domain(domain, config_key):
     if not getattr(settings, 'USE_EOX_TENANT', False):
         return {}, None
 
+    if EOX_TENANT_USE_DOMAIN_INDEX:
+        return _get_tenant_config_from_index(domain, config_key)
+
+    return _get_tenant_config_or_microsite(domain, config_key)
+
+
+def _get_tenant_config_or_microsite(domain, config_key):
+    """
+    Reach for the configuration of the route of the domain, or of its microsite when the
+    route has no configurations in the config column.
+    """
     configurations, external_key = TenantConfig.get_configs_for_domain(domain, config_key)
 
     if configurations and external_key:
@@ -33,3 +50,26 @@ def get_tenant_config_by_domain(domain, config_key):
         external_key = microsite.key
 
     return configurations, external_key
+
+
+def _get_tenant_config_from_index(domain, config_key):
+    """
+    Reach for the configuration for a given domain using the domain index,
+    so domains that do not belong to any tenant do not reach the database.
+    """
+    resolved = DOMAIN_INDEX.resolve(domain)
+
+    if resolved is None:
+        return {}, None
+
+    source, pk = resolved
+
+    if source == MICROSITE_SOURCE:
+        microsite = Microsite.objects.filter(pk=pk).first()
+
+        if microsite:
+            return microsite.values, microsite.key
+
+        return {}, None
+
+    return _get_tenant_config_or_microsite(domain, config_key)
@@ -50,6 +50,31 @@ def plugin_settings(settings):
     settings.EOX_TENANT_LOAD_PERMISSIONS = True
     settings.EOX_TENANT_APPEND_LMS_MIDDLEWARE_CLASSES = False
     settings.USE_EOX_TENANT = True
+    settings.EOX_TENANT_CONFIG_CACHE_SIZE = 2048
+    settings.EOX_TENANT_CONFIG_CACHE_TIMEOUT = 60
+    settings.EOX_TENANT_USE_CONFIG_VERSION = False
+    settings.EOX_TENANT_USE_DOMAIN_INDEX = False
+    settings.EOX_TENANT_DOMAIN_INDEX_TIMEOUT = 300
+    settings.EOX_TENANT_SETTINGS_MODE = "reset"
+    settings.EOX_TENANT_SETTINGS_SNAPSHOTS_SIZE = 256
+    settings.EOX_TENANT_REPOPULATE_APPS_ONCE = False
+    settings.EOX_TENANT_ENABLE_WORKER_STATS = False
+    settings.EOX_TENANT_APPEND_AFFINITY_MIDDLEWARE = False
+    settings.EOX_TENANT_TIMING_SINKS = []
+    settings.EOX_TENANT_ORG_ADDRESSABLE_KEYS = ["LMS_ROOT_URL", "PLATFORM_NAME"]
+    settings.EOX_TENANT_LOCAL_CACHE_SIZE = 1024
+    settings.EOX_TENANT_LOCAL_CACHE_TIMEOUT = 5
+    settings.EOX_TENANT_USE_ORG_INDEX = False
+    settings.EOX_TENANT_ORG_INDEX_TIMEOUT = 300
+    settings.EOX_TENANT_BYPASS_PATH_PREFIXES = []
+    settings.EOX_TENANT_BYPASS_HOSTS = []
+    settings.EOX_TENANT_NATIVE_JSON_FIELDS = False
+    settings.EOX_TENANT_NATIVE_JSON_INDEXED_KEYS = ["EDNX_USE_SIGNAL", "SITE_NAME", "course_org_filter"]
+    settings.EOX_TENANT_LOGIN_VERDICT_CACHE_SIZE = 4096
+    settings.EOX_TENANT_LOGIN_VERDICT_CACHE_TIMEOUT = 0
+    settings.EOX_TENANT_USE_TENANT_MEMBERSHIPS = False
+    settings.EOX_TENANT_OAUTH_VERDICT_CACHE_SIZE = 1024
+    settings.EOX_TENANT_LOGIN_WITH_TENANT_MEMBERSHIPS = False
 
     settings.EOX_TENANT_ASYNC_TASKS_HANDLER_DICT = {
         "openedx.core.djangoapps.schedules.tasks.ScheduleRecurringNudge": "get_host_from_siteid",
@@ -9,13 +9,14 @@ EOX_TENANT_AUTH_BACKEND = 'eox_tenant.auth.TenantAwareAuthBackend'
 DJANGO_CURRENT_SITE_MIDDLEWARE = 'django.contrib.sites.middleware.CurrentSiteMiddleware'
 
 EOX_TENANT_CURRENT_SITE_MIDDLEWARE = 'eox_tenant.middleware.CurrentSiteMiddleware'
+EOX_TENANT_AFFINITY_MIDDLEWARE = 'eox_tenant.middleware.TenantAffinityMiddleware'
 EOX_TENANT_MIDDLEWARES = [
     'eox_tenant.middleware.AvailableScreenMiddleware',
     'eox_tenant.middleware.MicrositeCrossBrandingFilterMiddleware',
 ]
 
 
-def plugin_settings(settings):  # pylint: disable=function-redefined
+def plugin_settings(settings):  # pylint: disable=function-redefined,too-many-statements
     """
     Set of plugin settings used by the Open Edx platform.
     More info: https://github.com/openedx/edx-platform/blob/master/openedx/core/djangoapps/plugins/README.rst
@@ -62,6 +63,107 @@ def plugin_settings(settings):  # pylint: disable=function-redefined
         settings.USE_EOX_TENANT
     )
 
+    settings.EOX_TENANT_CONFIG_CACHE_SIZE = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_CONFIG_CACHE_SIZE',
+        settings.EOX_TENANT_CONFIG_CACHE_SIZE
+    )
+    settings.EOX_TENANT_CONFIG_CACHE_TIMEOUT = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_CONFIG_CACHE_TIMEOUT',
+        settings.EOX_TENANT_CONFIG_CACHE_TIMEOUT
+    )
+    settings.EOX_TENANT_USE_CONFIG_VERSION = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_USE_CONFIG_VERSION',
+        settings.EOX_TENANT_USE_CONFIG_VERSION
+    )
+    settings.EOX_TENANT_USE_DOMAIN_INDEX = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_USE_DOMAIN_INDEX',
+        settings.EOX_TENANT_USE_DOMAIN_INDEX
+    )
+    settings.EOX_TENANT_DOMAIN_INDEX_TIMEOUT = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_DOMAIN_INDEX_TIMEOUT',
+        settings.EOX_TENANT_DOMAIN_INDEX_TIMEOUT
+    )
+    settings.EOX_TENANT_SETTINGS_MODE = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_SETTINGS_MODE',
+        settings.EOX_TENANT_SETTINGS_MODE
+    )
+    settings.EOX_TENANT_SETTINGS_SNAPSHOTS_SIZE = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_SETTINGS_SNAPSHOTS_SIZE',
+        settings.EOX_TENANT_SETTINGS_SNAPSHOTS_SIZE
+    )
+    settings.EOX_TENANT_REPOPULATE_APPS_ONCE = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_REPOPULATE_APPS_ONCE',
+        settings.EOX_TENANT_REPOPULATE_APPS_ONCE
+    )
+    settings.EOX_TENANT_ENABLE_WORKER_STATS = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_ENABLE_WORKER_STATS',
+        settings.EOX_TENANT_ENABLE_WORKER_STATS
+    )
+    settings.EOX_TENANT_APPEND_AFFINITY_MIDDLEWARE = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_APPEND_AFFINITY_MIDDLEWARE',
+        settings.EOX_TENANT_APPEND_AFFINITY_MIDDLEWARE
+    )
+    settings.EOX_TENANT_TIMING_SINKS = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_TIMING_SINKS',
+        settings.EOX_TENANT_TIMING_SINKS
+    )
+    settings.EOX_TENANT_ORG_ADDRESSABLE_KEYS = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_ORG_ADDRESSABLE_KEYS',
+        settings.EOX_TENANT_ORG_ADDRESSABLE_KEYS
+    )
+    settings.EOX_TENANT_LOCAL_CACHE_SIZE = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_LOCAL_CACHE_SIZE',
+        settings.EOX_TENANT_LOCAL_CACHE_SIZE
+    )
+    settings.EOX_TENANT_LOCAL_CACHE_TIMEOUT = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_LOCAL_CACHE_TIMEOUT',
+        settings.EOX_TENANT_LOCAL_CACHE_TIMEOUT
+    )
+    settings.EOX_TENANT_USE_ORG_INDEX = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_USE_ORG_INDEX',
+        settings.EOX_TENANT_USE_ORG_INDEX
+    )
+    settings.EOX_TENANT_ORG_INDEX_TIMEOUT = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_ORG_INDEX_TIMEOUT',
+        settings.EOX_TENANT_ORG_INDEX_TIMEOUT
+    )
+    settings.EOX_TENANT_BYPASS_PATH_PREFIXES = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_BYPASS_PATH_PREFIXES',
+        settings.EOX_TENANT_BYPASS_PATH_PREFIXES
+    )
+    settings.EOX_TENANT_BYPASS_HOSTS = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_BYPASS_HOSTS',
+        settings.EOX_TENANT_BYPASS_HOSTS
+    )
+    settings.EOX_TENANT_NATIVE_JSON_FIELDS = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_NATIVE_JSON_FIELDS',
+        settings.EOX_TENANT_NATIVE_JSON_FIELDS
+    )
+    settings.EOX_TENANT_NATIVE_JSON_INDEXED_KEYS = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_NATIVE_JSON_INDEXED_KEYS',
+        settings.EOX_TENANT_NATIVE_JSON_INDEXED_KEYS
+    )
+    settings.EOX_TENANT_LOGIN_VERDICT_CACHE_SIZE = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_LOGIN_VERDICT_CACHE_SIZE',
+        settings.EOX_TENANT_LOGIN_VERDICT_CACHE_SIZE
+    )
+    settings.EOX_TENANT_LOGIN_VERDICT_CACHE_TIMEOUT = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_LOGIN_VERDICT_CACHE_TIMEOUT',
+        settings.EOX_TENANT_LOGIN_VERDICT_CACHE_TIMEOUT
+    )
+    settings.EOX_TENANT_USE_TENANT_MEMBERSHIPS = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_USE_TENANT_MEMBERSHIPS',
+        settings.EOX_TENANT_USE_TENANT_MEMBERSHIPS
+    )
+    settings.EOX_TENANT_OAUTH_VERDICT_CACHE_SIZE = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_OAUTH_VERDICT_CACHE_SIZE',
+        settings.EOX_TENANT_OAUTH_VERDICT_CACHE_SIZE
+    )
+    settings.EOX_TENANT_LOGIN_WITH_TENANT_MEMBERSHIPS = getattr(settings, 'ENV_TOKENS', {}).get(
+        'EOX_TENANT_LOGIN_WITH_TENANT_MEMBERSHIPS',
+        settings.EOX_TENANT_LOGIN_WITH_TENANT_MEMBERSHIPS
+    )
+
     # Override the default site
     settings.SITE_ID = getattr(settings, 'ENV_TOKENS', {}).get(
         'SITE_ID',
@@ -85,6 +187,10 @@ def plugin_settings(settings):  # pylint: disable=function-redefined
         ] = EOX_TENANT_CURRENT_SITE_MIDDLEWARE
         setattr(settings, middleware, middleware_setting)
 
+    if settings.EOX_TENANT_APPEND_AFFINITY_MIDDLEWARE:
+        middleware_setting = getattr(settings, middleware) + [EOX_TENANT_AFFINITY_MIDDLEWARE]
+        setattr(settings, middleware, middleware_setting)
+
     if settings.SERVICE_VARIANT == "lms":
         if settings.EOX_TENANT_APPEND_LMS_MIDDLEWARE_CLASSES:
             middleware_setting = getattr(settings, middleware) + EOX_TENANT_MIDDLEWARES
@@ -17,75 +17,191 @@ LOGGING['loggers']['eox_tenant'] = {
     'level': 'DEBUG'
 }
 
+Settings modes
+==============
+
+EOX_TENANT_SETTINGS_MODE defines how the changes of a tenant are removed from the settings object
+
+- "reset" (default): the settings object is built again with settings._setup().
+- "overlay": only the settings changed by the tenant get their original value back.
+- "snapshot": the settings object of every tenant is computed once and swapped in and out.
+- "context": the global settings object is never changed. The settings of the tenant are
+  kept in a context variable for the current request or task, and django.conf.settings
+  reads them first, see eox_tenant.tenant_settings. This allows threaded or ASGI workers.
+  EDNX_TENANT_INSTALLED_APPS is not supported in this mode.
+
 """
 from __future__ import print_function, unicode_literals
 
+import hashlib
+import json
 import logging
 from datetime import datetime
 from os import getpid
+from time import perf_counter
 
 import six
 from django.apps.config import AppConfig
 from django.conf import settings as base_settings
+from django.db.models.signals import post_delete
 
 from eox_tenant.async_utils import AsyncTaskHandler
-from eox_tenant.constants import CMS_CONFIG_COLUMN, LMS_CONFIG_COLUMN
+from eox_tenant.bypass import REQUEST_BYPASS
+from eox_tenant.cache import TENANT_CACHE, bump_config_version, get_config_version
+from eox_tenant.constants import (
+    CMS_CONFIG_COLUMN,
+    LMS_CONFIG_COLUMN,
+    SETTINGS_MODE_CONTEXT,
+    SETTINGS_MODE_OVERLAY,
+    SETTINGS_MODE_RESET,
+    SETTINGS_MODE_SNAPSHOT,
+    TENANT_SWITCH_BYPASSED,
+    TENANT_SWITCH_KEPT,
+    TENANT_SWITCH_RESET,
+    TENANT_SWITCH_SWITCHED,
+)
+from eox_tenant.domain_index import DOMAIN_INDEX
+from eox_tenant.instrumentation import record_switch, start_switch, timed
+from eox_tenant.models import TENANT_CONFIG_CACHE, Route, TenantConfig
+from eox_tenant.org_index import ORG_INDEX
 from eox_tenant.receivers_helpers import get_tenant_config_by_domain
-from eox_tenant.utils import synchronize_tenant_organizations
+from eox_tenant.tenant_settings import (
+    SettingsOverlay,
+    SettingsSnapshots,
+    activate_tenant_settings,
+    deactivate_tenant_settings,
+    merge_config,
+)
+from eox_tenant.utils import (
+    EOX_TENANT_USE_TENANT_MEMBERSHIPS,
+    synchronize_tenant_memberships,
+    synchronize_tenant_organizations,
+    synchronize_user_memberships,
+)
 
 LOG = logging.getLogger(__name__)
 
 # Read at the beginning so this can not be modified by the tenant configs
 EOX_MAX_CONFIG_OVERRIDE_SECONDS = getattr(base_settings, "EOX_MAX_CONFIG_OVERRIDE_SECONDS", 300)
+EOX_TENANT_USE_CONFIG_VERSION = getattr(base_settings, "EOX_TENANT_USE_CONFIG_VERSION", False)
+EOX_TENANT_SETTINGS_MODE = getattr(base_settings, "EOX_TENANT_SETTINGS_MODE", SETTINGS_MODE_RESET)
+EOX_TENANT_REPOPULATE_APPS_ONCE = getattr(base_settings, "EOX_TENANT_REPOPULATE_APPS_ONCE", False)
+
+# Changes made by the current tenant when EOX_TENANT_SETTINGS_MODE is "overlay"
+SETTINGS_OVERLAY = SettingsOverlay()
+# Settings objects per tenant when EOX_TENANT_SETTINGS_MODE is "snapshot" or "context"
+SETTINGS_SNAPSHOTS = SettingsSnapshots(maxsize=getattr(base_settings, "EOX_TENANT_SETTINGS_SNAPSHOTS_SIZE", 256))
+# (tenant key, config id, app) already initialized by _repopulate_apps, used with EOX_TENANT_REPOPULATE_APPS_ONCE
+READY_APPS_BY_TENANT = set()
 
 
+@timed("update_settings")
 def _update_settings(domain, config_key):
     """
     Perform the override procedure on the settings object
     """
+    # Read before the config, so a change saved meanwhile is applied again on the next request
+    config_version = get_config_version() if EOX_TENANT_USE_CONFIG_VERSION else None
     config, tenant_key = get_tenant_config_by_domain(domain, config_key)
 
     if not config.get("EDNX_USE_SIGNAL"):
         LOG.info("Site %s, does not use eox_tenant signals", domain)
         return
 
-    base_settings.EDNX_TENANT_KEY = tenant_key
-    base_settings.EDNX_TENANT_DOMAIN = domain
-    base_settings.EDNX_TENANT_SETUP_TIME = datetime.now()
+    if EOX_TENANT_SETTINGS_MODE == SETTINGS_MODE_SNAPSHOT:
+        SETTINGS_SNAPSHOTS.apply(tenant_key, config_key, config)
+
+    _set_setting("EDNX_TENANT_KEY", tenant_key)
+    _set_setting("EDNX_TENANT_DOMAIN", domain)
+    _set_setting("EDNX_TENANT_SETUP_TIME", datetime.now())
+
+    if EOX_TENANT_USE_CONFIG_VERSION:
+        _set_setting("EDNX_TENANT_CONFIG_VERSION", config_version)
 
     LOG.debug("PID: %s CONFIGURING THE SETTINGS OBJECT | %s", getpid(), tenant_key)
-    for key, value in six.iteritems(config):
-        if isinstance(value, dict):
-            try:
-                merged = getattr(base_settings, key, {}).copy()
-            except AttributeError:
-                merged = {}
-            merged.update(value)
-            setattr(base_settings, key, merged)
-            continue
-        setattr(base_settings, key, value)
+    if EOX_TENANT_SETTINGS_MODE != SETTINGS_MODE_SNAPSHOT:
+        for key, value in six.iteritems(merge_config(base_settings, config)):
+            _set_setting(key, value)
 
     # Some django apps need to be reinitialized
     try:
         if base_settings.EDNX_TENANT_INSTALLED_APPS:
-            _repopulate_apps(base_settings.EDNX_TENANT_INSTALLED_APPS)
+            # The apps can change any setting, so the overlay and snapshots can not undo them
+            SETTINGS_OVERLAY.mark_inexact()
+            SETTINGS_SNAPSHOTS.mark_inexact()
+            config_id = _get_config_id(config, config_version) if EOX_TENANT_REPOPULATE_APPS_ONCE else None
+            _repopulate_apps(base_settings.EDNX_TENANT_INSTALLED_APPS, config_id)
     except AttributeError:
         pass
 
 
-def _repopulate_apps(apps):
+def _get_config_id(config, config_version):
+    """
+    Identify the configurations applied to the settings: the config version when it is tracked,
+    or else a digest of the configurations.
+    """
+    if config_version is not None:
+        return config_version
+
+    return hashlib.sha1(
+        json.dumps(dict(config.items()), sort_keys=True, default=str).encode("utf-8"),
+    ).hexdigest()
+
+
+def _set_setting(key, value):
+    """
+    Change a value of the settings object, recording the original value in overlay mode.
+    """
+    if EOX_TENANT_SETTINGS_MODE == SETTINGS_MODE_OVERLAY:
+        SETTINGS_OVERLAY.set(key, value)
+        return
+
+    setattr(base_settings, key, value)
+
+
+@timed("repopulate_apps")
+def _repopulate_apps(apps, config_id=None):
     """
     After the initial loading of the settings, some djangoapps can override the AppConfig.ready() method
     to alter the settings in a particular way.
     In this case we need to run the app config again.
     We delegate the decision to the specific tenant on the EDNX_TENANT_INSTALLED_APPS key.
     If present, the key is passed in the apps argument
+
+    With EOX_TENANT_REPOPULATE_APPS_ONCE an app is initialized only once per tenant and configurations,
+    identified by config_id, in the process, which is enough for apps whose ready() method only connects
+    signals or imports modules. Otherwise every settings object built for a tenant initializes them again.
     """
     LOG.debug("PID: %s REPOPULATING APPS | %s", getpid(), apps)
+    tenant_key = getattr(base_settings, "EDNX_TENANT_KEY", None)
+    start_time = perf_counter()
+    skipped = 0
+
     for entry in apps:
+        ready_key = (tenant_key, config_id, entry)
+
+        if EOX_TENANT_REPOPULATE_APPS_ONCE and ready_key in READY_APPS_BY_TENANT:
+            skipped += 1
+            continue
+
+        app_start_time = perf_counter()
         app_config = AppConfig.create(entry)
         app_config.ready()
 
+        if EOX_TENANT_REPOPULATE_APPS_ONCE:
+            READY_APPS_BY_TENANT.add(ready_key)
+
+        LOG.debug("PID: %s APP %s READY IN %.2f ms", getpid(), entry, (perf_counter() - app_start_time) * 1000)
+
+    LOG.info(
+        "PID: %s | Repopulated %s apps and skipped %s for %s in %.2f ms",
+        getpid(),
+        len(apps) - skipped,
+        skipped,
+        tenant_key,
+        (perf_counter() - start_time) * 1000,
+    )
+
 
 def can_keep_settings(domain):
     """
@@ -94,13 +210,19 @@ def can_keep_settings(domain):
     """
     must_reset, can_keep = _analyze_current_settings(domain)
 
-    if _ttl_reached() or must_reset:  # Perform the reset
+    if EOX_TENANT_USE_CONFIG_VERSION:
+        outdated = _config_version_changed()
+    else:
+        outdated = _ttl_reached()
+
+    if outdated or must_reset:  # Perform the reset
         _perform_reset()
         can_keep = False
 
     return can_keep
 
 
+@timed("analyze_current_settings")
 def _analyze_current_settings(domain):
     """
     The logic in here will determine if the current settings object has already been
@@ -135,11 +257,26 @@ def _analyze_current_settings(domain):
     return must_reset, can_keep
 
 
+@timed("perform_reset")
 def _perform_reset():
     """
-    Defers to the original django.conf.settings to a new initialization
+    Defers to the original django.conf.settings to a new initialization.
+
+    In overlay mode only the settings changed by the current tenant are restored and in
+    snapshot mode the pristine settings object is put back, unless the tenant changed
+    settings that could not be tracked.
     """
+    if EOX_TENANT_SETTINGS_MODE == SETTINGS_MODE_OVERLAY and SETTINGS_OVERLAY.undo():
+        LOG.debug("Undo of the tenant overlay on the settings object for PID: %s", getpid())
+        return
+
+    if EOX_TENANT_SETTINGS_MODE == SETTINGS_MODE_SNAPSHOT and SETTINGS_SNAPSHOTS.reset():
+        LOG.debug("Pristine settings object restored for PID: %s", getpid())
+        return
+
     base_settings._setup()  # pylint: disable=protected-access
+    SETTINGS_OVERLAY.clear()
+    SETTINGS_SNAPSHOTS.clear()
     LOG.debug("Reset on the settings object for PID: %s", getpid())
 
 
@@ -158,6 +295,29 @@ def _ttl_reached():
     return False
 
 
+def _config_version_changed():
+    """
+    Determines if the tenant configurations were edited after the current settings
+    object was configured, comparing the version stored in the shared cache.
+
+    This replaces the periodic reset given by _ttl_reached when EOX_TENANT_USE_CONFIG_VERSION is set.
+    """
+    current_version = get_config_version()
+    # Drop the local configurations as well, they may come from another version
+    TENANT_CONFIG_CACHE.set_version(current_version)
+    DOMAIN_INDEX.set_version(current_version)
+    ORG_INDEX.set_version(current_version)
+    TENANT_CACHE.set_version(current_version)
+
+    applied_version = getattr(base_settings, "EDNX_TENANT_CONFIG_VERSION", None)
+
+    if applied_version is not None and applied_version != current_version:
+        LOG.debug("SETTINGS WILL RESET | Reason: the tenant configurations changed")
+        return True
+
+    return False
+
+
 def start_lms_tenant(sender, environ, **kwargs):  # pylint: disable=unused-argument
     """
     This function runs every time a request is started in LMS.
@@ -185,20 +345,99 @@ def _start_tenant(environ, config_key):
     - override the object with the settings stored for the tenant
     - reset the object and then override with a new tenant
 
+    Requests matched by EOX_TENANT_BYPASS_PATH_PREFIXES or EOX_TENANT_BYPASS_HOSTS leave the
+    settings object as it is.
+
     Signal: django.core.signals.request_started
     """
+    if REQUEST_BYPASS and REQUEST_BYPASS.matches_environ(environ):
+        _bypass_tenant(environ.get("HTTP_HOST"))
+        return
+
     http_host = environ.get("HTTP_HOST")
     if not http_host:
         LOG.warning("Could not find the host information for eox_tenant.signals")
+        if EOX_TENANT_SETTINGS_MODE == SETTINGS_MODE_CONTEXT:
+            deactivate_tenant_settings()
         return
 
     domain = http_host.split(':')[0]
 
-    if can_keep_settings(domain):
-        return
+    _apply_tenant(domain, config_key)
+
+
+def _bypass_tenant(http_host):
+    """
+    Record a request that does not read the tenant configurations, without touching the settings.
+
+    The context mode only drops the settings left in the context by a previous request.
+    """
+    if EOX_TENANT_SETTINGS_MODE == SETTINGS_MODE_CONTEXT:
+        deactivate_tenant_settings()
+
+    start_switch()
+    record_switch(None, http_host, TENANT_SWITCH_BYPASSED, 0.0)
+
+
+def _apply_tenant(domain, config_key):
+    """
+    Prepare the settings of the tenant serving the domain and record the switch made
+    for the current request or task.
+    """
+    start_switch()
+    start_time = perf_counter()
+
+    if EOX_TENANT_SETTINGS_MODE == SETTINGS_MODE_CONTEXT:
+        outcome = _start_context_tenant(domain, config_key)
+    elif can_keep_settings(domain):
+        outcome = TENANT_SWITCH_KEPT
+    else:
+        # Do the update
+        _update_settings(domain, config_key)
+        outcome = TENANT_SWITCH_SWITCHED if hasattr(base_settings, "EDNX_TENANT_KEY") else TENANT_SWITCH_RESET
+
+    record_switch(
+        getattr(base_settings, "EDNX_TENANT_KEY", None),
+        domain,
+        outcome,
+        perf_counter() - start_time,
+    )
+
+
+def _start_context_tenant(domain, config_key):
+    """
+    Make the settings of the tenant serving the domain the settings of the current
+    context, without changing the global settings object. django.conf.settings reads
+    them first, see eox_tenant.tenant_settings.
+
+    Returns TENANT_SWITCH_KEPT if the settings of the tenant were already built,
+    TENANT_SWITCH_SWITCHED if they were built now and TENANT_SWITCH_RESET if the
+    domain does not use the eox_tenant signals.
+    """
+    if EOX_TENANT_USE_CONFIG_VERSION:
+        _config_version_changed()
+
+    config, tenant_key = get_tenant_config_by_domain(domain, config_key)
+
+    if not config.get("EDNX_USE_SIGNAL"):
+        LOG.info("Site %s, does not use eox_tenant signals", domain)
+        deactivate_tenant_settings()
+        return TENANT_SWITCH_RESET
+
+    builds = SETTINGS_SNAPSHOTS.builds
+    snapshot = SETTINGS_SNAPSHOTS.get(tenant_key, config_key, config)
 
-    # Do the update
-    _update_settings(domain, config_key)
+    if getattr(snapshot, "EDNX_TENANT_INSTALLED_APPS", None):
+        LOG.warning("EDNX_TENANT_INSTALLED_APPS is ignored in the context settings mode | %s", tenant_key)
+
+    activate_tenant_settings(
+        snapshot,
+        EDNX_TENANT_KEY=tenant_key,
+        EDNX_TENANT_DOMAIN=domain,
+        EDNX_TENANT_SETUP_TIME=datetime.now(),
+    )
+
+    return TENANT_SWITCH_KEPT if SETTINGS_SNAPSHOTS.builds == builds else TENANT_SWITCH_SWITCHED
 
 
 def finish_tenant(sender, **kwargs):  # pylint: disable=unused-argument
@@ -207,8 +446,11 @@ def finish_tenant(sender, **kwargs):  # pylint: disable=unused-argument
 
     Signal: django.core.signals.request_finished
 
-    Since the signal is not very reliable nothing is being done in it
+    Since the signal is not very reliable, only the settings of the context mode are
+    dropped here. The next request or task sets them again anyway.
     """
+    if EOX_TENANT_SETTINGS_MODE == SETTINGS_MODE_CONTEXT:
+        deactivate_tenant_settings()
 
 
 def clear_tenant(sender, request, **kwargs):  # pylint: disable=unused-argument
@@ -267,16 +509,15 @@ def _start_async_tenant(sender, config_key):
 
     if not http_host:  # Reset settings in case of no tenant.
         LOG.warning("Could not find the host information for eox_tenant.signals. ")
+        if EOX_TENANT_SETTINGS_MODE == SETTINGS_MODE_CONTEXT:
+            deactivate_tenant_settings()
+            return
         _perform_reset()
         return
 
     domain = http_host
 
-    if can_keep_settings(domain):
-        return
-
-    # Do the update
-    _update_settings(domain, config_key)
+    _apply_tenant(domain, config_key)
 
 
 def update_tenant_organizations(instance, **kwargs):  # pylint: disable=unused-argument
@@ -289,3 +530,76 @@ def update_tenant_organizations(instance, **kwargs):  # pylint: disable=unused-a
         kwargs: extra arguments.
     """
     synchronize_tenant_organizations(instance)
+
+
+def clear_tenant_config_cache(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Receiver method which drops the tenant configurations cached in this process.
+
+    Edits are rare compared to reads, so the whole cache is dropped instead of
+    tracking which domains point to the saved or deleted instance.
+
+    Signals: django.db.models.signals.post_save and post_delete for TenantConfig and Route.
+    """
+    TenantConfig.objects.clear_configurations_cache()
+    TENANT_CACHE.clear_local()
+
+
+def bump_tenant_config_version(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Receiver method which increases the shared version of the tenant configurations,
+    so every process drops the settings and cached configurations it applied before.
+
+    Signals: django.db.models.signals.post_save and post_delete for TenantConfig, Route and Microsite.
+    """
+    bump_config_version()
+
+
+def update_domain_index(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Receiver method which keeps the domain index of this process up to date.
+
+    Signals: django.db.models.signals.post_save and post_delete for Route and Microsite.
+    """
+    if isinstance(instance, Route):
+        DOMAIN_INDEX.update_route(instance, deleted=kwargs.get("signal") is post_delete)
+        return
+
+    DOMAIN_INDEX.update_microsites()
+
+
+def clear_org_index(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Receiver method which drops the org index of this process, it is built again on the next lookup.
+
+    Signals: django.db.models.signals.post_save and post_delete for TenantConfig and Microsite.
+    """
+    ORG_INDEX.clear()
+
+
+def update_tenant_memberships(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Receiver method which synchronizes the TenantMembership rows of a tenant when its domains change,
+    used with EOX_TENANT_USE_TENANT_MEMBERSHIPS.
+
+    Signals: django.db.models.signals.post_save and post_delete for Route, post_save for Microsite.
+    """
+    if not EOX_TENANT_USE_TENANT_MEMBERSHIPS:
+        return
+
+    if isinstance(instance, Route):
+        instance = TenantConfig.objects.filter(pk=instance.config_id).first()
+
+    if instance:
+        synchronize_tenant_memberships(instance)
+
+
+def update_user_memberships(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Receiver method which synchronizes the TenantMembership rows of the user of a signup source,
+    used with EOX_TENANT_USE_TENANT_MEMBERSHIPS.
+
+    Signals: django.db.models.signals.post_save and post_delete for UserSignupSource.
+    """
+    if EOX_TENANT_USE_TENANT_MEMBERSHIPS:
+        synchronize_user_memberships(instance.user_id)
@@ -0,0 +1,204 @@
+"""
+Compiled checks of the signup sources and the emails allowed to login on a tenant.
+
+TenantAwareAuthBackend runs them on every login, so the patterns of every tenant are
+compiled once and kept in memory instead of being matched one by one with re.match.
+
+The sites of the signup sources of a user and whether the user may login on every tenant
+are read with a single query. With EOX_TENANT_LOGIN_VERDICT_CACHE_TIMEOUT they are kept in
+memory by user and tenant for that many seconds, or until the configuration version changes.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.db.models import Exists, OuterRef, Q
+
+from eox_tenant.cache import LRUCache, get_config_version
+from eox_tenant.models import TenantMembership
+from eox_tenant.permissions import LOGIN_ALL_TENANTS_PERMISSION_APP_LABEL, LOGIN_ALL_TENANTS_PERMISSION_CODENAME
+
+# Patterns that only match themselves, apart from the case and the dots matching any character
+LITERAL_PATTERN = re.compile(r"[\w\-.:]+")
+AUTHORIZERS = LRUCache(maxsize=256, timeout=float("inf"))
+# Read at the beginning so this can not be modified by the tenant configs
+LOGIN_GRANTS = LRUCache(
+    maxsize=getattr(settings, "EOX_TENANT_LOGIN_VERDICT_CACHE_SIZE", 4096),
+    timeout=getattr(settings, "EOX_TENANT_LOGIN_VERDICT_CACHE_TIMEOUT", 0),
+)
+SIGNUP_SOURCE_SITE_LOOKUP = "usersignupsource__site"
+
+
+def compile_patterns(patterns, flags=0):
+    """
+    Return the compiled regexes of the patterns, as re.match(pattern + "$", value, flags) uses them.
+
+    Each pattern is compiled on its own, so inline flags, top level alternations and
+    backreferences keep the meaning they had when matched one by one.
+    """
+    return tuple(re.compile(pattern + "$", flags) for pattern in patterns or ())
+
+
+def match_any(regexes, value):
+    """
+    Whether any of the compiled regexes matches the value.
+    """
+    return any(regex.match(value) for regex in regexes)
+
+
+class SignupSourceAuthorizer:
+    """
+    Check the signup sources and the email of a user against the patterns of a tenant.
+
+    The sources allowed by EDNX_ACCOUNT_REGISTRATION_SOURCES are compiled once, and the ones
+    that are plain domains are also kept in a set, so most sites are checked with a single
+    lookup. The emails allowed by REGISTRATION_EMAIL_PATTERNS_ALLOWED are compiled the same
+    way, None allows any email.
+    """
+
+    def __init__(self, sources, email_patterns=None):
+        self.exact_sources = frozenset(
+            source.lower() for source in sources if LITERAL_PATTERN.fullmatch(source)
+        )
+        self.sources_regexes = compile_patterns(sources, re.IGNORECASE)
+        self.check_email = email_patterns is not None
+        self.email_regexes = compile_patterns(email_patterns)
+
+    def is_authorized_site(self, site):
+        """
+        Whether the site matches any of the allowed sources.
+        """
+        if site.lower() in self.exact_sources:
+            return True
+
+        return match_any(self.sources_regexes, site)
+
+    def is_authorized_email(self, email):
+        """
+        Whether the email matches any of the allowed email patterns.
+        """
+        if not self.check_email:
+            return True
+
+        return email is not None and match_any(self.email_regexes, email)
+
+    def is_authorized(self, sites, email):
+        """
+        Whether any of the signup sites and the email are allowed, stopping at the first allowed site.
+        """
+        return any(self.is_authorized_site(site) for site in sites) and self.is_authorized_email(email)
+
+
+def get_signup_source_authorizer(sources, email_patterns=None):
+    """
+    Return the SignupSourceAuthorizer of the patterns, compiled once for every set of patterns.
+    """
+    key = (tuple(sources), None if email_patterns is None else tuple(email_patterns))
+    authorizer = AUTHORIZERS.get(key)
+
+    if authorizer is None:
+        authorizer = SignupSourceAuthorizer(*key)
+        AUTHORIZERS.set(key, authorizer)
+
+    return authorizer
+
+
+def login_all_tenants_permission():
+    """
+    Return whether the outer user has the permission to login on every tenant, directly or through a group.
+    """
+    return Exists(
+        Permission.objects.filter(
+            content_type__app_label=LOGIN_ALL_TENANTS_PERMISSION_APP_LABEL,
+            codename=LOGIN_ALL_TENANTS_PERMISSION_CODENAME,
+        ).filter(Q(user=OuterRef("pk")) | Q(group__user=OuterRef("pk")))
+    )
+
+
+def get_signup_sites(user):
+    """
+    Return whether the user may login on every tenant and the sites of its signup sources.
+
+    Both are read with one query instead of loading every permission of the user with has_perm
+    and then the signup sources. As has_perm does, inactive users have no permissions.
+    """
+    rows = get_user_model().objects.filter(pk=user.pk).values_list(
+        login_all_tenants_permission(),
+        SIGNUP_SOURCE_SITE_LOOKUP,
+    )
+    login_all_tenants = False
+    sites = []
+
+    for has_permission, site in rows:
+        login_all_tenants = login_all_tenants or has_permission
+
+        if site is not None:
+            sites.append(site)
+
+    return bool(login_all_tenants and user.is_active), sites
+
+
+def get_tenant_membership(user, tenant_key):
+    """
+    Return whether the user may login on every tenant and whether it belongs to the tenant.
+
+    Both are read with one query, the membership is an indexed lookup in TenantMembership.
+    """
+    login_all_tenants, is_member = get_user_model().objects.filter(pk=user.pk).values_list(
+        login_all_tenants_permission(),
+        Exists(TenantMembership.objects.for_tenant(tenant_key).filter(user=OuterRef("pk"))),
+    ).first() or (False, False)
+
+    return bool(login_all_tenants and user.is_active), bool(is_member)
+
+
+def get_login_grants(user, tenant_key, use_memberships=False):
+    """
+    Return whether the user may login on every tenant and either the sites of its signup sources
+    or, with use_memberships, whether it belongs to the tenant in TenantMembership.
+
+    They are read with one query, none for active superusers as with has_perm, and cached by user,
+    tenant and configuration version when EOX_TENANT_LOGIN_VERDICT_CACHE_TIMEOUT is set.
+    """
+    if user.is_active and user.is_superuser:
+        return True, None
+
+    key = None
+
+    if LOGIN_GRANTS.timeout > 0:
+        key = (user.pk, tenant_key, use_memberships, get_config_version())
+        grants = LOGIN_GRANTS.get(key)
+
+        if grants is not None:
+            return grants
+
+    if use_memberships:
+        grants = get_tenant_membership(user, tenant_key)
+    else:
+        grants = get_signup_sites(user)
+
+    if key is not None:
+        LOGIN_GRANTS.set(key, grants)
+
+    return grants
+
+
+def is_login_authorized(user, authorizer, grants, use_memberships=False):
+    """
+    Whether the user may login on a tenant, given the grants read by get_login_grants for it.
+
+    With use_memberships the user must belong to the tenant instead of having a signup source
+    allowed by the authorizer, the email is checked in both cases.
+    """
+    login_all_tenants, granted = grants
+
+    if login_all_tenants:
+        return True
+
+    email = getattr(user, "email", None)
+
+    if use_memberships:
+        return granted and authorizer.is_authorized_email(email)
+
+    return authorizer.is_authorized(granted, email)
@@ -5,6 +5,10 @@ from django.conf import settings
 
 from eox_tenant.edxapp_wrapper.site_configuration_module import get_configuration_helpers
 from eox_tenant.edxapp_wrapper.theming_helpers import get_theming_helpers
+from eox_tenant.org_index import ORG_INDEX
+
+# Read at the beginning so this can not be modified by the tenant configs
+EOX_TENANT_USE_ORG_INDEX = getattr(settings, "EOX_TENANT_USE_ORG_INDEX", False)
 
 
 def filter_enrollments(enrollments):
@@ -24,16 +28,19 @@ def filter_enrollments(enrollments):
 
     configuration_helpers = get_configuration_helpers()
     orgs_to_include = configuration_helpers.get_value('course_org_filter', None)
-    orgs_to_exclude = []
+    orgs_to_exclude = frozenset()
 
-    # Make sure we have a list
-    if orgs_to_include and not isinstance(orgs_to_include, list):
+    # Make sure we have a set
+    if isinstance(orgs_to_include, str):
         orgs_to_include = [orgs_to_include]
 
+    orgs_to_include = frozenset(orgs_to_include or [])
+
     if not orgs_to_include:
-        # Making orgs_to_include an empty iterable
-        orgs_to_include = []
-        orgs_to_exclude = configuration_helpers.get_all_orgs()
+        if EOX_TENANT_USE_ORG_INDEX:
+            orgs_to_exclude = ORG_INDEX.get_all_orgs()
+        else:
+            orgs_to_exclude = frozenset(configuration_helpers.get_all_orgs())
 
     for enrollment in enrollments:
 
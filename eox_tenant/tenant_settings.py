@@ -0,0 +1,304 @@
+"""
+Strategies to apply the tenant configurations on the settings object.
+
+The default strategy, used by eox_tenant.signals, rebuilds the whole settings object
+with `settings._setup()` before applying a different tenant. On big settings modules
+that is expensive, the strategies in this module only touch what a tenant changed.
+
+In context mode the global settings object is not changed at all. The settings of the
+tenant live in a context variable, and django.conf.settings becomes a ContextAwareSettings
+that reads them before the global ones, so threads or coroutines serving different tenants
+do not see each other's settings.
+"""
+from contextvars import ContextVar
+
+from django.conf import LazySettings, UserSettingsHolder
+from django.conf import settings as base_settings
+
+from eox_tenant.cache import LRUCache
+
+MISSING = object()
+
+# Settings object of the tenant served by the current request or task in context mode
+TENANT_SETTINGS = ContextVar("eox_tenant_settings", default=None)
+
+
+class ContextAwareSettings(LazySettings):
+    """
+    Class of django.conf.settings in context mode: every read looks first at the settings of
+    the tenant active in the current context and then at the global settings.
+
+    LazySettings caches the values it reads on the instance, which would show the values of
+    one context to the next one, so nothing is cached.
+    """
+
+    def __getattr__(self, name):
+        current_settings = TENANT_SETTINGS.get()
+
+        if current_settings is None:
+            value = super().__getattr__(name)
+            self.__dict__.pop(name, None)
+            return value
+
+        value = getattr(current_settings, name)
+
+        if name in {"MEDIA_URL", "STATIC_URL"} and value is not None:
+            value = self._add_script_prefix(value)
+
+        return value
+
+
+def install_context_settings():
+    """
+    Make django.conf.settings a ContextAwareSettings, dropping the values it cached.
+
+    LazyObject proxies __class__ to the wrapped settings, so the class is set with the
+    descriptor of object.
+    """
+    object.__dict__["__class__"].__set__(base_settings, ContextAwareSettings)  # pylint: disable=unnecessary-dunder-call
+
+    for name in [name for name in vars(base_settings) if name != "_wrapped"]:
+        del vars(base_settings)[name]
+
+
+def uninstall_context_settings():
+    """
+    Make django.conf.settings a LazySettings again.
+    """
+    object.__dict__["__class__"].__set__(base_settings, LazySettings)  # pylint: disable=unnecessary-dunder-call
+
+
+def get_current_settings():
+    """
+    Return the settings object of the tenant active in the current context, or the global one.
+    """
+    current_settings = TENANT_SETTINGS.get()
+
+    if current_settings is None:
+        return base_settings._wrapped  # pylint: disable=protected-access
+
+    return current_settings
+
+
+class ContextSettings:
+    """
+    Settings of the current context: a few values of the request over a snapshot.
+
+    Unlike UserSettingsHolder, names that are not uppercase, such as course_org_filter,
+    are read from the snapshot as well.
+    """
+
+    def __init__(self, default_settings, **values):
+        self.__dict__.update(values)
+        self.default_settings = default_settings
+
+    def __getattr__(self, name):
+        return getattr(self.default_settings, name)
+
+
+def activate_tenant_settings(snapshot, **values):
+    """
+    Make a snapshot, plus the given values, the settings of the current context.
+    """
+    current_settings = ContextSettings(snapshot, **values)
+
+    TENANT_SETTINGS.set(current_settings)
+    return current_settings
+
+
+def deactivate_tenant_settings():
+    """
+    Use the global settings in the current context.
+    """
+    TENANT_SETTINGS.set(None)
+
+
+def merge_config(base, config):
+    """
+    Return the values a tenant config sets over the base settings object.
+
+    Dict values are merged into a copy of the dict found in the base settings.
+    """
+    values = {}
+
+    for key, value in config.items():
+        if isinstance(value, dict):
+            try:
+                merged = getattr(base, key, {}).copy()
+            except AttributeError:
+                merged = {}
+            merged.update(value)
+            value = merged
+        values[key] = value
+
+    return values
+
+
+def get_settings_values(wrapped):
+    """
+    Return a dict with every value of a settings object, including the values
+    inherited by a UserSettingsHolder from its default settings.
+    """
+    if not isinstance(wrapped, (UserSettingsHolder, ContextSettings)):
+        return vars(wrapped)
+
+    values = dict(get_settings_values(wrapped.default_settings))
+    values.update(vars(wrapped))
+
+    for key in ("default_settings", "_deleted", *vars(wrapped).get("_deleted", ())):
+        values.pop(key, None)
+
+    return values
+
+
+class SettingsOverlay:
+    """
+    Record of the settings changed by the current tenant, so they can be undone one by one.
+
+    The first time a setting is changed its original value is stored. Dict values are merged
+    into a copy, so the stored original dict, with all its keys, is restored as it was.
+    """
+
+    def __init__(self):
+        self.originals = {}
+        self.exact = True
+
+    def set(self, key, value):
+        """
+        Change a setting, keeping its original value.
+        """
+        if key not in self.originals:
+            wrapped = base_settings._wrapped  # pylint: disable=protected-access
+            self.originals[key] = getattr(wrapped, key, MISSING)
+
+        setattr(base_settings, key, value)
+
+    def mark_inexact(self):
+        """
+        Flag that settings were changed outside of the overlay, for example by an
+        AppConfig.ready() method, so undoing the recorded changes is not enough.
+        """
+        self.exact = False
+
+    def undo(self):
+        """
+        Restore the original value of every changed setting.
+
+        Returns False, without changing anything, if the overlay can not restore the
+        settings object and a full reset is required.
+        """
+        if not self.exact:
+            return False
+
+        for key, original in self.originals.items():
+            if original is MISSING:
+                try:
+                    delattr(base_settings, key)
+                except AttributeError:
+                    pass
+                continue
+            setattr(base_settings, key, original)
+
+        self.clear()
+        return True
+
+    def clear(self):
+        """
+        Forget the recorded changes.
+        """
+        self.originals = {}
+        self.exact = True
+
+    def __len__(self):
+        return len(self.originals)
+
+
+class SettingsSnapshots:
+    """
+    Settings objects with the configurations of a tenant already applied.
+
+    Every snapshot is a UserSettingsHolder, the same object used by override_settings, that
+    holds the tenant values and reads everything else from the pristine settings object.
+    Applying a tenant replaces the object wrapped by django.conf.settings with its snapshot,
+    and the reset puts the pristine object back. Snapshots are built once per tenant and
+    service variant and built again only if the configurations of the tenant change.
+    """
+
+    def __init__(self, maxsize=256):
+        self.pristine = None
+        self.exact = True
+        self.builds = 0
+        self._snapshots = LRUCache(maxsize=maxsize, timeout=float("inf"))
+
+    def apply(self, tenant_key, config_key, config):
+        """
+        Make the snapshot of the tenant the current settings object.
+        """
+        snapshot = self.get(tenant_key, config_key, config)
+        base_settings._wrapped = snapshot  # pylint: disable=protected-access
+        return snapshot
+
+    def get(self, tenant_key, config_key, config):
+        """
+        Return the snapshot of the tenant, building it if the configurations changed.
+        """
+        cache_key = (tenant_key, config_key)
+        cached = self._snapshots.get(cache_key)
+
+        if cached and cached[1].default_settings is self.pristine and (cached[0] is config or cached[0] == config):
+            return cached[1]
+
+        snapshot = self.build(config)
+        self._snapshots.set(cache_key, (config, snapshot))
+        return snapshot
+
+    def build(self, config):
+        """
+        Return a new snapshot of the pristine settings with the tenant config applied.
+        """
+        if self.pristine is None:
+            self.pristine = base_settings._wrapped  # pylint: disable=protected-access
+
+        snapshot = UserSettingsHolder(self.pristine)
+        self.builds += 1
+
+        for key, value in merge_config(self.pristine, config).items():
+            setattr(snapshot, key, value)
+
+        return snapshot
+
+    def mark_inexact(self):
+        """
+        Flag that the pristine settings could have been changed, for example by an
+        AppConfig.ready() method, so putting it back is not enough.
+        """
+        self.exact = False
+
+    def reset(self):
+        """
+        Put back the pristine settings object.
+
+        Returns False, without changing anything, if the pristine object can not be
+        trusted anymore and a full reset is required.
+        """
+        if not self.exact:
+            return False
+
+        if self.pristine is not None:
+            base_settings._wrapped = self.pristine  # pylint: disable=protected-access
+
+        return True
+
+    def clear(self):
+        """
+        Forget the pristine settings object and every snapshot built over it.
+        """
+        self.pristine = None
+        self.exact = True
+        self._snapshots.clear()
+
+    def stats(self):
+        """
+        Return the usage counters of the snapshots.
+        """
+        return dict(self._snapshots.stats(), builds=self.builds)
@@ -3,14 +3,15 @@ Tenant wise proxies that allows to override the platform models.
 """
 import json
 import logging
-from itertools import chain
 
 import six
 from django.conf import settings
-from django.core.cache import cache
 
+from eox_tenant.cache import TENANT_CACHE, SoftTTLCache
 from eox_tenant.edxapp_wrapper.site_configuration_module import get_site_configuration_models
-from eox_tenant.models import Microsite, TenantConfig, TenantOrganization
+from eox_tenant.models import ORG_ADDRESSABLE_KEYS, Microsite, TenantConfig, TenantOrganization, TenantOrganizationValue
+from eox_tenant.org_index import ORG_INDEX
+from eox_tenant.tenant_settings import get_current_settings, get_settings_values
 from eox_tenant.utils import clean_serializable_values
 
 SiteConfigurationModels = get_site_configuration_models()
@@ -22,9 +23,24 @@ EOX_TENANT_CACHE_KEY_TIMEOUT = getattr(
     300
 )
 TENANT_MICROSITES_ITERATOR_KEY = "tenant-microsites-iterator"
+# Read at the beginning so this can not be modified by the tenant configs
+EOX_TENANT_USE_ORG_INDEX = getattr(settings, "EOX_TENANT_USE_ORG_INDEX", False)
+ORG_VALUE_CACHE = SoftTTLCache(timeout=EOX_TENANT_CACHE_KEY_TIMEOUT)
 logger = logging.getLogger(__name__)
 
 
+def _resolve_org_value(first_value, tenant_value):
+    """
+    Return the value of an org for a tenant from the (source, value) tuples collected by
+    pre_load_values_by_org: the value of the tenant wins if it comes from the same source
+    as the first value of the org.
+    """
+    if tenant_value and tenant_value[0] == first_value[0]:
+        return tenant_value[1]
+
+    return first_value[1] if first_value else None
+
+
 class TenantSiteConfigProxy(SiteConfigurationModels.SiteConfiguration):
     """
     This a is Proxy model for SiteConfiguration from <openedx.core.djangoapps.site_configuration.models>.
@@ -75,7 +91,7 @@ class TenantSiteConfigProxy(SiteConfigurationModels.SiteConfiguration):
         Returns a serializable subset of the loaded settings.
         """
         if self.enabled:
-            return vars(settings._wrapped)  # pylint: disable=protected-access
+            return get_settings_values(get_current_settings())
         return {}
 
     @values.setter
@@ -109,10 +125,15 @@ class TenantSiteConfigProxy(SiteConfigurationModels.SiteConfiguration):
     def get_all_orgs(cls):
         """
         This returns a set of orgs that are considered within all microsites and TenantConfig.
-        This can be used, for example, to do filtering
+        This can be used, for example, to do filtering.
+
+        With EOX_TENANT_USE_ORG_INDEX the frozenset kept by the org index is returned.
         """
+        if EOX_TENANT_USE_ORG_INDEX:
+            return ORG_INDEX.get_all_orgs()
+
         # Check the cache first
-        org_filter_set = cache.get(TENANT_ALL_ORGS_CACHE_KEY)
+        org_filter_set = TENANT_CACHE.get(TENANT_ALL_ORGS_CACHE_KEY)
 
         if org_filter_set:
             return org_filter_set
@@ -133,9 +154,9 @@ class TenantSiteConfigProxy(SiteConfigurationModels.SiteConfiguration):
     @classmethod
     def set_key_to_cache(cls, key, value):
         """
-        Stores a key value pair in a cache scoped to the thread
+        Stores a key value pair in the local and shared caches
         """
-        cache.set(
+        TENANT_CACHE.set(
             key,
             value,
             EOX_TENANT_CACHE_KEY_TIMEOUT
@@ -146,61 +167,162 @@ class TenantSiteConfigProxy(SiteConfigurationModels.SiteConfiguration):
         """
         Optimized method, that returns a value for the given org and val_name, from the
         TenantConfig or Microsite model.
+
+        Orgs without a value are cached as well, so they do not query the database again.
+        """
+        tenant_key = getattr(settings, "EDNX_TENANT_KEY", None)
+        cache_key = cls.__get_org_value_cache_key(org, val_name, tenant_key)
+        result = ORG_VALUE_CACHE.get_or_set(
+            cache_key,
+            lambda: cls.__get_values_from_db([org], val_name, tenant_key).get(org),
+        )
+
+        return default if result is None else result
+
+    @staticmethod
+    def __get_values_from_db(orgs, val_name, tenant_key):
+        """
+        Return a dict of org to value for the orgs that have a value, looking first at the
+        TenantConfig and then at the Microsite configurations.
+
+        ORG_ADDRESSABLE_KEYS are read from TenantOrganizationValue. Orgs without rows are read
+        from the configurations, in case synchronize_organizations was not run after adding the
+        key to the setting; the result is cached either way.
+        """
+        if val_name in ORG_ADDRESSABLE_KEYS:
+            values = TenantOrganizationValue.get_values_for_orgs(orgs, val_name, tenant_key)
+
+            if values:
+                return values
+
+        values = TenantConfig.get_values_for_orgs(orgs, val_name, tenant_key)
+        microsite_orgs = set(orgs).difference(values)
+
+        if microsite_orgs:
+            values.update(Microsite.get_values_for_orgs(microsite_orgs, val_name, tenant_key))
+
+        return values
+
+    @staticmethod
+    def __get_org_value_cache_key(org, val_name, tenant_key):
+        """
+        Return the cache key of the value of an org.
+
+        Make use of tenant-external-key to generate unique cache_key per
+        tenant. This will help to fetch the current tenant value if the org
+        is configured in multiple tenants/microsites including the current
+        one.
         """
         cache_key = f"org-value-{org}-{val_name}"
 
-        # Make use of tenant-external-key to generate unique cache_key per
-        # tenant. This will help to fetch the current tenant value if the org
-        # is configured in multiple tenants/microsites including the current
-        # one.
-        tenant_key = getattr(settings, "EDNX_TENANT_KEY", None)
         if tenant_key is not None:
             cache_key = f"{cache_key}-{tenant_key}"
-        cached_value = cache.get(cache_key)
 
-        if cached_value:
-            return cached_value
+        return cache_key
 
-        result = TenantConfig.get_value_for_org(org, val_name, tenant_key)
+    @classmethod
+    def pre_load_values_by_org(cls, val_name, tenant_keys=None, batch_size=500, force=False):
+        """
+        Save in cache the values for the organizations in TenantConfig and Microsite models.
+
+        The configurations are streamed in chunks of batch_size and the values are written with
+        set_many, under the same tenant scoped keys read by get_value_for_org. Keys are written
+        for the tenants in tenant_keys, by default only the current one, and only for the orgs
+        that have a value; the others are resolved by get_value_for_org when read.
 
-        if result is not None:
-            cls.set_key_to_cache(cache_key, result)
-            return result
+        Returns:
+            The number of keys written.
+        """
+        if tenant_keys is None:
+            tenant_keys = [getattr(settings, "EDNX_TENANT_KEY", None)]
 
-        result = Microsite.get_value_for_org(org, val_name, tenant_key)
-        result = result if result else default
-        cls.set_key_to_cache(cache_key, result)
+        pending = [
+            tenant_key for tenant_key in dict.fromkeys(tenant_keys)
+            if force or not TENANT_CACHE.get(cls.__get_pre_load_cache_key(val_name, tenant_key))
+        ]
 
-        return result
+        if not pending:
+            return 0
 
-    @classmethod
-    def pre_load_values_by_org(cls, val_name):
+        first_values, tenant_values = cls.__collect_org_values(val_name, batch_size)
+
+        written = 0
+        batch = {}
+
+        for tenant_key in pending:
+            for org, first_value in first_values.items():
+                value = _resolve_org_value(first_value, tenant_values.get((org, tenant_key)))
+
+                if value is None:
+                    continue
+
+                batch[cls.__get_org_value_cache_key(org, val_name, tenant_key)] = value
+
+                if len(batch) >= batch_size:
+                    ORG_VALUE_CACHE.set_many(batch)
+                    written += len(batch)
+                    batch = {}
+
+        ORG_VALUE_CACHE.set_many(batch)
+        written += len(batch)
+
+        for tenant_key in pending:
+            cls.set_key_to_cache(cls.__get_pre_load_cache_key(val_name, tenant_key), True)
+
+        return written
+
+    @staticmethod
+    def __get_pre_load_cache_key(val_name, tenant_key):
+        """
+        Return the cache key marking the values of a tenant as preloaded.
+        """
+        cache_key = f"eox-tenant-pre-load-{val_name}-key"
+
+        if tenant_key is not None:
+            cache_key = f"{cache_key}-{tenant_key}"
+
+        return cache_key
+
+    @staticmethod
+    def __collect_org_values(val_name, batch_size):
         """
-        Save in cache the values for all the organizations in TenantConfig and Microsite models.
+        Stream the TenantConfig and Microsite configurations and return:
+
+        - a dict of org to the first (source, value) found, or None if no tenant of the org has a value.
+        - a dict of (org, tenant_key) to the (source, value) of that tenant.
+
+        The source is 0 for TenantConfig and 1 for Microsite, since the TenantConfig values are
+        preferred over the ones of Microsite, as in get_value_for_org.
         """
-        pre_load_value_key = f"eox-tenant-pre-load-{val_name}-key"
+        first_values = {}
+        tenant_values = {}
+        sources = (
+            TenantConfig.objects.order_by("pk").values_list("external_key", "lms_configs"),
+            Microsite.objects.order_by("pk").values_list("key", "values"),
+        )
 
-        if cache.get(pre_load_value_key):
-            return
+        for source, queryset in enumerate(sources):
+            for tenant_key, config in queryset.iterator(chunk_size=batch_size):
+                try:
+                    if isinstance(config, six.string_types):
+                        config = json.loads(config)
 
-        tenant_config = TenantConfig.objects.values_list("lms_configs", flat=True)
-        microsite_config = Microsite.objects.values_list("values", flat=True)
+                    org_filter = config.get("course_org_filter", [])
+                    result = config.get(val_name)
+                except AttributeError:
+                    continue
 
-        for config in chain(microsite_config, tenant_config):
-            try:
-                if isinstance(config, six.string_types):
-                    config = json.loads(config)
+                if isinstance(org_filter, six.string_types):
+                    org_filter = [org_filter]
 
-                org_filter = config.get("course_org_filter", [])
-                result = config.get(val_name)
-            except AttributeError:
-                continue
+                for org in org_filter:
+                    if result is None:
+                        first_values.setdefault(org, None)
+                        continue
 
-            if isinstance(org_filter, six.string_types):
-                org_filter = [org_filter]
+                    if first_values.get(org) is None:
+                        first_values[org] = (source, result)
 
-            for org in org_filter:
-                key = f"org-value-{org}-{val_name}"
-                cls.set_key_to_cache(key, result)
+                    tenant_values.setdefault((org, tenant_key), (source, result))
 
-        cls.set_key_to_cache(pre_load_value_key, True)
+        return first_values, tenant_values
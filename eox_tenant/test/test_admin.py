@@ -2,7 +2,8 @@
 Tests for Admin module
 """
 from django.contrib.admin.sites import AdminSite
-from django.test import TestCase
+from django.test import RequestFactory, TestCase, override_settings
+from mock import patch
 
 from eox_tenant.admin import MicrositeAdmin, TenantConfigAdmin
 from eox_tenant.models import Microsite, TenantConfig
@@ -108,3 +109,19 @@ class TenantConfigAdminTest(TestCase):
         """
         ednx_signal = self.tenant_config_admin.ednx_signal(self.tenant_config)
         self.assertTrue(ednx_signal)
+
+    @override_settings(EOX_TENANT_NATIVE_JSON_INDEXED_KEYS=["SITE_NAME"])
+    @patch("eox_tenant.fields.EOX_TENANT_NATIVE_JSON_FIELDS", True)
+    def test_search_native_json_fields(self):
+        """
+        Test the search matches the indexed keys instead of scanning the JSON columns
+        """
+        self.tenant_config.save()
+        TenantConfig.objects.create(external_key="other_key", lms_configs={"PLATFORM_NAME": "test_sitename"})
+        request = RequestFactory().get("/admin/eox_tenant/tenantconfig/")
+
+        self.assertEqual(self.tenant_config_admin.get_search_fields(request), ("external_key", "route__domain"))
+
+        for term, expected in (("test_sitename", ["external_fake_key"]), ("other_key", ["other_key"]), ("test", [])):
+            results, _ = self.tenant_config_admin.get_search_results(request, TenantConfig.objects.all(), term)
+            self.assertEqual(list(results.values_list("external_key", flat=True)), expected)
@@ -3,13 +3,64 @@
 Module for Auth backend tests.
 """
 import mock
-from django.contrib.auth.models import Permission, User
+from ddt import data, ddt, unpack
+from django.contrib.auth.models import Group, Permission, User
+from django.db import connection, models
 from django.test import RequestFactory, TestCase, override_settings
 
+from eox_tenant.models import TenantConfig, TenantMembership
 from eox_tenant.permissions import LOGIN_ALL_TENANTS_PERMISSION_CODENAME, load_permissions
+from eox_tenant.signup_sources import (
+    LOGIN_GRANTS,
+    SignupSourceAuthorizer,
+    get_login_grants,
+    get_signup_sites,
+    get_signup_source_authorizer,
+    is_login_authorized,
+)
 
 
-class TenantAwareAuthBackendTest(TestCase):
+class UserSignupSource(models.Model):
+    """
+    Stand in for the UserSignupSource model of edx-platform, not installed in the tests.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    site = models.CharField(max_length=255, db_index=True)
+
+    class Meta:
+        """Registered in the eox_tenant app, its table is created by SignupSourceTestCase."""
+
+        app_label = "eox_tenant"
+
+
+class SignupSourceTestCase(TestCase):
+    """
+    Test case with the table of the UserSignupSource stand in.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Create the table outside of the transaction of the test case.
+        """
+        with connection.schema_editor() as schema_editor:
+            schema_editor.create_model(UserSignupSource)
+
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Drop the table of the signup sources.
+        """
+        super().tearDownClass()
+
+        with connection.schema_editor() as schema_editor:
+            schema_editor.delete_model(UserSignupSource)
+
+
+class TenantAwareAuthBackendTest(SignupSourceTestCase):
     """
     Test tenant aware auth backend.
     """
@@ -24,28 +75,28 @@ class TenantAwareAuthBackendTest(TestCase):
             email='user@valid.domain.org',
         )
 
-        usersignup_source = mock.MagicMock()
-        usersignup_source.site = 'valid.domain.org'
-
-        usersignup_source_set = mock.MagicMock()
-        usersignup_source_set.all.return_value = [usersignup_source]
-
-        self.user.usersignupsource_set = usersignup_source_set
+        UserSignupSource.objects.create(user=self.user, site='valid.domain.org')
 
+    @override_settings(
+        REGISTRATION_EMAIL_PATTERNS_ALLOWED=None,
+        FEATURES={
+            'EDNX_ENABLE_STRICT_LOGIN': True
+        })
     @mock.patch('eox_tenant.edxapp_wrapper.auth.get_edx_auth_failed')
     @mock.patch('eox_tenant.edxapp_wrapper.auth.get_edx_auth_backend')
     @mock.patch('eox_tenant.test_utils.test_theming_helpers.get_current_request')
     def test_authentication_with_custom_permission(self, edx_get_current_request_mock,
                                                    edx_auth_backend_mock, edx_auth_failed_mock):
         """
-        Test if the user can authenticate in a domain where the user has signupsource
+        Test if the user with the login all tenants permission can authenticate in a domain
+        where the user does not have signupsource, with a single query
         """
         edx_auth_backend_mock.return_value = object
         edx_auth_failed_mock.return_value = Exception
 
         request = self.request_factory.get('/login')
 
-        http_host = 'valid.domain.org'
+        http_host = 'invalid.domain.org'
         request.META['HTTP_HOST'] = http_host
 
         edx_get_current_request_mock.return_value = request
@@ -57,12 +108,35 @@ class TenantAwareAuthBackendTest(TestCase):
         custom_permission = Permission.objects.get(codename=LOGIN_ALL_TENANTS_PERMISSION_CODENAME)
         self.user.user_permissions.add(custom_permission)
 
-        user_can_authenticate_on_tenant = auth_backend.user_can_authenticate_on_tenant(self.user)
+        with self.assertNumQueries(1):
+            user_can_authenticate_on_tenant = auth_backend.user_can_authenticate_on_tenant(self.user)
 
         self.assertTrue(user_can_authenticate_on_tenant)
         edx_get_current_request_mock.assert_not_called()
         self.user.user_permissions.clear()
 
+    @mock.patch('eox_tenant.auth.emit_timing')
+    @mock.patch('eox_tenant.auth.get_timing_sinks')
+    def test_emit_login_timing(self, get_timing_sinks_mock, emit_timing_mock):
+        """
+        Test the login checks are timed only when there are timing sinks
+        """
+        with mock.patch('eox_tenant.edxapp_wrapper.auth.get_edx_auth_backend', return_value=object), \
+                mock.patch('eox_tenant.edxapp_wrapper.auth.get_edx_auth_failed', return_value=Exception):
+            from eox_tenant.auth import emit_login_timing  # pylint: disable=import-outside-toplevel
+
+        get_timing_sinks_mock.return_value = []
+        emit_login_timing('tenant_auth_backend', 0.1, True)
+        emit_timing_mock.assert_not_called()
+
+        get_timing_sinks_mock.return_value = [mock.Mock()]
+        emit_login_timing('tenant_auth_backend', 0.1, False)
+        emit_timing_mock.assert_called_once_with(
+            'eox_tenant.login.tenant_auth_backend',
+            0.1,
+            {'tenant': None, 'outcome': 'denied'},
+        )
+
     @mock.patch('eox_tenant.edxapp_wrapper.auth.get_edx_auth_failed')
     @mock.patch('eox_tenant.edxapp_wrapper.auth.get_edx_auth_backend')
     @mock.patch('eox_tenant.test_utils.test_theming_helpers.get_current_request')
@@ -114,6 +188,39 @@ class TenantAwareAuthBackendTest(TestCase):
 
         self.assertTrue(user_can_authenticate_on_tenant)
 
+    @override_settings(
+        EDNX_TENANT_KEY='tenant-key',
+        REGISTRATION_EMAIL_PATTERNS_ALLOWED=None,
+        FEATURES={
+            'EDNX_ENABLE_STRICT_LOGIN': True
+        })
+    @mock.patch('eox_tenant.edxapp_wrapper.auth.get_edx_auth_failed')
+    @mock.patch('eox_tenant.edxapp_wrapper.auth.get_edx_auth_backend')
+    @mock.patch('eox_tenant.test_utils.test_theming_helpers.get_current_request')
+    def test_memberships_login_policy_is_opt_in(self, edx_get_current_request_mock,
+                                                edx_auth_backend_mock, edx_auth_failed_mock):
+        """
+        Keeping the memberships up to date does not change the login check, that needs its own setting.
+        """
+        edx_auth_backend_mock.return_value = object
+        edx_auth_failed_mock.return_value = Exception
+
+        request = self.request_factory.get('/login')
+        request.META['HTTP_HOST'] = 'valid.domain.org'
+        edx_get_current_request_mock.return_value = request
+
+        from eox_tenant.auth import TenantAwareAuthBackend  # pylint: disable=import-outside-toplevel
+
+        auth_backend = TenantAwareAuthBackend()
+
+        with mock.patch('eox_tenant.auth.EOX_TENANT_USE_TENANT_MEMBERSHIPS', True):
+            self.assertTrue(auth_backend.user_can_authenticate_on_tenant(self.user))
+
+            with mock.patch('eox_tenant.auth.EOX_TENANT_LOGIN_WITH_TENANT_MEMBERSHIPS', True):
+                # The user has a signup source on the host but no membership in the tenant
+                with self.assertRaises(Exception):
+                    auth_backend.user_can_authenticate_on_tenant(self.user)
+
     @override_settings(
         REGISTRATION_EMAIL_PATTERNS_ALLOWED=None,
         FEATURES={
@@ -246,3 +353,249 @@ class TenantAwareAuthBackendTest(TestCase):
         user_can_authenticate_on_tenant = auth_backend.user_can_authenticate_on_tenant(self.user)
 
         self.assertTrue(user_can_authenticate_on_tenant)
+
+
+@ddt
+class SignupSourceAuthorizerTest(TestCase):
+    """
+    Test the compiled signup source authorizer.
+    """
+
+    @data(
+        ("valid.domain.org", True),
+        ("VALID.Domain.org", True),
+        ("validxdomain.org", True),
+        ("valid.domain.org.evil.com", False),
+        ("sub.tenant.org", True),
+        ("tenant.org", False),
+        ("other.org", False),
+    )
+    @unpack
+    def test_is_authorized_site(self, site, expected):
+        """
+        Sites match the whole pattern ignoring the case, as re.match(pattern + "$") did.
+        """
+        authorizer = SignupSourceAuthorizer(["valid.domain.org", r".+\.tenant\.org"])
+
+        self.assertEqual(authorizer.is_authorized_site(site), expected)
+
+    def test_exact_sources(self):
+        """
+        Plain domains are kept in the exact match set and regexes are not.
+        """
+        authorizer = SignupSourceAuthorizer(["Valid.Domain.org", r".+\.tenant\.org"])
+
+        self.assertEqual(authorizer.exact_sources, frozenset(["valid.domain.org"]))
+
+    def test_no_sources(self):
+        """
+        No site is authorized without sources.
+        """
+        authorizer = SignupSourceAuthorizer([])
+
+        self.assertFalse(authorizer.is_authorized(["valid.domain.org", ""], "user@valid.domain.org"))
+
+    @data(
+        (None, "user@other.org", True),
+        ([], "user@valid.domain.org", False),
+        ([r".*@valid\.domain\.org"], "user@valid.domain.org", True),
+        ([r".*@valid\.domain\.org"], "user@VALID.domain.org", False),
+        ([r".*@valid\.domain\.org"], None, False),
+    )
+    @unpack
+    def test_is_authorized_email(self, email_patterns, email, expected):
+        """
+        Emails match the whole pattern with the case, None allows any email.
+        """
+        authorizer = SignupSourceAuthorizer(["valid.domain.org"], email_patterns)
+
+        self.assertEqual(authorizer.is_authorized_email(email), expected)
+
+    @data(
+        ([r"(?i).*@valid\.domain\.org"], "user@VALID.domain.org", True),
+        ([r"admin@other\.org", r"(?i).*@valid\.domain\.org"], "USER@valid.domain.org", True),
+        ([r"(x)y", r"(\w+)@\1\.org"], "tenant@tenant.org", True),
+        ([r"(x)y", r"(\w+)@\1\.org"], "tenant@other.org", False),
+    )
+    @unpack
+    def test_email_patterns_keep_their_meaning(self, email_patterns, email, expected):
+        """
+        Inline flags and backreferences work as they did with each pattern matched on its own.
+        """
+        authorizer = SignupSourceAuthorizer(["valid.domain.org"], email_patterns)
+
+        self.assertEqual(authorizer.is_authorized_email(email), expected)
+
+    @data(
+        ("a.com", True),
+        ("a.com.evil.org", True),
+        ("b.com", True),
+        ("b.com.evil.org", False),
+    )
+    @unpack
+    def test_top_level_alternation(self, site, expected):
+        """
+        Only the last branch of a top level alternation is anchored, as with re.match(pattern + "$").
+        """
+        authorizer = SignupSourceAuthorizer([r"a\.com|b\.com", "other.org"])
+
+        self.assertEqual(authorizer.is_authorized_site(site), expected)
+
+    def test_stops_at_first_authorized_site(self):
+        """
+        The sites after the first authorized one are not read.
+        """
+        authorizer = SignupSourceAuthorizer(["valid.domain.org"])
+        sites = iter(["other.org", "valid.domain.org", "never.read.org"])
+
+        self.assertTrue(authorizer.is_authorized(sites, "user@valid.domain.org"))
+        self.assertEqual(list(sites), ["never.read.org"])
+
+    def test_get_signup_source_authorizer(self):
+        """
+        The authorizer is compiled once for every set of patterns.
+        """
+        authorizer = get_signup_source_authorizer(["valid.domain.org"], [r".*@valid\.domain\.org"])
+
+        self.assertIs(get_signup_source_authorizer(["valid.domain.org"], (r".*@valid\.domain\.org",)), authorizer)
+        self.assertIsNot(get_signup_source_authorizer(["valid.domain.org"]), authorizer)
+        self.assertIsNot(get_signup_source_authorizer(["other.org"], [r".*@valid\.domain\.org"]), authorizer)
+
+
+class LoginAuthorizationTest(SignupSourceTestCase):
+    """
+    Test the single query check of the users that may login on a tenant.
+    """
+
+    def setUp(self):
+        """
+        Create a user with a signup source.
+        """
+        self.user = User.objects.create_user(username='validuser', email='user@valid.domain.org')
+        UserSignupSource.objects.create(user=self.user, site='valid.domain.org')
+        self.authorizer = SignupSourceAuthorizer(['other.domain.org'])
+        load_permissions()
+        self.permission = Permission.objects.get(codename=LOGIN_ALL_TENANTS_PERMISSION_CODENAME)
+        LOGIN_GRANTS.clear()
+
+    def is_authorized(self, authorizer, tenant_key, use_memberships=False):
+        """
+        Read the grants of the user on the tenant and check them with the authorizer.
+        """
+        grants = get_login_grants(self.user, tenant_key, use_memberships)
+
+        return is_login_authorized(self.user, authorizer, grants, use_memberships)
+
+    def test_get_signup_sites(self):
+        """
+        The sites and the permission are read with one query, joining the signup sources.
+        """
+        UserSignupSource.objects.create(user=self.user, site='other.domain.org')
+        UserSignupSource.objects.create(
+            user=User.objects.create_user(username='otheruser'),
+            site='third.domain.org',
+        )
+
+        with self.assertNumQueries(1):
+            login_all_tenants, sites = get_signup_sites(self.user)
+
+        self.assertFalse(login_all_tenants)
+        self.assertEqual(sorted(sites), ['other.domain.org', 'valid.domain.org'])
+
+    def test_get_signup_sites_without_sources(self):
+        """
+        A user without signup sources keeps the permission granted by a group.
+        """
+        UserSignupSource.objects.filter(user=self.user).delete()
+        group = Group.objects.create(name='staff')
+        group.permissions.add(self.permission)
+        self.user.groups.add(group)
+
+        self.assertEqual(get_signup_sites(self.user), (True, []))
+
+        group.user_set.clear()
+        self.user.user_permissions.add(self.permission)
+
+        self.assertEqual(get_signup_sites(self.user), (True, []))
+
+        self.user.user_permissions.clear()
+
+        self.assertEqual(get_signup_sites(self.user), (False, []))
+
+    def test_inactive_user_permission(self):
+        """
+        Inactive users have no permissions, as with has_perm.
+        """
+        self.user.user_permissions.add(self.permission)
+        self.user.is_active = False
+
+        self.assertEqual(get_signup_sites(self.user), (False, ['valid.domain.org']))
+
+    def test_superuser(self):
+        """
+        Active superusers are authorized without queries.
+        """
+        self.user.is_superuser = True
+
+        with self.assertNumQueries(0):
+            self.assertTrue(self.is_authorized(self.authorizer, 'tenant-key'))
+
+    def test_is_login_authorized(self):
+        """
+        Users are authorized by the permission or by a signup source allowed by the authorizer.
+        """
+        self.assertFalse(self.is_authorized(self.authorizer, 'tenant-key'))
+        self.assertTrue(self.is_authorized(SignupSourceAuthorizer(['valid.domain.org']), 'tenant-key'))
+
+        self.user.user_permissions.add(self.permission)
+
+        self.assertTrue(self.is_authorized(self.authorizer, 'tenant-key'))
+
+    @mock.patch('eox_tenant.signup_sources.get_config_version')
+    def test_cached_grants(self, get_config_version_mock):
+        """
+        Grants are cached by user, tenant and configuration version.
+        """
+        get_config_version_mock.return_value = 1
+
+        with mock.patch.object(LOGIN_GRANTS, 'timeout', 60):
+            self.assertFalse(self.is_authorized(self.authorizer, 'tenant-key'))
+            self.user.user_permissions.add(self.permission)
+
+            with self.assertNumQueries(0):
+                self.assertFalse(self.is_authorized(self.authorizer, 'tenant-key'))
+
+            self.assertTrue(self.is_authorized(self.authorizer, 'other-tenant-key'))
+
+            get_config_version_mock.return_value = 2
+            self.assertTrue(self.is_authorized(self.authorizer, 'tenant-key'))
+
+    def test_memberships(self):
+        """
+        With memberships the user must belong to the tenant, with one query.
+        """
+        tenant = TenantConfig.objects.create(external_key='tenant-key')
+        authorizer = SignupSourceAuthorizer(['valid.domain.org'], [r'.*@valid\.domain\.org'])
+
+        with self.assertNumQueries(1):
+            self.assertFalse(self.is_authorized(authorizer, 'tenant-key', True))
+
+        TenantMembership.objects.create(user=self.user, tenant_config=tenant)
+
+        self.assertTrue(self.is_authorized(authorizer, 'tenant-key', True))
+        self.assertFalse(self.is_authorized(authorizer, 'other-key', True))
+
+        self.user.email = 'user@other.org'
+
+        self.assertFalse(self.is_authorized(authorizer, 'tenant-key', True))
+
+    def test_grants_not_cached_by_default(self):
+        """
+        Without EOX_TENANT_LOGIN_VERDICT_CACHE_TIMEOUT every check reads the database.
+        """
+        self.is_authorized(self.authorizer, 'tenant-key')
+
+        with self.assertNumQueries(1):
+            self.is_authorized(self.authorizer, 'tenant-key')
+
+        self.assertEqual(len(LOGIN_GRANTS), 0)
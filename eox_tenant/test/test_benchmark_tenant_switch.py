@@ -0,0 +1,53 @@
+"""This module include a class that checks the command benchmark_tenant_switch.py"""
+import json
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from eox_tenant.models import Microsite, TenantConfig
+
+
+class BenchmarkTenantSwitchTestCase(TestCase):
+    """ This class checks the command benchmark_tenant_switch.py"""
+
+    def test_benchmark_results(self):
+        """Every scenario is measured and the synthetic tenants are rolled back"""
+        output = StringIO()
+
+        call_command("benchmark_tenant_switch", tenants=3, config_size=5, requests=10, warmup=2, stdout=output)
+        results = json.loads(output.getvalue())
+
+        self.assertEqual(results["tenants"], 3)
+        self.assertEqual(
+            set(results["scenarios"]),
+            {"same_tenant", "alternating", "round_robin", "unknown_host", "microsite"},
+        )
+        self.assertEqual(results["scenarios"]["same_tenant"]["outcomes"], {"kept": 10})
+        self.assertEqual(results["scenarios"]["alternating"]["outcomes"], {"switched": 10})
+        self.assertEqual(results["scenarios"]["unknown_host"]["outcomes"], {"reset": 10})
+        self.assertFalse(TenantConfig.objects.exists())
+        self.assertFalse(Microsite.objects.exists())
+
+    def test_benchmark_memory(self):
+        """The peak memory is reported when it is traced"""
+        output = StringIO()
+
+        call_command(
+            "benchmark_tenant_switch",
+            tenants=2,
+            config_size=5,
+            requests=5,
+            warmup=1,
+            scenarios=["round_robin"],
+            trace_memory=True,
+            stdout=output,
+        )
+        results = json.loads(output.getvalue())
+
+        self.assertGreater(results["scenarios"]["round_robin"]["peak_memory_kb"], 0)
+
+    def test_benchmark_needs_two_tenants(self):
+        """The alternating scenario needs two tenants"""
+        with self.assertRaises(CommandError):
+            call_command("benchmark_tenant_switch", tenants=1)
@@ -0,0 +1,61 @@
+"""
+Tests for the requests left alone by eox-tenant.
+"""
+from ddt import data, ddt, unpack
+from django.test import RequestFactory, TestCase
+
+from eox_tenant.bypass import RequestBypass
+
+
+@ddt
+class RequestBypassTest(TestCase):
+    """
+    Test the RequestBypass class.
+    """
+
+    def setUp(self):
+        """ setup """
+        self.bypass = RequestBypass(
+            path_prefixes=["/static/", "/static/css/", "/heartbeat", "/media/"],
+            hosts=["Health.local:8000"],
+        )
+
+    def test_prefixes_covered_by_shorter_ones_are_dropped(self):
+        """
+        Prefixes already covered by a shorter prefix are not kept.
+        """
+        self.assertEqual(self.bypass.path_prefixes, ("/heartbeat", "/media/", "/static/"))
+        self.assertEqual(self.bypass.hosts, frozenset(["health.local"]))
+
+    @data(
+        ("/static/js/lms.js", "tenant.com", True),
+        ("/heartbeat?extended", "tenant.com", True),
+        ("/dashboard", "health.local:18000", True),
+        ("/dashboard", "tenant.com", False),
+        ("/courses/static/", "tenant.com", False),
+        (None, None, False),
+    )
+    @unpack
+    def test_matches(self, path, host, bypassed):
+        """
+        Requests are matched by path prefix or by host.
+        """
+        self.assertEqual(self.bypass.matches(path, host), bypassed)
+
+    def test_matches_environ_and_request(self):
+        """
+        WSGI environs and requests are matched by their path and host.
+        """
+        request = RequestFactory().get("/media/logo.png", HTTP_HOST="tenant.com")
+
+        self.assertTrue(self.bypass.matches_request(request))
+        self.assertTrue(self.bypass.matches_environ({"PATH_INFO": "/media/logo.png", "HTTP_HOST": "tenant.com"}))
+        self.assertFalse(self.bypass.matches_environ({"HTTP_HOST": "tenant.com"}))
+
+    def test_empty(self):
+        """
+        Without prefixes and hosts nothing is bypassed.
+        """
+        self.assertFalse(RequestBypass())
+        self.assertTrue(self.bypass)
+        self.assertFalse(RequestBypass().matches("/static/", "health.local"))
@@ -0,0 +1,282 @@
+"""
+Tests for the in-process caches.
+"""
+from django.core.cache import cache as django_cache
+from django.test import TestCase
+from mock import MagicMock, patch
+
+from eox_tenant.cache import (
+    CONFIG_VERSION_CACHE_KEY,
+    TENANT_CACHE,
+    LRUCache,
+    SoftTTLCache,
+    TwoTierCache,
+    bump_config_version,
+    get_config_version,
+)
+
+
+class LRUCacheTest(TestCase):
+    """
+    Test the LRUCache class.
+    """
+
+    def test_get_and_set(self):
+        """
+        Stored values are returned and missing keys return the default.
+        """
+        cache = LRUCache(maxsize=2, timeout=60)
+
+        cache.set("key", "value")
+
+        self.assertEqual(cache.get("key"), "value")
+        self.assertEqual(cache.get("other", "default"), "default")
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_least_recently_used_is_evicted(self):
+        """
+        When the cache is full the least recently used entry is dropped.
+        """
+        cache = LRUCache(maxsize=2, timeout=60)
+        cache.set("first", 1)
+        cache.set("second", 2)
+        cache.get("first")
+
+        cache.set("third", 3)
+
+        self.assertIn("first", cache)
+        self.assertNotIn("second", cache)
+        self.assertIn("third", cache)
+
+    @patch("eox_tenant.cache.monotonic")
+    def test_expired_entries_are_misses(self, monotonic_mock):
+        """
+        Entries older than the timeout are not returned.
+        """
+        monotonic_mock.return_value = 100
+        cache = LRUCache(maxsize=2, timeout=60)
+        cache.set("key", "value")
+
+        monotonic_mock.return_value = 161
+
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(len(cache), 0)
+
+    def test_disabled_cache(self):
+        """
+        A timeout of zero disables the cache.
+        """
+        cache = LRUCache(maxsize=2, timeout=0)
+
+        cache.set("key", "value")
+
+        self.assertIsNone(cache.get("key"))
+
+    def test_delete_and_clear(self):
+        """
+        Entries can be removed one by one or all at once.
+        """
+        cache = LRUCache(maxsize=3, timeout=60)
+        cache.set("first", 1)
+        cache.set("second", 2)
+
+        cache.delete("first")
+        self.assertNotIn("first", cache)
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_set_version(self):
+        """
+        Changing the version drops the entries stored under the previous one.
+        """
+        cache = LRUCache(maxsize=3, timeout=60)
+        cache.set_version(1)
+        cache.set("key", "value")
+
+        cache.set_version(1)
+        self.assertIn("key", cache)
+
+        cache.set_version(2)
+        self.assertNotIn("key", cache)
+
+
+class SoftTTLCacheTest(TestCase):
+    """
+    Test the SoftTTLCache class.
+    """
+
+    def setUp(self):
+        """ setup """
+        TENANT_CACHE.clear()
+        self.cache = SoftTTLCache(timeout=60)
+
+    def test_negative_results_are_cached(self):
+        """
+        None and falsy values are stored, so they are computed only once.
+        """
+        compute = MagicMock(return_value=None)
+
+        self.assertIsNone(self.cache.get_or_set("key", compute))
+        self.assertIsNone(self.cache.get_or_set("key", compute))
+
+        compute.return_value = ""
+        self.assertEqual(self.cache.get_or_set("other", compute), "")
+        self.assertEqual(self.cache.get_or_set("other", compute), "")
+
+        self.assertEqual(compute.call_count, 2)
+        self.assertEqual(
+            self.cache.stats(),
+            {"hits": 1, "negative_hits": 1, "stale_hits": 0, "misses": 2, "refreshes": 0},
+        )
+
+    def test_raw_values_are_misses(self):
+        """
+        Values not written by SoftTTLCache are computed again.
+        """
+        TENANT_CACHE.set("key", "raw value")
+
+        self.assertEqual(self.cache.get_or_set("key", lambda: "value"), "value")
+        self.assertEqual(self.cache.get_or_set("key", lambda: "other"), "value")
+
+    @patch('eox_tenant.cache.time')
+    def test_single_flight_refresh(self, time_mock):
+        """
+        After the soft expiration only one caller recomputes, the others get the stale value.
+        """
+        time_mock.return_value = 1000
+        self.cache.get_or_set("key", lambda: "old")
+        time_mock.return_value = 1100
+
+        self.assertTrue(django_cache.add("key-refresh-lock", 1))
+        self.assertEqual(self.cache.get_or_set("key", lambda: "new"), "old")
+
+        django_cache.delete("key-refresh-lock")
+        self.assertEqual(self.cache.get_or_set("key", lambda: "new"), "new")
+        self.assertIsNone(django_cache.get("key-refresh-lock"))
+        self.assertEqual(self.cache.stats()["stale_hits"], 1)
+        self.assertEqual(self.cache.stats()["refreshes"], 1)
+
+    def test_get_many_and_set_many(self):
+        """
+        Missing keys are left out of get_many and negative results are returned.
+        """
+        self.cache.set_many({"first": None, "second": "value"})
+
+        self.assertEqual(self.cache.get_many(["first", "second", "third"]), {"first": None, "second": "value"})
+
+    @patch('eox_tenant.cache.random.uniform')
+    def test_jittered_timeout(self, uniform_mock):
+        """
+        The soft timeout is jittered and the entry is kept for twice that time.
+        """
+        uniform_mock.return_value = 1.1
+
+        with patch('eox_tenant.cache.cache') as cache_mock:
+            self.cache.set("key", "value")
+
+        uniform_mock.assert_called_with(0.9, 1.1)
+        self.assertAlmostEqual(cache_mock.set.call_args[0][2], 132)
+
+
+class TwoTierCacheTest(TestCase):
+    """
+    Test the TwoTierCache class.
+    """
+
+    def setUp(self):
+        """ setup """
+        django_cache.clear()
+        self.cache = TwoTierCache(maxsize=10, timeout=5)
+
+    def test_reads_are_kept_locally(self):
+        """
+        Values read from the django cache are served from the local tier afterwards.
+        """
+        django_cache.set("key", "value")
+
+        self.assertEqual(self.cache.get("key"), "value")
+        django_cache.set("key", "new value")
+
+        self.assertEqual(self.cache.get("key"), "value")
+        self.assertEqual(self.cache.get("missing", "default"), "default")
+        self.assertEqual(self.cache.get_many(["key", "missing"]), {"key": "value"})
+
+        self.cache.set_version(2)
+
+        self.assertEqual(self.cache.get("key"), "new value")
+
+    def test_writes_go_to_both_tiers(self):
+        """
+        Writes and deletions are seen by the django cache and the local tier.
+        """
+        self.cache.set("key", "value", 60)
+        self.cache.set_many({"first": 1, "second": 2})
+
+        self.assertEqual(django_cache.get_many(["key", "first", "second"]), {"key": "value", "first": 1, "second": 2})
+
+        self.cache.delete_many(["first", "second"])
+        self.cache.delete("key")
+
+        self.assertEqual(self.cache.get_many(["key", "first", "second"]), {})
+
+    def test_add_is_not_cached_locally(self):
+        """
+        add always asks the django cache, so it can be used as a lock between processes.
+        """
+        self.assertTrue(self.cache.add("lock", 1))
+        self.assertFalse(self.cache.add("lock", 1))
+
+        django_cache.delete("lock")
+
+        self.assertTrue(self.cache.add("lock", 1))
+
+    def test_local_timeout(self):
+        """
+        Local copies never live longer than the django cache entry.
+        """
+        with patch.object(self.cache.local, 'set') as set_mock:
+            self.cache.set("key", "value", 2)
+            self.cache.set("other", "value", None)
+
+        self.assertEqual(set_mock.call_args_list[0][0][2], 2)
+        self.assertEqual(set_mock.call_args_list[1][0][2], 5)
+
+
+class ConfigVersionTest(TestCase):
+    """
+    Test the shared version of the tenant configurations.
+    """
+
+    def setUp(self):
+        """
+        Start without a stored version.
+        """
+        django_cache.delete(CONFIG_VERSION_CACHE_KEY)
+
+    def test_get_config_version_is_stable(self):
+        """
+        The version does not change until it is bumped.
+        """
+        self.assertEqual(get_config_version(), get_config_version())
+
+    def test_bump_config_version(self):
+        """
+        Bumping returns a greater version that is seen by the readers.
+        """
+        version = get_config_version()
+
+        new_version = bump_config_version()
+
+        self.assertGreater(new_version, version)
+        self.assertEqual(get_config_version(), new_version)
+
+    def test_bump_missing_config_version(self):
+        """
+        Bumping works even if the version was evicted from the cache.
+        """
+        version = get_config_version()
+        django_cache.delete(CONFIG_VERSION_CACHE_KEY)
+
+        self.assertGreater(bump_config_version(), version)
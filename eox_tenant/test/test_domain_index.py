@@ -0,0 +1,120 @@
+"""
+Tests for the domain index.
+"""
+from django.test import TestCase
+from mock import patch
+
+from eox_tenant.cache import bump_config_version
+from eox_tenant.domain_index import MICROSITE_SOURCE, TENANT_CONFIG_SOURCE, DomainIndex
+from eox_tenant.models import Microsite, Route, TenantConfig
+
+
+class DomainIndexTest(TestCase):
+    """
+    Test the DomainIndex class.
+    """
+
+    def setUp(self):
+        """
+        Create a tenant with a route and a microsite.
+        """
+        self.tenant = TenantConfig.objects.create(
+            external_key="tenant-key",
+            lms_configs={},
+            studio_configs={},
+            theming_configs={},
+            meta={},
+        )
+        self.route = Route.objects.create(domain="tenant.com", config=self.tenant)
+        self.microsite = Microsite.objects.create(key="microsite-key", subdomain="microsite.com", values={})
+        self.index = DomainIndex(timeout=60)
+
+    def test_resolve(self):
+        """
+        Known domains resolve to their tenant and unknown domains to None.
+        """
+        self.assertEqual(self.index.resolve("tenant.com:8000"), (TENANT_CONFIG_SOURCE, self.tenant.pk))
+        self.assertEqual(self.index.resolve("microsite.com"), (MICROSITE_SOURCE, self.microsite.pk))
+        self.assertIsNone(self.index.resolve("unknown.com"))
+        self.assertEqual(self.index.stats()["hits"], 2)
+        self.assertEqual(self.index.stats()["negative_hits"], 1)
+
+    def test_index_is_built_once(self):
+        """
+        After the first lookup the index is answered from memory.
+        """
+        self.index.resolve("tenant.com")
+
+        with self.assertNumQueries(0):
+            self.index.resolve("unknown.com")
+            self.index.resolve("other-unknown.com")
+
+        self.assertEqual(self.index.stats()["builds"], 1)
+
+    def test_update_route(self):
+        """
+        Saved and deleted routes are reflected without building the index again.
+        """
+        self.index.resolve("tenant.com")
+        self.route.domain = "new-tenant.com"
+        self.route.save()
+
+        self.index.update_route(self.route)
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.index.resolve("tenant.com"))
+            self.assertEqual(self.index.resolve("new-tenant.com"), (TENANT_CONFIG_SOURCE, self.tenant.pk))
+
+        self.index.update_route(self.route, deleted=True)
+        self.assertIsNone(self.index.resolve("new-tenant.com"))
+
+    def test_update_microsites(self):
+        """
+        The microsites are reloaded after a change.
+        """
+        self.index.resolve("tenant.com")
+        new_microsite = Microsite.objects.create(key="new-key", subdomain="new-microsite.com", values={})
+
+        self.index.update_microsites()
+
+        self.assertEqual(self.index.resolve("new-microsite.com"), (MICROSITE_SOURCE, new_microsite.pk))
+
+    @patch("eox_tenant.domain_index.monotonic")
+    def test_index_expires(self, monotonic_mock):
+        """
+        The index is built again after the timeout.
+        """
+        monotonic_mock.return_value = 100
+        self.index.resolve("tenant.com")
+
+        monotonic_mock.return_value = 161
+        self.index.resolve("tenant.com")
+
+        self.assertEqual(self.index.stats()["builds"], 2)
+
+    @patch("eox_tenant.domain_index.get_config_version")
+    def test_set_version(self, get_config_version_mock):
+        """
+        A new configuration version drops the index.
+        """
+        get_config_version_mock.return_value = 1
+        self.index.resolve("tenant.com")
+        self.index.resolve("tenant.com")
+        self.assertEqual(self.index.stats()["builds"], 1)
+
+        self.index.set_version(2)
+        self.index.resolve("tenant.com")
+        self.assertEqual(self.index.stats()["builds"], 2)
+
+    def test_version_bumped_by_another_process(self):
+        """
+        The index is built again when another process bumps the shared configuration version.
+        """
+        self.index.resolve("tenant.com")
+        Route.objects.filter(pk=self.route.pk).update(domain="new-tenant.com")
+
+        bump_config_version()
+
+        self.assertIsNone(self.index.resolve("tenant.com"))
+        self.assertEqual(self.index.resolve("new-tenant.com"), (TENANT_CONFIG_SOURCE, self.tenant.pk))
+        self.assertEqual(self.index.stats()["builds"], 2)
@@ -0,0 +1,181 @@
+"""
+Tests for the model fields of eox-tenant.
+"""
+import warnings
+
+from django.db import connection
+from django.test import TestCase
+from mock import MagicMock, patch
+
+from eox_tenant.constants import LMS_CONFIG_COLUMN
+from eox_tenant.fields import LazyJSONMapping, RawJSON, decode_json
+from eox_tenant.models import Microsite, Route, TenantConfig
+
+
+class LazyJSONFieldTest(TestCase):
+    """
+    Test the LazyJSONField class.
+    """
+
+    def setUp(self):
+        """
+        Create a tenant config.
+        """
+        self.tenant = TenantConfig.objects.create(
+            external_key="tenant-key",
+            lms_configs={"PLATFORM_NAME": "Tenant", "course_org_filter": ["org"]},
+            studio_configs={},
+            theming_configs={"THEME": "tenant"},
+            meta={},
+        )
+
+    def test_decoded_on_first_access(self):
+        """
+        The columns of a loaded instance are decoded when the attribute is read.
+        """
+        tenant = TenantConfig.objects.get(pk=self.tenant.pk)
+
+        self.assertIsInstance(tenant.__dict__["lms_configs"], RawJSON)
+        self.assertIsInstance(tenant.__dict__["theming_configs"], RawJSON)
+
+        self.assertEqual(tenant.lms_configs, {"PLATFORM_NAME": "Tenant", "course_org_filter": ["org"]})
+        self.assertIs(type(tenant.lms_configs), dict)
+        self.assertIsInstance(tenant.__dict__["theming_configs"], RawJSON)
+
+    def test_save_without_access(self):
+        """
+        Columns that were never read are saved as they were loaded.
+        """
+        tenant = TenantConfig.objects.get(pk=self.tenant.pk)
+        tenant.external_key = "new-key"
+        tenant.save()
+
+        self.assertIsInstance(tenant.__dict__["theming_configs"], RawJSON)
+        tenant.refresh_from_db()
+        self.assertEqual(tenant.external_key, "new-key")
+        self.assertEqual(tenant.theming_configs, {"THEME": "tenant"})
+
+    def test_deferred_field(self):
+        """
+        Deferred columns are loaded and decoded when they are read.
+        """
+        tenant = TenantConfig.objects.only("external_key").get(pk=self.tenant.pk)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(tenant.theming_configs, {"THEME": "tenant"})
+
+    def test_values_list(self):
+        """
+        values() and values_list() return the decoded columns, as JSONField does.
+        """
+        lms_configs = TenantConfig.objects.values_list("lms_configs", flat=True).get(pk=self.tenant.pk)
+        row = TenantConfig.objects.values_list("external_key", "theming_configs", named=True).get(pk=self.tenant.pk)
+
+        self.assertEqual(lms_configs, {"PLATFORM_NAME": "Tenant", "course_org_filter": ["org"]})
+        self.assertNotIsInstance(lms_configs, RawJSON)
+        self.assertEqual(row.theming_configs, {"THEME": "tenant"})
+        self.assertEqual(TenantConfig.objects.values("meta").get(pk=self.tenant.pk), {"meta": {}})
+        self.assertEqual(decode_json({"key": "value"}), {"key": "value"})
+
+    def test_related_values(self):
+        """
+        Columns read through other models are decoded as well.
+        """
+        Route.objects.create(domain="tenant.com", config=self.tenant)
+
+        self.assertEqual(Route.objects.values_list("config__theming_configs", flat=True).get(), {"THEME": "tenant"})
+        self.assertEqual(Route.objects.select_related("config").get().config.__dict__["meta"], {})
+
+    def test_only_rows_in_loading_keep_text(self):
+        """
+        Queries made while iterating over the instances decode their columns.
+        """
+        for tenant in TenantConfig.objects.all().iterator():
+            self.assertIsInstance(tenant.__dict__["meta"], RawJSON)
+            self.assertEqual(TenantConfig.objects.values_list("meta", flat=True).get(pk=tenant.pk), {})
+
+    def test_invalid_json(self):
+        """
+        Invalid JSON is returned as a string with a warning, as jsonfield does.
+        """
+        Microsite.objects.create(key="key", subdomain="a.com")
+        Microsite.objects.filter(key="key").update(values=RawJSON("{"))
+        microsite = Microsite.objects.get(key="key")
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            self.assertEqual(microsite.values, "{")
+
+        self.assertEqual(len(caught), 1)
+
+    @patch("eox_tenant.fields.EOX_TENANT_NATIVE_JSON_FIELDS", True)
+    def test_column_type_does_not_depend_on_native_fields(self):
+        """
+        The column type is the same with native JSON fields, so migrations never convert the columns.
+        """
+        field = TenantConfig._meta.get_field("lms_configs")  # pylint: disable=protected-access,no-member
+
+        self.assertEqual(field.db_type(connection), connection.data_types["TextField"])
+
+    @patch("eox_tenant.fields.EOX_TENANT_NATIVE_JSON_FIELDS", True)
+    def test_native_values_adapted_by_backend(self):
+        """
+        Native JSON columns get the value adapted by the database backend, not JSON text, so
+        Postgres receives a jsonb parameter even when binding the parameters on the server.
+        """
+        field = TenantConfig._meta.get_field("lms_configs")  # pylint: disable=protected-access,no-member
+        backend = MagicMock()
+
+        value = field.get_db_prep_value(RawJSON('{"SITE_NAME": "tenant.com"}'), backend)
+
+        backend.ops.adapt_json_value.assert_called_once_with({"SITE_NAME": "tenant.com"}, field.dump_kwargs["cls"])
+        self.assertIs(value, backend.ops.adapt_json_value.return_value)
+        self.assertEqual(field.get_db_prep_save({"a": 1}, connection), connection.ops.adapt_json_value({"a": 1}, None))
+
+    def test_text_values(self):
+        """
+        Text columns get the JSON text, RawJSON values as they were loaded.
+        """
+        field = TenantConfig._meta.get_field("lms_configs")  # pylint: disable=protected-access,no-member
+
+        self.assertEqual(field.get_db_prep_save(RawJSON('{"a":  1}'), connection), '{"a":  1}')
+        self.assertEqual(field.get_db_prep_save({"a": 1}, connection), '{"a": 1}')
+
+
+class LazyJSONMappingTest(TestCase):
+    """
+    Test the LazyJSONMapping class.
+    """
+
+    def test_values_are_decoded_on_access(self):
+        """
+        Only the values that are read are decoded.
+        """
+        mapping = LazyJSONMapping({"id": 1, "first": RawJSON('{"a": 1}'), "second": RawJSON('{"b": 2}')})
+
+        self.assertEqual(mapping["first"], {"a": 1})
+        self.assertIsInstance(mapping._data["second"], RawJSON)  # pylint: disable=protected-access
+        self.assertEqual(len(mapping), 3)
+        self.assertEqual(dict(mapping), {"id": 1, "first": {"a": 1}, "second": {"b": 2}})
+
+    def test_configurations_for_domain(self):
+        """
+        Reading the configurations of a domain decodes only the requested column.
+        """
+        tenant = TenantConfig.objects.create(
+            external_key="tenant-key",
+            lms_configs={"PLATFORM_NAME": "Tenant"},
+            studio_configs={},
+            theming_configs={},
+            meta={},
+        )
+        Route.objects.create(domain="lazy.com", config=tenant)
+        TenantConfig.objects.clear_configurations_cache()
+
+        lms_configs, _ = TenantConfig.get_configs_for_domain("lazy.com", LMS_CONFIG_COLUMN)
+
+        self.assertEqual(lms_configs["PLATFORM_NAME"], "Tenant")
+
+        configurations = TenantConfig.objects.get_configurations("lazy.com")
+        self.assertIsInstance(configurations._data["meta"], RawJSON)  # pylint: disable=protected-access
+        TenantConfig.objects.clear_configurations_cache()
@@ -0,0 +1,138 @@
+"""
+Tests for the instrumentation of the tenant switches.
+"""
+from django.test import TestCase
+from mock import MagicMock, patch
+
+from eox_tenant.constants import TENANT_SWITCH_BYPASSED, TENANT_SWITCH_KEPT, TENANT_SWITCH_RESET, TENANT_SWITCH_SWITCHED
+from eox_tenant.instrumentation import (
+    TIMING_HISTOGRAM,
+    WORKER_STATS,
+    TenantSwitchStats,
+    clear_current_switch,
+    emit_timing,
+    get_current_switch,
+    histogram_sink,
+    record_switch,
+    start_switch,
+    timed,
+)
+
+
+class TenantSwitchStatsTest(TestCase):
+    """
+    Test the counters of the tenant switches.
+    """
+
+    def setUp(self):
+        """ setup """
+        WORKER_STATS.clear()
+        clear_current_switch()
+
+    def test_record_switch(self):
+        """
+        The switch is kept for the current context and counted for the worker.
+        """
+        switch = record_switch("tenant-key", "domain.com", TENANT_SWITCH_SWITCHED, 0.002)
+
+        self.assertEqual(get_current_switch(), switch)
+        self.assertEqual(switch.tenant_key, "tenant-key")
+        self.assertEqual(WORKER_STATS.stats()["outcomes"][TENANT_SWITCH_SWITCHED], {"count": 1, "total_ms": 2.0})
+
+        clear_current_switch()
+
+        self.assertIsNone(get_current_switch())
+
+    def test_hit_rate(self):
+        """
+        The hit rate is the share of switches that kept the settings, bypassed requests are not counted.
+        """
+        stats = TenantSwitchStats()
+
+        self.assertIsNone(stats.stats()["hit_rate"])
+
+        record_switch("tenant-key", "domain.com", TENANT_SWITCH_KEPT, 0)
+        for outcome in (
+            TENANT_SWITCH_KEPT,
+            TENANT_SWITCH_KEPT,
+            TENANT_SWITCH_SWITCHED,
+            TENANT_SWITCH_RESET,
+            TENANT_SWITCH_BYPASSED,
+        ):
+            stats.add(get_current_switch()._replace(outcome=outcome))
+
+        self.assertEqual(stats.stats()["total"], 5)
+        self.assertEqual(stats.stats()["hit_rate"], 0.5)
+
+
+@timed("step")
+def timed_step(value):
+    """
+    Step measured in the tests.
+    """
+    return value
+
+
+class TimingSinksTest(TestCase):
+    """
+    Test the timings sent to the sinks.
+    """
+
+    def setUp(self):
+        """ setup """
+        self.sink = MagicMock()
+        patcher = patch('eox_tenant.instrumentation._SINKS', [self.sink])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        TIMING_HISTOGRAM.clear()
+
+    def test_switch_timings(self):
+        """
+        The steps of a switch are sent with the tenant and outcome once the switch is recorded.
+        """
+        start_switch()
+
+        self.assertEqual(timed_step("value"), "value")
+        self.sink.assert_not_called()
+
+        record_switch("tenant-key", "domain.com", TENANT_SWITCH_SWITCHED, 0.01)
+
+        tags = {"tenant": "tenant-key", "outcome": TENANT_SWITCH_SWITCHED}
+        self.assertEqual(self.sink.call_count, 2)
+        self.assertEqual(self.sink.call_args_list[0][0][0], "eox_tenant.step")
+        self.assertEqual(self.sink.call_args_list[0][0][2], tags)
+        self.sink.assert_called_with("eox_tenant.tenant_switch", 0.01, tags)
+
+    def test_timing_outside_switch(self):
+        """
+        Steps measured outside of a switch are sent right away.
+        """
+        timed_step("value")
+
+        self.assertEqual(self.sink.call_args[0][2], {"tenant": None, "outcome": None})
+
+    def test_no_sinks(self):
+        """
+        Nothing is measured without sinks.
+        """
+        with patch('eox_tenant.instrumentation._SINKS', []), patch('eox_tenant.instrumentation.perf_counter') as timer:
+            start_switch()
+            timed_step("value")
+            record_switch("tenant-key", "domain.com", TENANT_SWITCH_KEPT, 0)
+
+        timer.assert_not_called()
+
+    def test_failing_sink(self):
+        """
+        A failing sink does not break the other sinks.
+        """
+        self.sink.side_effect = ValueError
+
+        with patch('eox_tenant.instrumentation._SINKS', [self.sink, histogram_sink]):
+            emit_timing("eox_tenant.step", 0.002, {"tenant": "tenant-key", "outcome": TENANT_SWITCH_KEPT})
+
+        stats = TIMING_HISTOGRAM.stats()
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(stats[0]["count"], 1)
+        self.assertEqual(stats[0]["tenant"], "tenant-key")
+        self.assertEqual(stats[0]["buckets"], {"5": 1})
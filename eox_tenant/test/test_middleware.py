@@ -2,16 +2,24 @@
 """
 TODO: add me
 """
+import re
+
 import mock
-from ddt import data, ddt
+from ddt import data, ddt, unpack
+from django.conf import settings
 from django.contrib.sites.models import Site
-from django.http import Http404
+from django.http import Http404, HttpResponse
 from django.test import RequestFactory, TestCase, override_settings
 
+from eox_tenant.bypass import RequestBypass
+from eox_tenant.constants import TENANT_SWITCH_KEPT, TENANT_SWITCH_SWITCHED
+from eox_tenant.instrumentation import clear_current_switch, get_current_switch, record_switch
 from eox_tenant.middleware import (
     AvailableScreenMiddleware,
     CurrentSiteMiddleware,
     MicrositeCrossBrandingFilterMiddleware,
+    TenantAffinityMiddleware,
+    _literal_prefix,
 )
 
 
@@ -105,6 +113,112 @@ class MicrositeCrossBrandingFilterMiddlewareTest(TestCase):
             conf_helper_mock.get_current_site_orgs.assert_called_once()
             conf_helper_mock.get_all_orgs.assert_called_once()
 
+    @data(
+        (frozenset(), [], False),
+        (frozenset(["current-tenant"]), [], False),
+        (frozenset(["other-tenant"]), ["TEST_ORG"], False),
+        (frozenset(["other-tenant"]), [], True),
+    )
+    @unpack
+    @mock.patch('eox_tenant.middleware.ORG_INDEX')
+    @mock.patch('eox_tenant.middleware.EOX_TENANT_USE_ORG_INDEX', True)
+    def test_course_org_with_org_index(self, owners, current_orgs, raises, org_index_mock):
+        """
+        Test the check answered with the org index.
+
+        Expected behavior:
+            - Raises 404 only if the org is owned by other tenants and is not in the current course_org_filter.
+            - The configuration helpers are not called.
+        """
+        request = self.request_factory.get(self.COMMON_COURSE_PATHS[0])
+        org_index_mock.get_tenants.return_value = owners
+
+        with override_settings(EDNX_TENANT_KEY="current-tenant"), \
+                mock.patch('eox_tenant.middleware.get_organizations', return_value=current_orgs), \
+                mock.patch('eox_tenant.middleware.configuration_helpers') as conf_helper_mock:
+            if raises:
+                with self.assertRaises(Http404):
+                    self.middleware_instance.process_request(request)
+            else:
+                self.assertIsNone(self.middleware_instance.process_request(request))
+
+        org_index_mock.get_tenants.assert_called_once_with("TEST_ORG")
+        conf_helper_mock.get_current_site_orgs.assert_not_called()
+        conf_helper_mock.get_all_orgs.assert_not_called()
+
+    @mock.patch('eox_tenant.middleware.re.compile', wraps=re.compile)
+    def test_matcher_is_compiled_once(self, compile_mock):
+        """
+        Test that the restricted course regex is compiled when the middleware is created and
+        compiled again only when the patterns change.
+        """
+        middleware = MicrositeCrossBrandingFilterMiddleware(get_response=lambda req: None)
+
+        middleware.process_request(self.request_factory.get('/courses/nomatch'))
+        middleware.process_request(self.request_factory.get('/dashboard'))
+        self.assertEqual(compile_mock.call_count, 1)
+
+        with override_settings(EOX_TENANT_RESTRICTED_COURSE_PATTERNS=["about"]):
+            middleware.process_request(self.request_factory.get('/courses/nomatch'))
+            middleware.process_request(self.request_factory.get('/about/nomatch'))
+
+        self.assertEqual(compile_mock.call_count, 2)
+
+    @mock.patch('eox_tenant.middleware.configuration_helpers')
+    def test_prefix_prefilter(self, conf_helper_mock):
+        """
+        Test that paths outside of the restricted prefixes are discarded before running the regex.
+        """
+        request = self.request_factory.get('/dashboard/course-v1:TEST_ORG+CS101+2019_T1/')
+        regex_mock = mock.MagicMock()
+        matcher_key = (tuple(settings.EOX_TENANT_RESTRICTED_COURSE_PATTERNS), settings.COURSE_ID_PATTERN)
+        self.middleware_instance._matcher = (  # pylint: disable=protected-access
+            matcher_key,
+            regex_mock,
+            ("/courses", "/api/course_home/"),
+        )
+
+        self.assertIsNone(self.middleware_instance.process_request(request))
+        regex_mock.match.assert_not_called()
+        conf_helper_mock.get_current_site_orgs.assert_not_called()
+
+    @mock.patch('eox_tenant.middleware.ORG_INDEX')
+    @mock.patch('eox_tenant.middleware.CourseKey')
+    @mock.patch('eox_tenant.middleware.EOX_TENANT_USE_ORG_INDEX', True)
+    def test_no_orgs_restricted(self, course_key_mock, org_index_mock):
+        """
+        Test that the course key is not parsed when no tenant owns an org.
+        """
+        org_index_mock.get_all_orgs.return_value = frozenset()
+        request = self.request_factory.get(self.COMMON_COURSE_PATHS[0])
+
+        self.assertIsNone(self.middleware_instance.process_request(request))
+        course_key_mock.from_string.assert_not_called()
+        org_index_mock.get_tenants.assert_not_called()
+
+    @data(
+        ("courses", "courses"),
+        ("(api/course_home/.+)", "api/course_home/"),
+        ("courses?/", "course"),
+        ("(?:courses)", ""),
+        ("courses|about", ""),
+        (".*", ""),
+        ("(a)?b", ""),
+        ("(ab)*c", ""),
+        ("((ab)+c)d", ""),
+        ("(ab){2}c", ""),
+        ("(ab)c", "ab"),
+        ("ab(c)?d", "ab"),
+        ("(a[)]b)?c", ""),
+        ("(abc", ""),
+    )
+    @unpack
+    def test_literal_prefix(self, pattern, prefix):
+        """
+        Test the literal prefix of the restricted course patterns.
+        """
+        self.assertEqual(_literal_prefix(pattern), prefix)
+
 
 class AvailableScreenMiddlewareTest(TestCase):
     """
@@ -129,6 +243,17 @@ class AvailableScreenMiddlewareTest(TestCase):
         http_resp_not_found_mock.assert_not_called()
         self.assertIsNone(result)
 
+    @mock.patch('eox_tenant.middleware.REQUEST_BYPASS', RequestBypass(path_prefixes=["/static/"]))
+    @mock.patch('eox_tenant.middleware.theming_helper')
+    def test_bypassed_request(self, theming_helper_mock):
+        """
+        Test that bypassed requests are not checked
+        """
+        request = self.request_factory.get('/static/css/lms.css')
+
+        self.assertIsNone(self.middleware_instance.process_request(request))
+        theming_helper_mock.is_request_in_themed_site.assert_not_called()
+
     @override_settings(FEATURES={
         'USE_MICROSITE_AVAILABLE_SCREEN': True,
     })
@@ -182,3 +307,39 @@ class CurrentSiteMiddlewareTest(TestCase):
 
             create_site_mock.assert_called_once()
             self.assertEqual(request.site.configuration, new_configuration)  # pylint: disable=no-member
+
+
+@ddt
+class TenantAffinityMiddlewareTest(TestCase):
+    """
+    Testing the middleware TenantAffinityMiddleware
+    """
+
+    def setUp(self):
+        """ setup """
+        self.request = RequestFactory().get('/')
+        self.middleware_instance = TenantAffinityMiddleware(get_response=lambda req: HttpResponse())
+        clear_current_switch()
+
+    @data((TENANT_SWITCH_KEPT, "hit"), (TENANT_SWITCH_SWITCHED, "miss"))
+    def test_switch_headers(self, switch_data):
+        """
+        The tenant switch of the request is added to the response.
+        """
+        outcome, settings_header = switch_data
+        record_switch("tenant-key", "domain.com", outcome, 0.0015)
+
+        response = self.middleware_instance(self.request)
+
+        self.assertEqual(response["X-EoxTenant-Key"], "tenant-key")
+        self.assertEqual(response["X-EoxTenant-Settings"], settings_header)
+        self.assertEqual(response["X-EoxTenant-Switch-Ms"], "1.500")
+        self.assertIsNone(get_current_switch())
+
+    def test_no_switch(self):
+        """
+        Nothing is added if no tenant switch was recorded.
+        """
+        response = self.middleware_instance(self.request)
+
+        self.assertNotIn("X-EoxTenant-Key", response)
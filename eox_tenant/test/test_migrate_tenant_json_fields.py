@@ -0,0 +1,104 @@
+"""This module include a class that checks the command migrate_tenant_json_fields.py"""
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TransactionTestCase
+from mock import patch
+
+from eox_tenant.management.commands.migrate_tenant_json_fields import TENANT_CONFIG_TABLE, get_config_key_index
+from eox_tenant.models import Microsite, TenantConfig
+
+
+class MigrateTenantJsonFieldsTestCase(TransactionTestCase):
+    """ This class checks the command migrate_tenant_json_fields.py"""
+
+    def setUp(self):
+        """This method creates the tenants whose columns are converted"""
+        for number in range(3):
+            TenantConfig.objects.create(
+                external_key=f"tenant-{number}",
+                lms_configs={"SITE_NAME": f"tenant{number}.com", "EDNX_USE_SIGNAL": True},
+                studio_configs={},
+                theming_configs={},
+                meta={},
+            )
+
+    def get_column_types(self):
+        """Return the field types introspected from the JSON columns of the tenant config table"""
+        with connection.cursor() as cursor:
+            description = connection.introspection.get_table_description(cursor, TENANT_CONFIG_TABLE)
+
+        return {
+            column.name: connection.introspection.get_field_type(column.type_code, column)
+            for column in description
+            if column.name in ("lms_configs", "meta")
+        }
+
+    def get_constraints(self):
+        """Return the names of the constraints of the tenant config table"""
+        with connection.cursor() as cursor:
+            return set(connection.introspection.get_constraints(cursor, TENANT_CONFIG_TABLE))
+
+    def test_needs_native_json_fields(self):
+        """The columns are only converted when EOX_TENANT_NATIVE_JSON_FIELDS is set"""
+        with self.assertRaises(CommandError):
+            call_command("migrate_tenant_json_fields")
+
+    @patch("eox_tenant.fields.EOX_TENANT_NATIVE_JSON_FIELDS", True)
+    def test_invalid_json(self):
+        """Rows with invalid JSON stop the conversion"""
+        Microsite.objects.create(key="microsite", subdomain="microsite.com", values={})
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {connection.ops.quote_name(Microsite._meta.db_table)} "  # pylint: disable=protected-access,no-member
+                f"SET {connection.ops.quote_name('values')} = %s",
+                ['{"course_org_filter": '],
+            )
+
+        with self.assertRaisesRegex(CommandError, "Microsite .* values"):
+            call_command("migrate_tenant_json_fields")
+
+    @patch("eox_tenant.fields.EOX_TENANT_NATIVE_JSON_FIELDS", True)
+    def test_migrate_and_reverse(self):
+        """The key indexes are created, used by filter_by_config_key and dropped on reverse"""
+        index = get_config_key_index("SITE_NAME")
+
+        call_command("migrate_tenant_json_fields", keys=["SITE_NAME"])
+
+        self.assertIn(index.name, self.get_constraints())
+        queryset = TenantConfig.objects.filter_by_config_key("SITE_NAME", "tenant1.com")
+        self.assertEqual(list(queryset.values_list("external_key", flat=True)), ["tenant-1"])
+        self.assertEqual(TenantConfig.objects.filter(lms_configs__SITE_NAME="tenant2.com").count(), 1)
+        self.assertEqual(TenantConfig.objects.get(external_key="tenant-0").lms_configs["SITE_NAME"], "tenant0.com")
+
+        call_command("migrate_tenant_json_fields", keys=["SITE_NAME"], reverse=True)
+
+        self.assertNotIn(index.name, self.get_constraints())
+        self.assertEqual(TenantConfig.objects.count(), 3)
+
+    @patch("eox_tenant.fields.EOX_TENANT_NATIVE_JSON_FIELDS", True)
+    def test_native_columns(self):
+        """
+        The columns get the native JSON type of the database, Postgres, MySQL or the JSON check of
+        sqlite, and instances are saved, read and filtered by key on them
+        """
+        self.assertEqual(set(self.get_column_types().values()), {"TextField"})
+
+        call_command("migrate_tenant_json_fields", keys=[])
+
+        self.assertEqual(set(self.get_column_types().values()), {"JSONField"})
+
+        tenant = TenantConfig.objects.get(external_key="tenant-0")
+        tenant.lms_configs["PLATFORM_NAME"] = "Tenant"
+        tenant.save()
+        TenantConfig.objects.filter(external_key="tenant-1").update(meta={"owner": "admin"})
+
+        self.assertEqual(TenantConfig.objects.get(external_key="tenant-0").lms_configs["PLATFORM_NAME"], "Tenant")
+        self.assertEqual(TenantConfig.objects.get(external_key="tenant-1").meta, {"owner": "admin"})
+        self.assertEqual(TenantConfig.objects.filter(lms_configs__EDNX_USE_SIGNAL=True).count(), 3)
+        self.assertEqual(TenantConfig.objects.filter(meta__owner="admin").count(), 1)
+
+        call_command("migrate_tenant_json_fields", keys=[], reverse=True)
+
+        self.assertEqual(set(self.get_column_types().values()), {"TextField"})
+        self.assertEqual(TenantConfig.objects.get(external_key="tenant-1").meta, {"owner": "admin"})
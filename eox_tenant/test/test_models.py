@@ -7,7 +7,8 @@ from __future__ import absolute_import
 from django.core.exceptions import ValidationError
 from django.test import TestCase
 
-from eox_tenant.models import Microsite
+from eox_tenant.constants import LMS_CONFIG_COLUMN
+from eox_tenant.models import Microsite, Route, TenantConfig
 
 
 class MicrositeModelTest(TestCase):
@@ -33,3 +34,65 @@ class MicrositeModelTest(TestCase):
         obj.key = "test_fake_key"
         with self.assertRaises(ValidationError):
             obj.full_clean()
+
+
+class TenantConfigManagerTest(TestCase):
+    """
+    Test the in-process cache in front of TenantConfigManager.get_configurations.
+    """
+
+    def setUp(self):
+        """
+        Create a tenant with a route and start with an empty cache.
+        """
+        TenantConfig.objects.clear_configurations_cache()
+        self.tenant = TenantConfig.objects.create(
+            external_key="tenant-key",
+            lms_configs={"PLATFORM_NAME": "Tenant"},
+            studio_configs={},
+            theming_configs={},
+            meta={},
+        )
+        Route.objects.create(domain="tenant.com", config=self.tenant)
+
+    def tearDown(self):
+        """
+        Do not leak cached configurations to other tests.
+        """
+        TenantConfig.objects.clear_configurations_cache()
+
+    def test_configurations_are_cached(self):
+        """
+        The second lookup of a domain does not reach the database.
+        """
+        configurations = TenantConfig.objects.get_configurations("tenant.com")
+
+        with self.assertNumQueries(0):
+            cached_configurations = TenantConfig.objects.get_configurations("tenant.com")
+
+        self.assertIs(configurations, cached_configurations)
+        self.assertEqual(cached_configurations[LMS_CONFIG_COLUMN], {"PLATFORM_NAME": "Tenant"})
+
+    def test_unknown_domains_are_not_cached(self):
+        """
+        Domains without configurations are looked up every time.
+        """
+        TenantConfig.objects.get_configurations("unknown.com")
+
+        with self.assertNumQueries(1):
+            self.assertEqual(TenantConfig.objects.get_configurations("unknown.com"), {})
+
+    def test_clear_configurations_cache(self):
+        """
+        After clearing the cache the new configurations are read from the database.
+        """
+        TenantConfig.objects.get_configurations("tenant.com")
+        self.tenant.lms_configs = {"PLATFORM_NAME": "New name"}
+        self.tenant.save()
+
+        TenantConfig.objects.clear_configurations_cache()
+
+        self.assertEqual(
+            TenantConfig.objects.get_configurations("tenant.com")[LMS_CONFIG_COLUMN],
+            {"PLATFORM_NAME": "New name"},
+        )
@@ -0,0 +1,89 @@
+"""
+Tests for the org index.
+"""
+from django.test import TestCase
+from mock import patch
+
+from eox_tenant.cache import bump_config_version
+from eox_tenant.models import Microsite, TenantConfig
+from eox_tenant.org_index import OrgIndex
+from eox_tenant.utils import synchronize_tenant_organizations
+
+
+class OrgIndexTest(TestCase):
+    """
+    Test the OrgIndex class.
+    """
+
+    def setUp(self):
+        """
+        Create a tenant and a microsite sharing an org.
+        """
+        self.tenant = TenantConfig.objects.create(
+            external_key="tenant-key",
+            lms_configs={"course_org_filter": ["shared-org", "tenant-org"]},
+            studio_configs={},
+            theming_configs={},
+            meta={},
+        )
+        self.microsite = Microsite.objects.create(
+            key="microsite-key",
+            subdomain="microsite.com",
+            values={"course_org_filter": "shared-org"},
+        )
+        synchronize_tenant_organizations(self.tenant)
+        synchronize_tenant_organizations(self.microsite)
+        self.index = OrgIndex(timeout=60)
+
+    def test_get_tenants(self):
+        """
+        Orgs resolve to the keys of the tenants that own them and unknown orgs to an empty frozenset.
+        """
+        self.assertEqual(self.index.get_tenants("shared-org"), frozenset(["tenant-key", "microsite-key"]))
+        self.assertEqual(self.index.get_tenants("tenant-org"), frozenset(["tenant-key"]))
+        self.assertEqual(self.index.get_tenants("unknown-org"), frozenset())
+        self.assertEqual(self.index.get_all_orgs(), frozenset(["shared-org", "tenant-org"]))
+        self.assertEqual(self.index.stats()["hits"], 2)
+        self.assertEqual(self.index.stats()["negative_hits"], 1)
+
+    def test_index_is_built_once(self):
+        """
+        After the first lookup the index is answered from memory.
+        """
+        self.index.get_tenants("shared-org")
+
+        with self.assertNumQueries(0):
+            self.index.get_tenants("unknown-org")
+            self.index.get_all_orgs()
+
+        self.assertEqual(self.index.stats()["builds"], 1)
+
+    @patch("eox_tenant.org_index.get_config_version")
+    def test_set_version(self, get_config_version_mock):
+        """
+        The index is built again when the configuration version changes.
+        """
+        get_config_version_mock.return_value = 1
+        self.index.get_tenants("shared-org")
+        self.tenant.lms_configs = {"course_org_filter": ["tenant-org"]}
+        synchronize_tenant_organizations(self.tenant)
+
+        self.assertEqual(self.index.get_tenants("shared-org"), frozenset(["tenant-key", "microsite-key"]))
+
+        get_config_version_mock.return_value = 2
+        self.assertEqual(self.index.get_tenants("shared-org"), frozenset(["microsite-key"]))
+        self.assertEqual(self.index.stats()["builds"], 2)
+
+    def test_version_bumped_by_another_process(self):
+        """
+        The index is built again when another process bumps the shared configuration version.
+        """
+        self.index.get_tenants("shared-org")
+        self.microsite.values = {"course_org_filter": "microsite-org"}
+        synchronize_tenant_organizations(self.microsite)
+
+        bump_config_version()
+
+        self.assertEqual(self.index.get_tenants("shared-org"), frozenset(["tenant-key"]))
+        self.assertEqual(self.index.get_tenants("microsite-org"), frozenset(["microsite-key"]))
+        self.assertEqual(self.index.stats()["builds"], 2)
@@ -2,10 +2,12 @@
 """
 Tests for the pipeline module used in multi-tenant third party auth.
 """
-from django.test import TestCase
-from mock import MagicMock
+from django.contrib.auth.models import Group, User
+from django.test import TestCase, override_settings
+from mock import MagicMock, patch
 
-from eox_tenant.pipeline import EoxTenantAuthException, safer_associate_by_email
+from eox_tenant.models import TenantConfig, TenantMembership
+from eox_tenant.pipeline import EoxTenantAuthException, get_users_by_email, safer_associate_by_email
 
 
 class AssociationByEmailTest(TestCase):
@@ -44,3 +46,57 @@ class AssociationByEmailTest(TestCase):
         self.user_mock.is_superuser = True
         with self.assertRaises(EoxTenantAuthException):
             safer_associate_by_email(self.backend_mock, {'email': 'fake@example.com'})
+
+
+class UsersByEmailTest(TestCase):
+    """
+    Test the bounded query of the users to associate by email.
+    """
+
+    def setUp(self):
+        self.backend_mock = MagicMock()
+        self.backend_mock.strategy.storage.user.get_users_by_email.side_effect = (
+            lambda email: User.objects.filter(email__iexact=email)
+        )
+        self.backend_mock.strategy.request_host.return_value = 'tenant.org:8000'
+        self.users = [
+            User.objects.create(username=f'user{number}', email='fake@example.com') for number in range(3)
+        ]
+
+    def test_at_most_two_users(self):
+        """
+        Only two users are fetched and the result is kept for the pipeline run of the backend.
+        """
+        with self.assertNumQueries(1):
+            users = get_users_by_email(self.backend_mock, 'FAKE@example.com')
+            get_users_by_email(self.backend_mock, 'FAKE@example.com')
+
+        self.assertEqual(len(users), 2)
+
+        with self.assertRaises(EoxTenantAuthException):
+            safer_associate_by_email(self.backend_mock, {'email': 'FAKE@example.com'})
+
+    @override_settings(EDNX_ASSOCIATE_BY_EMAIL_TENANT_USERS_ONLY=True, EDNX_TENANT_KEY='tenant-key')
+    @patch('eox_tenant.pipeline.EOX_TENANT_USE_TENANT_MEMBERSHIPS', True)
+    def test_tenant_members_only(self):
+        """
+        With memberships, only the members of the current tenant are candidates.
+        """
+        tenant = TenantConfig.objects.create(external_key='tenant-key')
+        TenantMembership.objects.create(user=self.users[1], tenant_config=tenant)
+
+        result = safer_associate_by_email(self.backend_mock, {'email': 'fake@example.com'})
+
+        self.assertEqual(result, {'user': self.users[1], 'is_new': False})
+
+    @override_settings(EDNX_ASSOCIATE_BY_EMAIL_TENANT_USERS_ONLY=True)
+    @patch('eox_tenant.pipeline.SIGNUP_SOURCE_SITE_LOOKUP', 'groups__name')
+    def test_tenant_signup_sources_only(self):
+        """
+        Without memberships, only the users with a signup source on the current host are candidates.
+
+        The signup sources of edx-platform are not installed, groups named as the site stand in for them.
+        """
+        self.users[2].groups.add(Group.objects.create(name='tenant.org'))
+
+        self.assertEqual(get_users_by_email(self.backend_mock, 'fake@example.com'), [self.users[2]])
@@ -5,8 +5,10 @@ Module for receivers_helpers tests.
 from __future__ import absolute_import
 
 from django.test import TestCase
+from mock import patch
 
 from eox_tenant.constants import CMS_CONFIG_COLUMN, LMS_CONFIG_COLUMN
+from eox_tenant.domain_index import DomainIndex
 from eox_tenant.models import Microsite, Route, TenantConfig
 from eox_tenant.receivers_helpers import get_tenant_config_by_domain
 
@@ -99,3 +101,57 @@ class ReceiversHelpersTests(TestCase):
                 "value-test": "Hello-World1",
             },
         )
+
+    def test_microsite_fallback_for_empty_config(self):
+        """
+        A route whose config column is empty falls back to the microsite of the domain.
+        """
+        config = TenantConfig.objects.create(
+            external_key="tenant-key2",
+            lms_configs={},
+            studio_configs={},
+            theming_configs={},
+            meta={},
+        )
+        Route.objects.create(domain="second.test.prod.edunext", config=config)
+        Microsite.objects.create(
+            subdomain="second.test.prod.edunext",
+            key="second_fake_key",
+            values={"value-test": "Hello-World2"},
+        )
+
+        configurations, external_key = get_tenant_config_by_domain("second.test.prod.edunext", LMS_CONFIG_COLUMN)
+
+        self.assertEqual(external_key, "second_fake_key")
+        self.assertDictEqual(configurations, {"value-test": "Hello-World2"})
+
+
+@patch("eox_tenant.receivers_helpers.EOX_TENANT_USE_DOMAIN_INDEX", True)
+class ReceiversHelpersDomainIndexTests(ReceiversHelpersTests):
+    """
+    Run the same tests resolving the domains with the domain index.
+    """
+
+    def setUp(self):
+        """
+        Use a fresh domain index for every test.
+        """
+        super().setUp()
+        TenantConfig.objects.clear_configurations_cache()
+        patcher = patch("eox_tenant.receivers_helpers.DOMAIN_INDEX", DomainIndex())
+        self.domain_index = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(TenantConfig.objects.clear_configurations_cache)
+
+    def test_unknown_domain_without_queries(self):
+        """
+        Once the index is built, unknown domains are answered without queries.
+        """
+        get_tenant_config_by_domain("domain1", LMS_CONFIG_COLUMN)
+
+        with self.assertNumQueries(0):
+            configurations, external_key = get_tenant_config_by_domain("unknown.com", LMS_CONFIG_COLUMN)
+
+        self.assertIsNone(external_key)
+        self.assertDictEqual(configurations, {})
+        self.assertEqual(self.domain_index.stats()["negative_hits"], 1)
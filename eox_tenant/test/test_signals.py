@@ -1,4 +1,5 @@
 #!/usr/bin/python
+# pylint: disable=too-many-lines
 """
 Tests for the signals module
 """
@@ -6,23 +7,52 @@ from __future__ import print_function, unicode_literals
 
 from datetime import datetime, timedelta
 
-from django.conf import settings
+from django.conf import LazySettings, settings
 from django.contrib.sites.models import Site
+from django.db.models.signals import post_delete, post_save
 from django.test import TestCase
 from mock import MagicMock, patch
 
-from eox_tenant.constants import CMS_CONFIG_COLUMN, LMS_CONFIG_COLUMN
+from eox_tenant.bypass import RequestBypass
+from eox_tenant.constants import (
+    CMS_CONFIG_COLUMN,
+    LMS_CONFIG_COLUMN,
+    SETTINGS_MODE_CONTEXT,
+    SETTINGS_MODE_OVERLAY,
+    SETTINGS_MODE_RESET,
+    SETTINGS_MODE_SNAPSHOT,
+    TENANT_SWITCH_BYPASSED,
+    TENANT_SWITCH_KEPT,
+    TENANT_SWITCH_RESET,
+    TENANT_SWITCH_SWITCHED,
+)
+from eox_tenant.instrumentation import clear_current_switch, get_current_switch
+from eox_tenant.models import Microsite, Route, TenantConfig
 from eox_tenant.signals import (
+    READY_APPS_BY_TENANT,
+    SETTINGS_OVERLAY,
+    SETTINGS_SNAPSHOTS,
     _analyze_current_settings,
+    _apply_tenant,
+    _config_version_changed,
+    _perform_reset,
     _repopulate_apps,
     _ttl_reached,
     _update_settings,
+    bump_tenant_config_version,
+    can_keep_settings,
+    clear_tenant_config_cache,
+    finish_tenant,
     start_async_lms_tenant,
     start_async_studio_tenant,
     start_lms_tenant,
     start_studio_tenant,
     tenant_context_addition,
+    update_domain_index,
+    update_tenant_memberships,
+    update_user_memberships,
 )
+from eox_tenant.tenant_settings import TENANT_SETTINGS, install_context_settings, uninstall_context_settings
 
 
 class StartTenantSignalTest(TestCase):
@@ -202,6 +232,310 @@ class StartTenantSignalTest(TestCase):
         config_mock.create.assert_called_with("fake_app")
         app_config_mock.ready.assert_called()
 
+    @patch('eox_tenant.signals.AppConfig')
+    def test__repopulate_app_every_time(self, config_mock):
+        """
+        Without EOX_TENANT_REPOPULATE_APPS_ONCE the apps are initialized on every call
+        """
+        READY_APPS_BY_TENANT.clear()
+
+        with self.settings(EDNX_TENANT_KEY="tenant-key"):
+            _repopulate_apps(["fake_app"])
+            _repopulate_apps(["fake_app"])
+
+        self.assertEqual(config_mock.create.call_count, 2)
+        self.assertFalse(READY_APPS_BY_TENANT)
+
+    @patch('eox_tenant.signals.EOX_TENANT_REPOPULATE_APPS_ONCE', True)
+    @patch('eox_tenant.signals.AppConfig')
+    def test__repopulate_app_once_per_tenant(self, config_mock):
+        """
+        With EOX_TENANT_REPOPULATE_APPS_ONCE an app is initialized once per tenant,
+        even on a new settings object
+        """
+        READY_APPS_BY_TENANT.clear()
+
+        with self.settings(EDNX_TENANT_KEY="tenant-key"):
+            _repopulate_apps(["fake_app"])
+
+        with self.settings(EDNX_TENANT_KEY="tenant-key"):
+            _repopulate_apps(["fake_app"])
+
+        with self.settings(EDNX_TENANT_KEY="other-key"):
+            _repopulate_apps(["fake_app"])
+
+        self.assertEqual(config_mock.create.call_count, 2)
+
+    @patch('eox_tenant.signals.EOX_TENANT_REPOPULATE_APPS_ONCE', True)
+    @patch('eox_tenant.signals.AppConfig')
+    def test__repopulate_app_again_on_config_change(self, config_mock):
+        """
+        An app is initialized again for the same tenant when its configurations change,
+        on the same settings object or on a new one
+        """
+        READY_APPS_BY_TENANT.clear()
+
+        with self.settings(EDNX_TENANT_KEY="tenant-key"):
+            _repopulate_apps(["fake_app"], "version-1")
+            _repopulate_apps(["fake_app"], "version-1")
+            _repopulate_apps(["fake_app"], "version-2")
+
+        with self.settings(EDNX_TENANT_KEY="tenant-key"):
+            _repopulate_apps(["fake_app"], "version-2")
+
+        self.assertEqual(config_mock.create.call_count, 2)
+
+    @patch('eox_tenant.signals.EOX_TENANT_REPOPULATE_APPS_ONCE', True)
+    @patch('eox_tenant.signals.EOX_TENANT_USE_CONFIG_VERSION', False)
+    @patch('eox_tenant.signals._repopulate_apps')
+    @patch('eox_tenant.signals.get_tenant_config_by_domain')
+    def test_update_settings_identifies_config(self, _get_config_mock, repopulate_mock):
+        """
+        Without the config version, the apps are repopulated with a digest of the configurations
+        """
+        config = {"EDNX_USE_SIGNAL": True, "PLATFORM_NAME": "Tenant"}
+        _get_config_mock.return_value = config, "tenant-key"
+
+        with self.settings(EDNX_TENANT_INSTALLED_APPS=["fake_app"]):
+            _update_settings("tenant.com", LMS_CONFIG_COLUMN)
+            config["PLATFORM_NAME"] = "Other"
+            _update_settings("tenant.com", LMS_CONFIG_COLUMN)
+
+        first_id, second_id = (call.args[1] for call in repopulate_mock.call_args_list)
+        self.assertNotEqual(first_id, second_id)
+
+    @patch('eox_tenant.signals.hashlib')
+    @patch('eox_tenant.signals._repopulate_apps')
+    @patch('eox_tenant.signals.get_tenant_config_by_domain')
+    def test_update_settings_without_config_id(self, _get_config_mock, repopulate_mock, hashlib_mock):
+        """
+        Without EOX_TENANT_REPOPULATE_APPS_ONCE the configurations are not identified
+        """
+        _get_config_mock.return_value = {"EDNX_USE_SIGNAL": True}, "tenant-key"
+
+        with self.settings(EDNX_TENANT_INSTALLED_APPS=["fake_app"]):
+            _update_settings("tenant.com", LMS_CONFIG_COLUMN)
+
+        repopulate_mock.assert_called_once_with(["fake_app"], None)
+        hashlib_mock.sha1.assert_not_called()
+
+
+class RepopulateAppsSwitchTest(TestCase):
+    """
+    Testing the apps initialized when the requests switch between tenants.
+    """
+
+    DOMAINS = ["a.com", "b.com", "a.com", "b.com", "a.com", "a.com"]
+
+    def tearDown(self):
+        """
+        Must reset after every test
+        """
+        READY_APPS_BY_TENANT.clear()
+        SETTINGS_OVERLAY.clear()
+        SETTINGS_SNAPSHOTS.clear()
+        settings._setup()  # pylint: disable=protected-access
+
+    def _count_ready_calls(self, mode):
+        """
+        Apply the tenants of DOMAINS in the given settings mode and return the calls to ready().
+        """
+        def get_config(domain, config_key):  # pylint: disable=unused-argument
+            """Every domain is a tenant that reinitializes an app."""
+            return {"EDNX_USE_SIGNAL": True, "EDNX_TENANT_INSTALLED_APPS": ["fake_app"]}, domain
+
+        with patch('eox_tenant.signals.EOX_TENANT_SETTINGS_MODE', mode), \
+                patch('eox_tenant.signals.get_tenant_config_by_domain', side_effect=get_config), \
+                patch('eox_tenant.signals.AppConfig') as config_mock:
+            for domain in self.DOMAINS:
+                _apply_tenant(domain, LMS_CONFIG_COLUMN)
+
+        READY_APPS_BY_TENANT.clear()
+        SETTINGS_SNAPSHOTS.clear()
+        settings._setup()  # pylint: disable=protected-access
+
+        return config_mock.create.return_value.ready.call_count
+
+    def test_ready_on_every_switch(self):
+        """
+        The apps are initialized again on every switch, only the request that keeps the
+        settings of the same tenant skips them.
+        """
+        for mode in (SETTINGS_MODE_RESET, SETTINGS_MODE_OVERLAY, SETTINGS_MODE_SNAPSHOT):
+            with self.subTest(mode=mode):
+                self.assertEqual(self._count_ready_calls(mode), 5)
+
+    @patch('eox_tenant.signals.EOX_TENANT_REPOPULATE_APPS_ONCE', True)
+    def test_ready_once_per_tenant(self):
+        """
+        With EOX_TENANT_REPOPULATE_APPS_ONCE the apps are initialized once for every tenant.
+        """
+        for mode in (SETTINGS_MODE_RESET, SETTINGS_MODE_OVERLAY, SETTINGS_MODE_SNAPSHOT):
+            with self.subTest(mode=mode):
+                self.assertEqual(self._count_ready_calls(mode), 2)
+
+
+class ClearTenantConfigCacheTest(TestCase):
+    """
+    Testing the receiver that invalidates the cached tenant configurations.
+    """
+
+    @patch('eox_tenant.signals.TenantConfig')
+    def test_clear_tenant_config_cache(self, tenant_config_mock):
+        """
+        Saving or deleting a TenantConfig or Route drops the cached configurations.
+        """
+        clear_tenant_config_cache(sender=None, instance=MagicMock())
+
+        tenant_config_mock.objects.clear_configurations_cache.assert_called_once()
+
+
+class ConfigVersionSignalTest(TestCase):
+    """
+    Testing the reset of the settings based on the version of the tenant configurations.
+    """
+
+    @patch('eox_tenant.signals.bump_config_version')
+    def test_bump_tenant_config_version(self, bump_mock):
+        """
+        Saving or deleting a TenantConfig, Route or Microsite bumps the version.
+        """
+        bump_tenant_config_version(sender=None, instance=MagicMock())
+
+        bump_mock.assert_called_once()
+
+    @patch('eox_tenant.signals.get_config_version')
+    def test_config_version_changed(self, version_mock):
+        """
+        The settings are outdated only if they were configured with a different version.
+        """
+        version_mock.return_value = 2
+
+        self.assertFalse(_config_version_changed())
+
+        with self.settings(EDNX_TENANT_CONFIG_VERSION=2):
+            self.assertFalse(_config_version_changed())
+
+        with self.settings(EDNX_TENANT_CONFIG_VERSION=1):
+            self.assertTrue(_config_version_changed())
+
+    @patch('eox_tenant.signals.TENANT_CONFIG_CACHE')
+    @patch('eox_tenant.signals.get_config_version')
+    def test_config_version_changed_drops_cached_configs(self, version_mock, cache_mock):
+        """
+        The local configurations are kept only while the version does not change.
+        """
+        version_mock.return_value = 3
+
+        _config_version_changed()
+
+        cache_mock.set_version.assert_called_once_with(3)
+
+    @patch('eox_tenant.signals.EOX_TENANT_USE_CONFIG_VERSION', True)
+    @patch('eox_tenant.signals._perform_reset')
+    @patch('eox_tenant.signals._ttl_reached')
+    @patch('eox_tenant.signals._config_version_changed')
+    def test_can_keep_settings_with_version(self, changed_mock, ttl_mock, reset_mock):
+        """
+        With EOX_TENANT_USE_CONFIG_VERSION the version replaces the ttl check.
+        """
+        changed_mock.return_value = False
+
+        with self.settings(EDNX_TENANT_KEY="tenant-key", EDNX_TENANT_DOMAIN="tenant.com"):
+            self.assertTrue(can_keep_settings("tenant.com"))
+
+            changed_mock.return_value = True
+            self.assertFalse(can_keep_settings("tenant.com"))
+
+        reset_mock.assert_called_once()
+        ttl_mock.assert_not_called()
+
+
+class UpdateDomainIndexTest(TestCase):
+    """
+    Testing the receiver that keeps the domain index up to date.
+    """
+
+    @patch('eox_tenant.signals.DOMAIN_INDEX')
+    def test_route_saved(self, index_mock):
+        """
+        A saved route is updated in the index.
+        """
+        route = Route(domain="tenant.com")
+
+        update_domain_index(sender=Route, instance=route, signal=post_save)
+
+        index_mock.update_route.assert_called_once_with(route, deleted=False)
+
+    @patch('eox_tenant.signals.DOMAIN_INDEX')
+    def test_route_deleted(self, index_mock):
+        """
+        A deleted route is removed from the index.
+        """
+        route = Route(domain="tenant.com")
+
+        update_domain_index(sender=Route, instance=route, signal=post_delete)
+
+        index_mock.update_route.assert_called_once_with(route, deleted=True)
+
+    @patch('eox_tenant.signals.DOMAIN_INDEX')
+    def test_microsite_saved(self, index_mock):
+        """
+        A change in a microsite reloads the microsites of the index.
+        """
+        update_domain_index(sender=Microsite, instance=Microsite(), signal=post_save)
+
+        index_mock.update_microsites.assert_called_once()
+
+
+@patch('eox_tenant.signals.EOX_TENANT_USE_TENANT_MEMBERSHIPS', True)
+class UpdateTenantMembershipsTest(TestCase):
+    """
+    Testing the receivers that keep the tenant memberships up to date.
+    """
+
+    @patch('eox_tenant.signals.synchronize_tenant_memberships')
+    def test_route_changed(self, synchronize_mock):
+        """
+        A saved or deleted route synchronizes the memberships of its tenant config.
+        """
+        tenant = TenantConfig.objects.create(external_key="tenant-key")
+
+        update_tenant_memberships(sender=Route, instance=Route(domain="tenant.com", config=tenant), signal=post_delete)
+        update_tenant_memberships(sender=Route, instance=Route(domain="tenant.com", config_id=0), signal=post_save)
+
+        synchronize_mock.assert_called_once_with(tenant)
+
+    @patch('eox_tenant.signals.synchronize_tenant_memberships')
+    def test_microsite_saved(self, synchronize_mock):
+        """
+        A saved microsite synchronizes its memberships.
+        """
+        microsite = Microsite(key="microsite-key")
+
+        update_tenant_memberships(sender=Microsite, instance=microsite, signal=post_save)
+
+        synchronize_mock.assert_called_once_with(microsite)
+
+    @patch('eox_tenant.signals.synchronize_user_memberships')
+    def test_signup_source_changed(self, synchronize_mock):
+        """
+        A saved or deleted signup source synchronizes the memberships of its user.
+        """
+        update_user_memberships(sender=MagicMock(), instance=MagicMock(user_id=3), signal=post_save)
+
+        synchronize_mock.assert_called_once_with(3)
+
+    @patch('eox_tenant.signals.synchronize_user_memberships')
+    def test_memberships_disabled(self, synchronize_mock):
+        """
+        Nothing is synchronized without EOX_TENANT_USE_TENANT_MEMBERSHIPS.
+        """
+        with patch('eox_tenant.signals.EOX_TENANT_USE_TENANT_MEMBERSHIPS', False):
+            update_user_memberships(sender=MagicMock(), instance=MagicMock(user_id=3), signal=post_save)
+
+        synchronize_mock.assert_not_called()
+
 
 class SettingsOverridesTest(TestCase):
     """
@@ -242,6 +576,39 @@ class SettingsOverridesTest(TestCase):
 
         settings.EDNX_TENANT_KEY  # pylint: disable=pointless-statement
 
+    @patch('eox_tenant.signals.EOX_TENANT_USE_CONFIG_VERSION', True)
+    @patch('eox_tenant.signals.get_config_version')
+    @patch('eox_tenant.signals.get_tenant_config_by_domain')
+    def test_udpate_settings_stores_version(self, _get_config_mock, version_mock):
+        """
+        The version of the applied configurations is stored in the settings.
+        """
+        _get_config_mock.return_value = {"EDNX_USE_SIGNAL": True}, "tenant-key"
+        version_mock.return_value = 7
+
+        _update_settings("tenant.com", LMS_CONFIG_COLUMN)
+
+        self.assertEqual(settings.EDNX_TENANT_CONFIG_VERSION, 7)
+
+    @patch('eox_tenant.signals.EOX_TENANT_USE_CONFIG_VERSION', True)
+    @patch('eox_tenant.signals.get_config_version')
+    @patch('eox_tenant.signals.get_tenant_config_by_domain')
+    def test_udpate_settings_reads_version_first(self, _get_config_mock, version_mock):
+        """
+        A change saved while the configurations are read leaves the older version, so it is applied later.
+        """
+        version_mock.return_value = 7
+
+        def get_config(*_):
+            version_mock.return_value = 8
+            return {"EDNX_USE_SIGNAL": True}, "tenant-key"
+
+        _get_config_mock.side_effect = get_config
+
+        _update_settings("tenant.com", LMS_CONFIG_COLUMN)
+
+        self.assertEqual(settings.EDNX_TENANT_CONFIG_VERSION, 7)
+
     @patch('eox_tenant.signals.get_tenant_config_by_domain')
     def test_udpate_settings_with_property(self, _get_config_mock):
         """
@@ -293,6 +660,271 @@ class SettingsOverridesTest(TestCase):
         self.assertEqual(settings.TEST_DICT_OVERRIDE_TEST.get("key2"), "My value")
 
 
+@patch('eox_tenant.signals.EOX_TENANT_SETTINGS_MODE', SETTINGS_MODE_OVERLAY)
+class SettingsOverlayModeTest(TestCase):
+    """
+    Testing the settings changes when EOX_TENANT_SETTINGS_MODE is "overlay".
+    """
+
+    def tearDown(self):
+        """
+        Must reset after every test
+        """
+        SETTINGS_OVERLAY.clear()
+        settings._setup()  # pylint: disable=protected-access
+
+    @patch('eox_tenant.signals.get_tenant_config_by_domain')
+    def test_reset_undoes_tenant_changes(self, _get_config_mock):
+        """
+        The reset only restores what the tenant changed, without rebuilding the settings.
+        """
+        _get_config_mock.return_value = {
+            "EDNX_USE_SIGNAL": True,
+            "TEST_PROPERTY": "My value",
+            "TEST_DICT_OVERRIDE_TEST": {
+                "key2": "My value",
+            },
+        }, "tenant-key"
+        wrapped = settings._wrapped  # pylint: disable=protected-access
+
+        _update_settings("tenant.com", LMS_CONFIG_COLUMN)
+        self.assertEqual(settings.TEST_DICT_OVERRIDE_TEST.get("key2"), "My value")
+
+        with patch.object(LazySettings, '_setup') as setup_mock:
+            _perform_reset()
+
+        setup_mock.assert_not_called()
+        self.assertIs(settings._wrapped, wrapped)  # pylint: disable=protected-access
+        self.assertEqual(settings.TEST_DICT_OVERRIDE_TEST, {"key1": "Some Value"})
+        self.assertFalse(hasattr(settings, "TEST_PROPERTY"))
+        self.assertFalse(hasattr(settings, "EDNX_TENANT_KEY"))
+
+    @patch('eox_tenant.signals._repopulate_apps')
+    @patch('eox_tenant.signals.get_tenant_config_by_domain')
+    def test_reset_after_repopulate_apps(self, _get_config_mock, _repopulate_mock):
+        """
+        When the tenant reinitialized apps, the whole settings object is rebuilt.
+        """
+        _get_config_mock.return_value = {
+            "EDNX_USE_SIGNAL": True,
+            "EDNX_TENANT_INSTALLED_APPS": ["fake_app"],
+        }, "tenant-key"
+
+        _update_settings("tenant.com", LMS_CONFIG_COLUMN)
+        _repopulate_mock.assert_called_once()
+
+        with patch.object(LazySettings, '_setup') as setup_mock:
+            _perform_reset()
+
+        setup_mock.assert_called_once()
+
+
+@patch('eox_tenant.signals.EOX_TENANT_SETTINGS_MODE', SETTINGS_MODE_SNAPSHOT)
+class SettingsSnapshotModeTest(TestCase):
+    """
+    Testing the settings changes when EOX_TENANT_SETTINGS_MODE is "snapshot".
+    """
+
+    def tearDown(self):
+        """
+        Must reset after every test
+        """
+        SETTINGS_SNAPSHOTS.clear()
+        settings._setup()  # pylint: disable=protected-access
+
+    @patch('eox_tenant.signals.get_tenant_config_by_domain')
+    def test_switch_tenants(self, _get_config_mock):
+        """
+        Switching tenants swaps the settings object without rebuilding it.
+        """
+        first_config = {"EDNX_USE_SIGNAL": True, "TEST_DICT_OVERRIDE_TEST": {"key2": "first"}}
+        second_config = {"EDNX_USE_SIGNAL": True, "TEST_PROPERTY": "second"}
+        pristine = settings._wrapped  # pylint: disable=protected-access
+
+        with patch.object(LazySettings, '_setup') as setup_mock:
+            _get_config_mock.return_value = first_config, "first-key"
+            _update_settings("first.com", LMS_CONFIG_COLUMN)
+            first_snapshot = settings._wrapped  # pylint: disable=protected-access
+            self.assertEqual(settings.EDNX_TENANT_KEY, "first-key")
+            self.assertEqual(settings.TEST_DICT_OVERRIDE_TEST, {"key1": "Some Value", "key2": "first"})
+
+            _perform_reset()
+            self.assertIs(settings._wrapped, pristine)  # pylint: disable=protected-access
+
+            _get_config_mock.return_value = second_config, "second-key"
+            _update_settings("second.com", LMS_CONFIG_COLUMN)
+            self.assertEqual(settings.EDNX_TENANT_DOMAIN, "second.com")
+            self.assertEqual(settings.TEST_PROPERTY, "second")
+            self.assertEqual(settings.TEST_DICT_OVERRIDE_TEST, {"key1": "Some Value"})
+
+            _perform_reset()
+            _get_config_mock.return_value = first_config, "first-key"
+            _update_settings("first.com", LMS_CONFIG_COLUMN)
+
+        setup_mock.assert_not_called()
+        self.assertIs(settings._wrapped, first_snapshot)  # pylint: disable=protected-access
+        self.assertFalse(hasattr(pristine, "EDNX_TENANT_KEY"))
+
+
+@patch('eox_tenant.signals.EOX_TENANT_SETTINGS_MODE', SETTINGS_MODE_CONTEXT)
+class SettingsContextModeTest(TestCase):
+    """
+    Testing the settings changes when EOX_TENANT_SETTINGS_MODE is "context".
+    """
+
+    def setUp(self):
+        """
+        Make django.conf.settings context aware, as the app does in context mode.
+        """
+        install_context_settings()
+
+    def tearDown(self):
+        """
+        Do not leak the context settings to other tests.
+        """
+        TENANT_SETTINGS.set(None)
+        SETTINGS_SNAPSHOTS.clear()
+        uninstall_context_settings()
+
+    @patch('eox_tenant.signals.get_tenant_config_by_domain')
+    def test_start_tenant_in_context(self, _get_config_mock):
+        """
+        The tenant settings are set in the context and the global settings are not changed.
+        """
+        environ = {"HTTP_HOST": "tenant.com:8000"}
+        _get_config_mock.return_value = {"EDNX_USE_SIGNAL": True, "TEST_PROPERTY": "My value"}, "tenant-key"
+
+        with patch('eox_tenant.signals.can_keep_settings') as can_keep_mock:
+            start_lms_tenant(None, environ)
+
+        can_keep_mock.assert_not_called()
+        self.assertEqual(settings.TEST_PROPERTY, "My value")
+        self.assertEqual(settings.EDNX_TENANT_KEY, "tenant-key")
+        self.assertEqual(settings.EDNX_TENANT_DOMAIN, "tenant.com")
+        self.assertFalse(hasattr(settings._wrapped, "TEST_PROPERTY"))  # pylint: disable=protected-access
+        self.assertFalse(hasattr(settings._wrapped, "EDNX_TENANT_KEY"))  # pylint: disable=protected-access
+
+        finish_tenant(None)
+
+        self.assertIsNone(TENANT_SETTINGS.get())
+        self.assertFalse(hasattr(settings, "TEST_PROPERTY"))
+
+    @patch('eox_tenant.signals.get_tenant_config_by_domain')
+    def test_start_tenant_without_signal(self, _get_config_mock):
+        """
+        Sites that do not use the signals leave the context without tenant settings.
+        """
+        TENANT_SETTINGS.set(MagicMock())
+        _get_config_mock.return_value = {}, None
+
+        start_lms_tenant(None, {"HTTP_HOST": "tenant.com"})
+
+        self.assertIsNone(TENANT_SETTINGS.get())
+
+    @patch('eox_tenant.signals._perform_reset')
+    @patch('eox_tenant.signals.get_tenant_config_by_domain')
+    def test_start_async_tenant_in_context(self, _get_config_mock, _reset_mock):
+        """
+        Celery tasks use the context settings as well.
+        """
+        _get_config_mock.return_value = {"EDNX_USE_SIGNAL": True}, "tenant-key"
+        sender = MagicMock()
+        sender.request = {"headers": {"eox_tenant_sender": "tenant.com"}}
+
+        start_async_lms_tenant(sender)
+        self.assertEqual(settings.EDNX_TENANT_KEY, "tenant-key")
+
+        sender.request = {"headers": None}
+        start_async_lms_tenant(sender)
+
+        self.assertIsNone(TENANT_SETTINGS.get())
+        _reset_mock.assert_not_called()
+
+
+class TenantSwitchRecordTest(TestCase):
+    """
+    Testing the tenant switches recorded when a request starts.
+    """
+
+    def setUp(self):
+        """ setup """
+        clear_current_switch()
+
+    def tearDown(self):
+        """
+        Do not leak the context settings to other tests.
+        """
+        TENANT_SETTINGS.set(None)
+        SETTINGS_SNAPSHOTS.clear()
+        settings._setup()  # pylint: disable=protected-access
+
+    @patch('eox_tenant.signals.get_tenant_config_by_domain')
+    def test_switch_and_keep(self, _get_config_mock):
+        """
+        The first request of a tenant switches the settings and the next one keeps them.
+        """
+        _get_config_mock.return_value = {"EDNX_USE_SIGNAL": True}, "tenant-key"
+
+        start_lms_tenant(None, {"HTTP_HOST": "tenant.com"})
+        switch = get_current_switch()
+
+        self.assertEqual((switch.tenant_key, switch.domain), ("tenant-key", "tenant.com"))
+        self.assertEqual(switch.outcome, TENANT_SWITCH_SWITCHED)
+
+        start_lms_tenant(None, {"HTTP_HOST": "tenant.com"})
+
+        self.assertEqual(get_current_switch().outcome, TENANT_SWITCH_KEPT)
+
+    @patch('eox_tenant.signals.get_tenant_config_by_domain')
+    def test_reset(self, _get_config_mock):
+        """
+        Domains that do not use the signals are recorded as a reset.
+        """
+        _get_config_mock.return_value = {}, None
+
+        start_lms_tenant(None, {"HTTP_HOST": "tenant.com"})
+
+        self.assertEqual(get_current_switch().outcome, TENANT_SWITCH_RESET)
+        self.assertIsNone(get_current_switch().tenant_key)
+
+    @patch('eox_tenant.signals.EOX_TENANT_SETTINGS_MODE', SETTINGS_MODE_CONTEXT)
+    @patch('eox_tenant.signals.get_tenant_config_by_domain')
+    def test_context_mode(self, _get_config_mock):
+        """
+        In context mode the settings are kept when the snapshot of the tenant is reused.
+        """
+        install_context_settings()
+        self.addCleanup(uninstall_context_settings)
+        _get_config_mock.return_value = {"EDNX_USE_SIGNAL": True}, "tenant-key"
+
+        start_lms_tenant(None, {"HTTP_HOST": "tenant.com"})
+        self.assertEqual(get_current_switch().outcome, TENANT_SWITCH_SWITCHED)
+
+        start_lms_tenant(None, {"HTTP_HOST": "tenant.com"})
+        self.assertEqual(get_current_switch().outcome, TENANT_SWITCH_KEPT)
+        self.assertEqual(get_current_switch().tenant_key, "tenant-key")
+
+    @patch('eox_tenant.signals.REQUEST_BYPASS', RequestBypass(path_prefixes=["/static/"], hosts=["health.local"]))
+    @patch('eox_tenant.signals.get_tenant_config_by_domain')
+    def test_bypass(self, _get_config_mock):
+        """
+        Bypassed requests do not look up the tenant and keep the settings of the previous request.
+        """
+        _get_config_mock.return_value = {"EDNX_USE_SIGNAL": True}, "tenant-key"
+        start_lms_tenant(None, {"HTTP_HOST": "tenant.com", "PATH_INFO": "/dashboard"})
+        _get_config_mock.reset_mock()
+
+        start_lms_tenant(None, {"HTTP_HOST": "tenant.com", "PATH_INFO": "/static/css/lms.css"})
+
+        self.assertEqual(get_current_switch().outcome, TENANT_SWITCH_BYPASSED)
+        self.assertEqual(settings.EDNX_TENANT_KEY, "tenant-key")
+
+        start_lms_tenant(None, {"HTTP_HOST": "health.local:8000", "PATH_INFO": "/heartbeat"})
+
+        self.assertEqual(get_current_switch().outcome, TENANT_SWITCH_BYPASSED)
+        _get_config_mock.assert_not_called()
+
+
 class CeleryReceiverCLISyncTests(TestCase):
     """
     Testing the celery signals generated outside of a request in a sync process.
@@ -105,3 +105,26 @@ class TenantAwareFunctionsTestCase(TestCase):
         theming_helpers_mock.is_request_in_themed_site.assert_called_once()
         conf_helpers_mock.get_value.assert_called_once()
         conf_helpers_mock.get_all_orgs.assert_called_once()
+
+    @mock.patch('eox_tenant.tenant_aware_functions.enrollments.EOX_TENANT_USE_ORG_INDEX', True)
+    @mock.patch('eox_tenant.tenant_aware_functions.enrollments.ORG_INDEX')
+    @mock.patch('eox_tenant.tenant_aware_functions.enrollments.get_theming_helpers')
+    @mock.patch('eox_tenant.tenant_aware_functions.enrollments.get_configuration_helpers')
+    def test_filter_enrollments_with_org_index(self, get_conf_helpers_mock, get_theming_helpers_mock, org_index_mock):
+        """
+        Test that the orgs owned by a tenant are read from the org index.
+        """
+        conf_helpers_mock = mock.MagicMock()
+        theming_helpers_mock = mock.MagicMock()
+        conf_helpers_mock.get_value.return_value = None
+        theming_helpers_mock.is_request_in_themed_site.return_value = True
+        org_index_mock.get_all_orgs.return_value = frozenset(['org2', 'org3'])
+
+        get_conf_helpers_mock.return_value = conf_helpers_mock
+        get_theming_helpers_mock.return_value = theming_helpers_mock
+
+        list_result = list(filter_enrollments(self.enrolls))
+
+        self.assertEqual(list_result, [])
+        org_index_mock.get_all_orgs.assert_called_once()
+        conf_helpers_mock.get_all_orgs.assert_not_called()
@@ -0,0 +1,284 @@
+"""
+Tests for the strategies used to apply the tenant configurations.
+"""
+from threading import Thread
+
+from django.conf import LazySettings, UserSettingsHolder, settings
+from django.test import TestCase
+
+from eox_tenant.organizations import get_organizations
+from eox_tenant.tenant_settings import (
+    ContextAwareSettings,
+    SettingsOverlay,
+    SettingsSnapshots,
+    activate_tenant_settings,
+    deactivate_tenant_settings,
+    get_current_settings,
+    get_settings_values,
+    install_context_settings,
+    merge_config,
+    uninstall_context_settings,
+)
+from eox_tenant.tenant_wise.proxies import TenantSiteConfigProxy
+
+
+class MergeConfigTest(TestCase):
+    """
+    Test the merge_config function.
+    """
+
+    def test_dicts_are_merged_into_a_copy(self):
+        """
+        Dict values are merged with the base value without changing it.
+        """
+        values = merge_config(settings, {
+            "TEST_DICT_OVERRIDE_TEST": {"key2": "My value"},
+            "TEST_PROPERTY": "My value",
+        })
+
+        self.assertEqual(values["TEST_DICT_OVERRIDE_TEST"], {"key1": "Some Value", "key2": "My value"})
+        self.assertEqual(values["TEST_PROPERTY"], "My value")
+        self.assertNotIn("key2", settings.TEST_DICT_OVERRIDE_TEST)
+
+
+class GetSettingsValuesTest(TestCase):
+    """
+    Test the get_settings_values function.
+    """
+
+    def test_holder_values_include_defaults(self):
+        """
+        The values of a UserSettingsHolder include the inherited ones.
+        """
+        holder = UserSettingsHolder(settings._wrapped)  # pylint: disable=protected-access
+        holder.TEST_PROPERTY = "My value"
+
+        values = get_settings_values(holder)
+
+        self.assertEqual(values["TEST_PROPERTY"], "My value")
+        self.assertEqual(values["TEST_DICT_OVERRIDE_TEST"], {"key1": "Some Value"})
+        self.assertNotIn("default_settings", values)
+
+
+class SettingsOverlayTest(TestCase):
+    """
+    Test the SettingsOverlay class.
+    """
+
+    def tearDown(self):
+        """
+        Must reset after every test
+        """
+        settings._setup()  # pylint: disable=protected-access
+
+    def test_undo_restores_original_values(self):
+        """
+        Changed settings get back their original value and new settings are removed.
+        """
+        overlay = SettingsOverlay()
+        original_dict = settings.TEST_DICT_OVERRIDE_TEST
+
+        overlay.set("TEST_DICT_OVERRIDE_TEST", dict(original_dict, key2="My value"))
+        overlay.set("EDNX_TENANT_KEY", "tenant-key")
+        overlay.set("EDNX_TENANT_KEY", "other-key")
+
+        self.assertEqual(settings.TEST_DICT_OVERRIDE_TEST["key2"], "My value")
+        self.assertEqual(len(overlay), 2)
+
+        self.assertTrue(overlay.undo())
+
+        self.assertIs(settings.TEST_DICT_OVERRIDE_TEST, original_dict)
+        self.assertNotIn("key2", settings.TEST_DICT_OVERRIDE_TEST)
+        self.assertFalse(hasattr(settings, "EDNX_TENANT_KEY"))
+        self.assertEqual(len(overlay), 0)
+
+    def test_inexact_overlay_can_not_undo(self):
+        """
+        When settings were changed outside of the overlay, undo is refused.
+        """
+        overlay = SettingsOverlay()
+        overlay.set("EDNX_TENANT_KEY", "tenant-key")
+        overlay.mark_inexact()
+
+        self.assertFalse(overlay.undo())
+        self.assertEqual(settings.EDNX_TENANT_KEY, "tenant-key")
+
+
+class SettingsSnapshotsTest(TestCase):
+    """
+    Test the SettingsSnapshots class.
+    """
+
+    def setUp(self):
+        """
+        Keep the settings object used before the test.
+        """
+        self.pristine = settings._wrapped  # pylint: disable=protected-access
+        self.snapshots = SettingsSnapshots(maxsize=2)
+
+    def tearDown(self):
+        """
+        Must reset after every test
+        """
+        settings._setup()  # pylint: disable=protected-access
+
+    def test_apply_and_reset(self):
+        """
+        Applying swaps the settings object and the reset puts the pristine one back.
+        """
+        self.snapshots.apply("tenant-key", "lms_configs", {
+            "TEST_DICT_OVERRIDE_TEST": {"key2": "My value"},
+            "TEST_PROPERTY": "My value",
+        })
+
+        self.assertEqual(settings.TEST_PROPERTY, "My value")
+        self.assertEqual(settings.TEST_DICT_OVERRIDE_TEST, {"key1": "Some Value", "key2": "My value"})
+        self.assertEqual(settings.SECRET_KEY, self.pristine.SECRET_KEY)
+
+        self.assertTrue(self.snapshots.reset())
+
+        self.assertIs(settings._wrapped, self.pristine)  # pylint: disable=protected-access
+        self.assertFalse(hasattr(settings, "TEST_PROPERTY"))
+        self.assertEqual(settings.TEST_DICT_OVERRIDE_TEST, {"key1": "Some Value"})
+
+    def test_snapshot_is_reused(self):
+        """
+        The same configurations use the same snapshot.
+        """
+        config = {"TEST_PROPERTY": "My value"}
+
+        snapshot = self.snapshots.apply("tenant-key", "lms_configs", config)
+        self.snapshots.reset()
+
+        self.assertIs(self.snapshots.apply("tenant-key", "lms_configs", config), snapshot)
+        self.assertIs(self.snapshots.apply("tenant-key", "lms_configs", dict(config)), snapshot)
+        self.assertIsNot(self.snapshots.apply("tenant-key", "studio_configs", config), snapshot)
+
+    def test_snapshot_is_built_again_on_changes(self):
+        """
+        New configurations for a tenant produce a new snapshot.
+        """
+        snapshot = self.snapshots.apply("tenant-key", "lms_configs", {"TEST_PROPERTY": "My value"})
+        self.snapshots.reset()
+
+        new_snapshot = self.snapshots.apply("tenant-key", "lms_configs", {"TEST_PROPERTY": "New value"})
+
+        self.assertIsNot(new_snapshot, snapshot)
+        self.assertEqual(settings.TEST_PROPERTY, "New value")
+
+    def test_inexact_snapshots_can_not_reset(self):
+        """
+        When the pristine settings could have changed, the reset is refused.
+        """
+        self.snapshots.apply("tenant-key", "lms_configs", {"TEST_PROPERTY": "My value"})
+        self.snapshots.mark_inexact()
+
+        self.assertFalse(self.snapshots.reset())
+
+        self.snapshots.clear()
+        self.assertIsNone(self.snapshots.pristine)
+        self.assertEqual(self.snapshots.stats()["size"], 0)
+
+
+class ContextAwareSettingsTest(TestCase):
+    """
+    Test the settings of the tenant active in the current context.
+    """
+
+    def setUp(self):
+        """
+        Build a snapshot for a tenant and make django.conf.settings context aware.
+        """
+        self.snapshot = SettingsSnapshots().build({"TEST_PROPERTY": "My value"})
+        install_context_settings()
+        self.addCleanup(uninstall_context_settings)
+
+    def tearDown(self):
+        """
+        Do not leak the context settings to other tests.
+        """
+        deactivate_tenant_settings()
+
+    def test_global_settings_without_tenant(self):
+        """
+        Without an active tenant the global settings are used.
+        """
+        self.assertIsInstance(settings, ContextAwareSettings)
+        self.assertEqual(settings.TEST_DICT_OVERRIDE_TEST, {"key1": "Some Value"})
+        self.assertFalse(hasattr(settings, "TEST_PROPERTY"))
+        self.assertIs(get_current_settings(), settings._wrapped)  # pylint: disable=protected-access
+
+    def test_tenant_settings_in_context(self):
+        """
+        The active tenant settings are read first, the global settings are not changed.
+        """
+        current_settings = activate_tenant_settings(self.snapshot, EDNX_TENANT_KEY="tenant-key")
+
+        self.assertEqual(settings.TEST_PROPERTY, "My value")
+        self.assertEqual(settings.EDNX_TENANT_KEY, "tenant-key")
+        self.assertEqual(settings.TEST_DICT_OVERRIDE_TEST, {"key1": "Some Value"})
+        self.assertIs(get_current_settings(), current_settings)
+        self.assertFalse(hasattr(settings._wrapped, "TEST_PROPERTY"))  # pylint: disable=protected-access
+
+        deactivate_tenant_settings()
+
+        self.assertFalse(hasattr(settings, "TEST_PROPERTY"))
+
+    def test_values_are_not_cached(self):
+        """
+        The values read in a context are not kept for the next one, and installing the
+        class drops the values cached before.
+        """
+        uninstall_context_settings()
+        self.assertEqual(settings.TEST_DICT_OVERRIDE_TEST, {"key1": "Some Value"})
+        snapshot = SettingsSnapshots().build({"TEST_DICT_OVERRIDE_TEST": {"key1": "Tenant Value"}})
+        install_context_settings()
+
+        activate_tenant_settings(snapshot)
+        self.assertEqual(settings.TEST_DICT_OVERRIDE_TEST, {"key1": "Tenant Value"})
+
+        deactivate_tenant_settings()
+        self.assertEqual(settings.TEST_DICT_OVERRIDE_TEST, {"key1": "Some Value"})
+        self.assertNotIn("TEST_DICT_OVERRIDE_TEST", vars(settings))
+
+    def test_uninstall(self):
+        """
+        Without the context aware class the context settings are not read.
+        """
+        activate_tenant_settings(self.snapshot)
+        uninstall_context_settings()
+
+        self.assertIs(type(settings), LazySettings)
+        self.assertFalse(hasattr(settings, "TEST_PROPERTY"))
+
+    def test_lowercase_tenant_keys(self):
+        """
+        Names that are not uppercase, as course_org_filter, are read from the snapshot.
+        """
+        snapshot = SettingsSnapshots().build({"course_org_filter": ["OrgA"]})
+        current_settings = activate_tenant_settings(snapshot, EDNX_TENANT_KEY="tenant-key")
+
+        self.assertEqual(settings.course_org_filter, ["OrgA"])
+        self.assertEqual(TenantSiteConfigProxy().get_value("course_org_filter"), ["OrgA"])
+        self.assertEqual(get_organizations(), ["OrgA"])
+        self.assertEqual(get_settings_values(current_settings)["course_org_filter"], ["OrgA"])
+        self.assertEqual(get_settings_values(current_settings)["EDNX_TENANT_KEY"], "tenant-key")
+        self.assertNotIn("default_settings", get_settings_values(current_settings))
+
+    def test_tenant_settings_are_isolated_between_threads(self):
+        """
+        A tenant activated in a thread is not seen by other threads.
+        """
+        results = {}
+
+        def read_settings():
+            """Read the tenant settings in a new thread."""
+            results["value"] = getattr(settings, "TEST_PROPERTY", None)
+
+        activate_tenant_settings(self.snapshot)
+        thread = Thread(target=read_settings)
+        thread.start()
+        thread.join()
+
+        self.assertIsNone(results["value"])
+        self.assertEqual(settings.TEST_PROPERTY, "My value")
@@ -5,10 +5,20 @@ from __future__ import absolute_import
 
 import json
 
-from django.core.management import call_command
+import mock
+from django.core.management import CommandError, call_command
 from django.test import TransactionTestCase, override_settings
 
-from eox_tenant.models import Microsite, TenantConfig
+from eox_tenant.cache import TENANT_CACHE
+from eox_tenant.models import Microsite, TenantConfig, TenantOrganizationValue
+from eox_tenant.org_index import ORG_INDEX
+from eox_tenant.tenant_settings import (
+    SettingsSnapshots,
+    activate_tenant_settings,
+    deactivate_tenant_settings,
+    install_context_settings,
+    uninstall_context_settings,
+)
 from eox_tenant.tenant_wise.proxies import TenantSiteConfigProxy
 
 
@@ -77,6 +87,18 @@ class TenantSiteConfigProxyTest(TransactionTestCase):
 
         self.assertTrue(org_list == TenantSiteConfigProxy.get_all_orgs())
 
+    @mock.patch("eox_tenant.tenant_wise.proxies.EOX_TENANT_USE_ORG_INDEX", True)
+    def test_get_all_orgs_from_org_index(self):
+        """
+        Test that the orgs are read from the org index when it is enabled.
+        """
+        ORG_INDEX.clear()
+
+        self.assertEqual(
+            TenantSiteConfigProxy.get_all_orgs(),
+            frozenset(["test1-org", "test2-org", "test3-org", "test4-org", "test5-org", "common-org"]),
+        )
+
     def test_get_value_for_org(self):
         """
         Test to get an specific value for a given org.
@@ -151,6 +173,118 @@ class TenantSiteConfigProxyTest(TransactionTestCase):
             "Hello-World3",
         )
 
+    def test_get_value_for_org_addressable_key(self):
+        """
+        Test that org-addressable keys are read from TenantOrganizationValue with the same precedence.
+        """
+        Microsite.objects.create(
+            subdomain="third.test.prod.edunext",
+            key="microsite-key",
+            values={"course_org_filter": ["test4-org", "test3-org"], "PLATFORM_NAME": "Microsite"},
+        )
+        TenantConfig.objects.create(
+            external_key="tenant-key3",
+            lms_configs={"course_org_filter": ["common-org"], "PLATFORM_NAME": "Tenant 3"},
+        )
+        TenantConfig.objects.create(
+            external_key="tenant-key4",
+            lms_configs={"course_org_filter": ["common-org", "test4-org"], "PLATFORM_NAME": "Tenant 4"},
+        )
+        call_command("synchronize_organizations")
+
+        with self.assertNumQueries(1):
+            self.assertEqual(TenantSiteConfigProxy.get_value_for_org("common-org", "PLATFORM_NAME"), "Tenant 3")
+
+        with override_settings(EDNX_TENANT_KEY="tenant-key4"):
+            with self.assertNumQueries(1):
+                self.assertEqual(TenantSiteConfigProxy.get_value_for_org("common-org", "PLATFORM_NAME"), "Tenant 4")
+
+            self.assertEqual(TenantSiteConfigProxy.get_value_for_org("test3-org", "PLATFORM_NAME"), "Microsite")
+            self.assertEqual(TenantSiteConfigProxy.get_value_for_org("test4-org", "PLATFORM_NAME"), "Tenant 4")
+            self.assertIsNone(TenantSiteConfigProxy.get_value_for_org("test5-org", "PLATFORM_NAME"))
+
+    def test_get_value_for_org_addressable_key_not_synchronized(self):
+        """
+        Test that org-addressable keys without rows in TenantOrganizationValue are read from the configurations.
+        """
+        TENANT_CACHE.clear()
+        TenantOrganizationValue.objects.filter(key="PLATFORM_NAME").delete()
+        TenantConfig.objects.filter(external_key="tenant-key1").update(
+            lms_configs={"course_org_filter": ["common-org", "test4-org"], "PLATFORM_NAME": "Tenant 1"},
+        )
+
+        self.assertEqual(TenantSiteConfigProxy.get_value_for_org("test4-org", "PLATFORM_NAME"), "Tenant 1")
+        self.assertEqual(TenantSiteConfigProxy.get_value_for_org("common-org", "PLATFORM_NAME"), "Tenant 1")
+        self.assertEqual(TenantSiteConfigProxy.get_value_for_org("test5-org", "PLATFORM_NAME", "Default"), "Default")
+
+    def test_get_value_for_org_without_value(self):
+        """
+        Test that orgs without a value are cached and return the default of every call.
+        """
+        with self.assertNumQueries(2):
+            self.assertEqual(TenantSiteConfigProxy.get_value_for_org("test2-org", "missing-value", "first"), "first")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(TenantSiteConfigProxy.get_value_for_org("test2-org", "missing-value", "second"), "second")
+
+    def test_pre_load_values_by_org(self):
+        """
+        Test that the preloaded keys are the ones read by get_value_for_org for every tenant.
+        """
+        TENANT_CACHE.clear()
+        orgs = ["test1-org", "test2-org", "test3-org", "test4-org", "test5-org", "common-org"]
+
+        call_command("preload_org_values", "value-test", "lms_base", batch_size=4, all_tenants=True)
+
+        for tenant_key in (None, "tenant-key1", "tenant-key2", "test_fake_key"):
+            with override_settings(EDNX_TENANT_KEY=tenant_key):
+                with self.assertNumQueries(0):
+                    preloaded = TenantSiteConfigProxy.get_value_for_org("common-org", "lms_base", "Default")
+
+                expected = "tenant-2-base" if tenant_key == "tenant-key2" else "tenant-1-base"
+                self.assertEqual(preloaded, expected)
+
+                for org in orgs:
+                    preloaded = TenantSiteConfigProxy.get_value_for_org(org, "value-test", "Default")
+
+                    TENANT_CACHE.clear()
+                    self.assertEqual(preloaded, TenantSiteConfigProxy.get_value_for_org(org, "value-test", "Default"))
+                    call_command("preload_org_values", "value-test", "lms_base", all_tenants=True)
+
+    def test_preload_command_needs_tenants(self):
+        """
+        Test that the command preloads the given tenants or all of them, never an implicit one.
+        """
+        with self.assertRaises(CommandError):
+            call_command("preload_org_values", "value-test")
+
+    def test_pre_load_values_only_orgs_with_value(self):
+        """
+        Test that only the orgs with a value are preloaded, and only for the current tenant by default.
+        """
+        TENANT_CACHE.clear()
+
+        with override_settings(EDNX_TENANT_KEY="tenant-key1"):
+            # test4-org has no value-test
+            self.assertEqual(TenantSiteConfigProxy.pre_load_values_by_org("value-test"), 5)
+
+            with self.assertNumQueries(0):
+                self.assertEqual(TenantSiteConfigProxy.get_value_for_org("test1-org", "value-test"), "Hello-World3")
+
+        with self.assertNumQueries(1):
+            self.assertEqual(TenantSiteConfigProxy.get_value_for_org("test1-org", "value-test"), "Hello-World3")
+
+    def test_pre_load_values_only_once(self):
+        """
+        Test that pre_load_values_by_org does nothing if the values of the tenant were already preloaded.
+        """
+        TENANT_CACHE.clear()
+
+        self.assertEqual(TenantSiteConfigProxy.pre_load_values_by_org("value-test", tenant_keys=[None]), 5)
+        self.assertEqual(TenantSiteConfigProxy.pre_load_values_by_org("value-test"), 0)
+        self.assertEqual(TenantSiteConfigProxy.pre_load_values_by_org("value-test", tenant_keys=["tenant-key1"]), 5)
+        self.assertEqual(TenantSiteConfigProxy.pre_load_values_by_org("value-test", force=True), 5)
+
     def test_create_site_configuration(self):
         """
         Test that a new TenantSiteConfigProxy instance is created with
@@ -168,6 +302,23 @@ class TenantSiteConfigProxyTest(TransactionTestCase):
             self.assertTrue(site_configuration.get_value("EDNX_TENANT_KEY"))
             self.assertTrue(site_configuration.get_value("EDNX_USE_SIGNAL"))
 
+    def test_site_configuration_in_context(self):
+        """
+        Test that TenantSiteConfigProxy reads the settings of the tenant active
+        in the current context.
+        """
+        snapshot = SettingsSnapshots().build({"EDNX_USE_SIGNAL": True, "PLATFORM_NAME": "Tenant"})
+        install_context_settings()
+        self.addCleanup(uninstall_context_settings)
+        activate_tenant_settings(snapshot, EDNX_TENANT_KEY="test-key")
+        self.addCleanup(deactivate_tenant_settings)
+
+        site_configuration = TenantSiteConfigProxy()
+
+        self.assertTrue(site_configuration.enabled)
+        self.assertEqual(site_configuration.get_value("PLATFORM_NAME"), "Tenant")
+        self.assertEqual(site_configuration.values["EDNX_TENANT_KEY"], "test-key")
+
     def test_get_site_values_with_serializable_settings(self):
         """
         Test that if the settings are json serializable `site_values`
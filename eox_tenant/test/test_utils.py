@@ -6,9 +6,18 @@ from __future__ import absolute_import
 
 import ddt
 import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
 
-from eox_tenant.utils import is_valid_domain, move_signupsource
+from eox_tenant.models import Microsite, Route, TenantConfig, TenantMembership, TenantOrganizationValue
+from eox_tenant.utils import (
+    is_valid_domain,
+    move_signupsource,
+    synchronize_tenant_memberships,
+    synchronize_tenant_organizations,
+    synchronize_user_memberships,
+)
 
 
 @ddt.ddt
@@ -43,3 +52,165 @@ class MoveSignupSource(TestCase):
         move_signupsource("example1.edunext.co", "example2.edunext.co")
         signupsource_mock.objects.filter.assert_called_with(site="example1.edunext.co")
         signupsource_filtered.update.assert_called_with(site="example2.edunext.co")
+
+
+class SynchronizeOrganizationValuesTest(TestCase):
+    """
+    Test the org-addressable values written by synchronize_tenant_organizations.
+    """
+
+    def test_tenant_config_values(self):
+        """
+        There is a row per org and org-addressable key of the tenant.
+        """
+        tenant_config = TenantConfig.objects.create(
+            external_key="tenant-key",
+            lms_configs={
+                "course_org_filter": ["org1", "org2"],
+                "PLATFORM_NAME": "Tenant",
+                "LMS_ROOT_URL": None,
+                "OTHER_KEY": "other",
+            },
+        )
+
+        synchronize_tenant_organizations(tenant_config)
+
+        self.assertEqual(
+            set(TenantOrganizationValue.objects.values_list("org", "key", "value", "tenant_key")),
+            {("org1", "PLATFORM_NAME", "Tenant", "tenant-key"), ("org2", "PLATFORM_NAME", "Tenant", "tenant-key")},
+        )
+
+        tenant_config.lms_configs = {"course_org_filter": "org3", "LMS_ROOT_URL": "https://tenant.com"}
+        synchronize_tenant_organizations(tenant_config)
+
+        self.assertEqual(
+            list(TenantOrganizationValue.objects.values_list("org", "key", "value")),
+            [("org3", "LMS_ROOT_URL", "https://tenant.com")],
+        )
+
+        tenant_config.delete()
+
+        self.assertFalse(TenantOrganizationValue.objects.exists())
+
+    def test_microsite_values(self):
+        """
+        Microsite values are stored as well.
+        """
+        microsite = Microsite.objects.create(
+            key="microsite-key",
+            values={"course_org_filter": "org1", "PLATFORM_NAME": "Microsite"},
+        )
+
+        synchronize_tenant_organizations(microsite)
+
+        value = TenantOrganizationValue.objects.get()
+        self.assertEqual((value.microsite, value.tenant_config, value.value), (microsite, None, "Microsite"))
+
+
+class TenantMembershipTest(TestCase):
+    """
+    Test the TenantMembership rows written from the signup sources.
+    """
+
+    def setUp(self):
+        """
+        Create a tenant config with two routes, a microsite and the signup sources of three users.
+        """
+        self.tenant = TenantConfig.objects.create(external_key="tenant-key")
+        Route.objects.create(domain="first.tenant.org", config=self.tenant)
+        Route.objects.create(domain="second.tenant.org", config=self.tenant)
+        self.microsite = Microsite.objects.create(key="microsite-key", subdomain="microsite.org")
+        self.users = [User.objects.create(username=f"user{number}") for number in range(3)]
+        self.sources = [
+            (self.users[0].id, "first.tenant.org"),
+            (self.users[0].id, "microsite.org"),
+            (self.users[1].id, "second.tenant.org"),
+            (self.users[2].id, "other.org"),
+        ]
+        patcher = mock.patch("eox_tenant.utils.UserSignupSource")
+        signup_source_mock = patcher.start()
+        signup_source_mock.objects.filter.side_effect = self.filter_sources
+        self.addCleanup(patcher.stop)
+
+    def filter_sources(self, site__in=None, user_id=None, **kwargs):
+        """
+        Stand in for UserSignupSource.objects.filter over self.sources.
+        """
+        rows = [
+            (source_user_id, site)
+            for source_user_id, site in self.sources
+            if (site__in is None or site in site__in) and (user_id is None or source_user_id == user_id)
+        ]
+        if kwargs:
+            # move_signupsource filters by site to update, the test changes self.sources itself
+            return mock.Mock()
+
+        queryset = mock.Mock()
+        queryset.values_list.side_effect = lambda field, flat: [row[0 if field == "user_id" else 1] for row in rows]
+        return queryset
+
+    def test_synchronize_tenant_memberships(self):
+        """
+        The users with a signup source on any domain of the tenant are its members.
+        """
+        self.assertEqual(synchronize_tenant_memberships(self.tenant), (2, 0))
+        self.assertEqual(synchronize_tenant_memberships(self.tenant), (0, 0))
+        self.assertEqual(synchronize_tenant_memberships(self.microsite), (1, 0))
+
+        self.sources.remove((self.users[1].id, "second.tenant.org"))
+
+        self.assertEqual(synchronize_tenant_memberships(self.tenant), (0, 1))
+        self.assertEqual(set(TenantMembership.objects.get_user_ids("tenant-key")), {self.users[0].id})
+        self.assertEqual(set(TenantMembership.objects.get_user_ids("microsite-key")), {self.users[0].id})
+
+    def test_synchronize_user_memberships(self):
+        """
+        The memberships of a user are rewritten from its signup sources.
+        """
+        synchronize_user_memberships(self.users[0].id)
+
+        self.assertEqual(TenantMembership.objects.get_tenant_keys(self.users[0].id), {"tenant-key", "microsite-key"})
+
+        self.sources.remove((self.users[0].id, "microsite.org"))
+        synchronize_user_memberships(self.users[0].id)
+
+        self.assertEqual(TenantMembership.objects.get_tenant_keys(self.users[0].id), {"tenant-key"})
+        self.assertEqual(TenantMembership.objects.get_tenant_keys(self.users[2].id), set())
+
+    def test_is_member(self):
+        """
+        Membership is read by tenant key.
+        """
+        synchronize_tenant_memberships(self.tenant)
+
+        self.assertTrue(TenantMembership.objects.is_member(self.users[1].id, "tenant-key"))
+        self.assertFalse(TenantMembership.objects.is_member(self.users[1].id, "microsite-key"))
+        self.assertFalse(TenantMembership.objects.is_member(self.users[2].id, "tenant-key"))
+
+    @mock.patch("eox_tenant.utils.EOX_TENANT_USE_TENANT_MEMBERSHIPS", True)
+    def test_move_signupsource(self):
+        """
+        Moving the signup sources synchronizes the tenants of both domains.
+        """
+        synchronize_tenant_memberships(self.tenant)
+        self.sources[2] = (self.users[1].id, "microsite.org")
+
+        move_signupsource("second.tenant.org", "microsite.org")
+
+        self.assertEqual(set(TenantMembership.objects.get_user_ids("tenant-key")), {self.users[0].id})
+        self.assertEqual(
+            set(TenantMembership.objects.get_user_ids("microsite-key")),
+            {self.users[0].id, self.users[1].id},
+        )
+
+    def test_command(self):
+        """
+        The command synchronizes the memberships of the selected tenants.
+        """
+        call_command("synchronize_tenant_memberships", "--model", "Microsite", "--key", "microsite-key")
+
+        self.assertEqual(TenantMembership.objects.get_tenant_keys(self.users[0].id), {"microsite-key"})
+
+        call_command("synchronize_tenant_memberships")
+
+        self.assertEqual(TenantMembership.objects.count(), 3)
@@ -0,0 +1,92 @@
+"""
+Tests for the OAuth2 validator that restricts the applications by url.
+"""
+from django.test import RequestFactory, TestCase, override_settings
+from mock import MagicMock, patch
+
+
+class FakeEdxOAuth2Validator:
+    """
+    Stand in for the EdxOAuth2Validator of edx-platform.
+    """
+    application = None
+
+    def _load_application(self, client_id, request):  # pylint: disable=unused-argument
+        return self.application
+
+
+class EoxTenantOAuth2ValidatorTest(TestCase):
+    """
+    Test the application checks of EoxTenantOAuth2Validator.
+    """
+
+    def setUp(self):
+        with patch(
+            "eox_tenant.edxapp_wrapper.oauth_dispatch.get_edx_oauth2_validator_class",
+            return_value=FakeEdxOAuth2Validator,
+        ):
+            from eox_tenant import validators  # pylint: disable=import-outside-toplevel
+
+        self.validators = validators
+        self.validators.REDIRECT_URI_VERDICTS.clear()
+        self.validator = validators.EoxTenantOAuth2Validator()
+        self.validator.application = MagicMock(
+            client_id="client-id",
+            redirect_uris="https://tenant.org/ https://other.org/",
+        )
+        self.validator.application.name = "application"
+        self.validator.application.redirect_uri_allowed.side_effect = (
+            lambda url: url in self.validator.application.redirect_uris.split()
+        )
+        patcher = patch("eox_tenant.validators.get_current_request")
+        self.request_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.request_mock.return_value = RequestFactory().get("/", HTTP_HOST="tenant.org", secure=True)
+
+    def load_application(self):
+        """
+        Load the application of the client through the validator.
+        """
+        return self.validator._load_application("client-id", None)  # pylint: disable=protected-access
+
+    def test_redirect_uri_allowed(self):
+        """
+        The verdict of the redirect uris is computed once per client, url and redirect uris.
+        """
+        application = self.validator.application
+
+        self.assertIs(self.load_application(), application)
+        self.assertIs(self.load_application(), application)
+        application.redirect_uri_allowed.assert_called_once_with("https://tenant.org/")
+
+        application.redirect_uris = "https://other.org/"
+
+        self.assertIsNone(self.load_application())
+        self.assertEqual(application.redirect_uri_allowed.call_count, 2)
+
+    @override_settings(ALLOWED_AUTH_APPLICATIONS=["application"])
+    def test_allowed_application(self):
+        """
+        Applications in ALLOWED_AUTH_APPLICATIONS are allowed without checking the url.
+        """
+        self.validator.application.redirect_uris = ""
+
+        self.assertIs(self.load_application(), self.validator.application)
+        self.validator.application.redirect_uri_allowed.assert_not_called()
+
+    def test_get_allowed_applications(self):
+        """
+        The allowed names include the default ones and are built once per value of the setting.
+        """
+        allowed = self.validators.get_allowed_applications(["application"])
+
+        self.assertEqual(allowed, frozenset(["application", "cms-sso", "cms-sso-dev"]))
+        self.assertIs(self.validators.get_allowed_applications(["application"]), allowed)
+
+    def test_no_application(self):
+        """
+        Unknown clients are rejected.
+        """
+        self.validator.application = None
+
+        self.assertIsNone(self.load_application())
@@ -1,8 +1,10 @@
 """
 Test views file.
 """
+from django.contrib.auth.models import User
 from django.test import TestCase
 from django.urls import reverse
+from mock import patch
 
 
 class EOXInfoTestCase(TestCase):
@@ -30,3 +32,51 @@ class EOXInfoTestCase(TestCase):
 
             self.assertEqual(name, content['name'])
             self.assertEqual(response.status_code, 200)
+
+
+class WorkerStatsTestCase(TestCase):
+    """
+    Test for eox-tenant-stats view.
+    """
+
+    def setUp(self):
+        """ setup """
+        self.staff = User.objects.create(username="staff", is_staff=True)
+
+    def test_view_disabled(self):
+        """
+        The view is not available by default.
+        """
+        self.client.force_login(self.staff)
+
+        response = self.client.get(reverse('eox-tenant-stats'))
+
+        self.assertEqual(response.status_code, 404)
+
+    @patch('eox_tenant.views.EOX_TENANT_ENABLE_WORKER_STATS', True)
+    def test_view_not_staff(self):
+        """
+        Only staff users can see the view.
+        """
+        self.client.force_login(User.objects.create(username="learner"))
+
+        response = self.client.get(reverse('eox-tenant-stats'))
+
+        self.assertEqual(response.status_code, 404)
+
+    @patch('eox_tenant.views.EOX_TENANT_ENABLE_WORKER_STATS', True)
+    def test_view_enabled(self):
+        """
+        The counters of the worker are shown to staff users.
+        """
+        self.client.force_login(self.staff)
+
+        content = self.client.get(reverse('eox-tenant-stats')).json()
+
+        self.assertIn("hit_rate", content["tenant_switches"])
+        self.assertIn("hits", content["config_cache"])
+        self.assertIn("builds", content["settings_snapshots"])
+        self.assertIn("negative_hits", content["org_value_cache"])
+        self.assertIn("hits", content["local_cache"])
+        self.assertIn("orgs", content["org_index"])
+        self.assertEqual(content["timings"], [])
@@ -6,5 +6,6 @@ from eox_tenant import views
 
 urlpatterns = [
     re_path(r'^eox-info$', views.info_view, name='eox-info'),
+    re_path(r'^eox-tenant-stats$', views.worker_stats_view, name='eox-tenant-stats'),
     re_path(r'^api/', include(('eox_tenant.api.urls', 'eox_tenant'), namespace='api')),
 ]
@@ -5,14 +5,28 @@ import logging
 import re
 
 import six
+from django.conf import settings
+from django.db import transaction
 from organizations.models import Organization
 
 from eox_tenant.edxapp_wrapper.users import get_user_signup_source
-from eox_tenant.models import TenantOrganization
+from eox_tenant.models import (
+    ORG_ADDRESSABLE_KEYS,
+    Microsite,
+    Route,
+    TenantConfig,
+    TenantMembership,
+    TenantOrganization,
+    TenantOrganizationValue,
+)
 
 UserSignupSource = get_user_signup_source()
 log = logging.getLogger(__name__)
 
+# Read at the beginning so this can not be modified by the tenant configs
+EOX_TENANT_USE_TENANT_MEMBERSHIPS = getattr(settings, "EOX_TENANT_USE_TENANT_MEMBERSHIPS", False)
+MEMBERSHIPS_BATCH_SIZE = 1000
+
 # Taken from: https://github.com/kvesteri/validators/blob/master/validators/domain.py
 domain_pattern = re.compile(
     r'^(?:[a-zA-Z0-9]'  # First character of the domain
@@ -80,6 +94,11 @@ def move_signupsource(old_domain, new_domain):
 
         log.info("Updated %s SignupSources from %s to %s.", count, old_domain, new_domain)
 
+        if EOX_TENANT_USE_TENANT_MEMBERSHIPS:
+            # update() sends no signals, the tenants of both domains are synchronized here
+            for instance in get_domain_tenants([old_domain, new_domain]):
+                synchronize_tenant_memberships(instance)
+
 
 def synchronize_tenant_organizations(instance):
     """
@@ -106,3 +125,103 @@ def synchronize_tenant_organizations(instance):
         organization, _ = TenantOrganization.objects.get_or_create(name=org)
         instance.organizations.add(organization)
         Organization.objects.get_or_create(name=org, short_name=org)
+
+    synchronize_organization_values(instance, course_org_filter, config)
+
+
+def synchronize_organization_values(instance, course_org_filter, config):
+    """
+    Rewrite the TenantOrganizationValue rows of a TenantConfig or Microsite instance.
+
+    Args:
+        instance: This could be a TenantConfig or Microsite model instance.
+        course_org_filter: List of the organizations of the instance.
+        config: Configurations of the instance.
+    """
+    if isinstance(instance, TenantConfig):
+        source = {"tenant_config": instance}
+        tenant_key = instance.external_key
+    else:
+        source = {"microsite": instance}
+        tenant_key = instance.key
+
+    TenantOrganizationValue.objects.filter(**source).delete()
+    TenantOrganizationValue.objects.bulk_create([
+        TenantOrganizationValue(org=org, key=key, value=config[key], tenant_key=tenant_key, **source)
+        for org in course_org_filter
+        for key in sorted(ORG_ADDRESSABLE_KEYS)
+        if config.get(key) is not None
+    ])
+
+
+def get_domain_tenants(domains):
+    """
+    Return the TenantConfig and Microsite instances served at any of the domains.
+    """
+    return [
+        *TenantConfig.objects.filter(route__domain__in=domains).distinct(),
+        *Microsite.objects.filter(subdomain__in=domains),
+    ]
+
+
+def get_membership_source(instance):
+    """
+    Return the TenantMembership field that points to a TenantConfig or Microsite instance.
+    """
+    if isinstance(instance, TenantConfig):
+        return {"tenant_config": instance}
+
+    return {"microsite": instance}
+
+
+def synchronize_tenant_memberships(instance):
+    """
+    Make the TenantMembership rows of a tenant match the users with a signup source on its domains.
+
+    Args:
+        instance: This could be a TenantConfig or Microsite model instance.
+
+    Returns:
+        The number of memberships created and deleted.
+    """
+    source = get_membership_source(instance)
+
+    if isinstance(instance, TenantConfig):
+        domains = Route.objects.filter(config=instance).values_list("domain", flat=True)
+    else:
+        domains = [instance.subdomain]
+
+    user_ids = set(UserSignupSource.objects.filter(site__in=list(domains)).values_list("user_id", flat=True))
+    memberships = TenantMembership.objects.filter(**source)
+
+    with transaction.atomic():
+        current_ids = set(memberships.values_list("user_id", flat=True))
+        deleted_ids = current_ids - user_ids
+
+        if deleted_ids:
+            memberships.filter(user_id__in=deleted_ids).delete()
+
+        created = TenantMembership.objects.bulk_create(
+            [TenantMembership(user_id=user_id, **source) for user_id in user_ids - current_ids],
+            batch_size=MEMBERSHIPS_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+    return len(created), len(deleted_ids)
+
+
+def synchronize_user_memberships(user_id):
+    """
+    Rewrite the TenantMembership rows of a user from its signup sources.
+
+    Args:
+        user_id: Id of the user.
+    """
+    sites = set(UserSignupSource.objects.filter(user_id=user_id).values_list("site", flat=True))
+
+    with transaction.atomic():
+        TenantMembership.objects.filter(user_id=user_id).delete()
+        TenantMembership.objects.bulk_create([
+            TenantMembership(user_id=user_id, **get_membership_source(instance))
+            for instance in get_domain_tenants(sites)
+        ])
@@ -6,12 +6,52 @@ import logging
 from crum import get_current_request
 from django.conf import settings
 
+from eox_tenant.cache import LRUCache
 from eox_tenant.constants import DEFAULT_ALLOWED_AUTH_APPLICATIONS
 from eox_tenant.edxapp_wrapper.oauth_dispatch import get_edx_oauth2_validator_class
 
 EdxOAuth2Validator = get_edx_oauth2_validator_class()
 logger = logging.getLogger(__name__)
 
+# Allowed application names by value of ALLOWED_AUTH_APPLICATIONS
+ALLOWED_APPLICATIONS = LRUCache(maxsize=256, timeout=float("inf"))
+# Whether the redirect uris of an application allow an url, read at the beginning so this can not be
+# modified by the tenant configs. The redirect uris are part of the key, so edits of the application
+# made by any process are seen as soon as the parent validator loads it again.
+REDIRECT_URI_VERDICTS = LRUCache(
+    maxsize=getattr(settings, "EOX_TENANT_OAUTH_VERDICT_CACHE_SIZE", 1024),
+    timeout=float("inf"),
+)
+
+
+def get_allowed_applications(allowed_auth_applications):
+    """
+    Return the frozenset of ALLOWED_AUTH_APPLICATIONS plus DEFAULT_ALLOWED_AUTH_APPLICATIONS,
+    built once for every value of the setting.
+    """
+    key = tuple(allowed_auth_applications)
+    allowed_applications = ALLOWED_APPLICATIONS.get(key)
+
+    if allowed_applications is None:
+        allowed_applications = frozenset(key).union(DEFAULT_ALLOWED_AUTH_APPLICATIONS)
+        ALLOWED_APPLICATIONS.set(key, allowed_applications)
+
+    return allowed_applications
+
+
+def is_redirect_uri_allowed(application, url):
+    """
+    Return application.redirect_uri_allowed(url), cached by client id, url and redirect uris.
+    """
+    key = (application.client_id, url, application.redirect_uris)
+    verdict = REDIRECT_URI_VERDICTS.get(key)
+
+    if verdict is None:
+        verdict = bool(application.redirect_uri_allowed(url))
+        REDIRECT_URI_VERDICTS.set(key, verdict)
+
+    return verdict
+
 
 class EoxTenantOAuth2Validator(EdxOAuth2Validator):
     """Class that restricts the token creation, the creation is restricted to the application redirect uris
@@ -21,17 +61,20 @@ class EoxTenantOAuth2Validator(EdxOAuth2Validator):
 
     def _load_application(self, client_id, request):
         """Return the application if the current url is allowed."""
-        current_url = get_current_request().build_absolute_uri('/')
-        allowed_auth_applications = getattr(settings, 'ALLOWED_AUTH_APPLICATIONS', [])
-        allowed_applications = allowed_auth_applications + DEFAULT_ALLOWED_AUTH_APPLICATIONS
         application = super()._load_application(client_id, request)
 
         if not application:
             return None
 
         application_name = application.name
+        allowed_applications = get_allowed_applications(getattr(settings, 'ALLOWED_AUTH_APPLICATIONS', []))
+
+        if application_name in allowed_applications:
+            return application
+
+        current_url = get_current_request().build_absolute_uri('/')
 
-        if application.redirect_uri_allowed(current_url) or application_name in allowed_applications:
+        if is_redirect_uri_allowed(application, current_url):
             return application
 
         logger.warning(
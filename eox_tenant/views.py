@@ -6,9 +6,20 @@ from __future__ import unicode_literals
 from pathlib import Path
 from subprocess import CalledProcessError, check_output
 
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import Http404, JsonResponse
 
 import eox_tenant
+from eox_tenant.cache import TENANT_CACHE
+from eox_tenant.domain_index import DOMAIN_INDEX
+from eox_tenant.instrumentation import TIMING_HISTOGRAM, WORKER_STATS
+from eox_tenant.models import TENANT_CONFIG_CACHE
+from eox_tenant.org_index import ORG_INDEX
+from eox_tenant.signals import SETTINGS_SNAPSHOTS
+from eox_tenant.tenant_wise.proxies import ORG_VALUE_CACHE
+
+# Read at the beginning so this can not be modified by the tenant configs
+EOX_TENANT_ENABLE_WORKER_STATS = getattr(settings, "EOX_TENANT_ENABLE_WORKER_STATS", False)
 
 
 def info_view(request):  # pylint: disable=unused-argument
@@ -30,3 +41,26 @@ def info_view(request):  # pylint: disable=unused-argument
             "git": git_data,
         },
     )
+
+
+def worker_stats_view(request):
+    """
+    Show the tenant switches and cache counters of the worker that served the request.
+
+    Only available for staff users when EOX_TENANT_ENABLE_WORKER_STATS is set.
+    """
+    if not EOX_TENANT_ENABLE_WORKER_STATS or not request.user.is_staff:
+        raise Http404
+
+    return JsonResponse(
+        {
+            "tenant_switches": WORKER_STATS.stats(),
+            "config_cache": TENANT_CONFIG_CACHE.stats(),
+            "domain_index": DOMAIN_INDEX.stats(),
+            "org_index": ORG_INDEX.stats(),
+            "settings_snapshots": SETTINGS_SNAPSHOTS.stats(),
+            "org_value_cache": ORG_VALUE_CACHE.stats(),
+            "local_cache": TENANT_CACHE.stats(),
+            "timings": TIMING_HISTOGRAM.stats(),
+        },
+    )